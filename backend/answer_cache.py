@@ -0,0 +1,214 @@
+import os
+import re
+import json
+import time
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from embedding_cache import normalize_query
+
+# ---------------------------------------------------------
+# Semantic Answer Cache (/api/chat and /api/agent query answers)
+# ---------------------------------------------------------
+# Query traffic is dominated by a few questions (documents needed, eligibility,
+# how to apply). A finished answer is stored under its query embedding, scheme
+# and language; a later question whose embedding is close enough is answered
+# from the cache and replayed as the same SSE events, skipping generation.
+# Entries carry a version (content index + prompt templates) and anything
+# written under another version is ignored.
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 86400)))  # seconds
+# multilingual-e5 cosine scores sit high (unrelated questions ~0.8), so the bar is strict
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "")  # optional jsonl file so entries survive restarts
+REPLAY_CHUNK_WORDS = int(os.getenv("ANSWER_REPLAY_CHUNK_WORDS", "6"))
+
+_DEVANAGARI = re.compile(r"[\u0900-\u097F]")
+
+
+def detect_language(text):
+    return "hi" if _DEVANAGARI.search(text or "") else "en"
+
+
+def fingerprint(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:12]
+
+
+def content_fingerprint(content_store):
+    """Changes whenever a chunk is added, removed or re-chunked."""
+    pairs = sorted(zip(content_store.ids, content_store.contents))
+    return fingerprint(*(f"{cid}:{zlib.crc32(text.encode('utf-8'))}" for cid, text in pairs))
+
+
+def _unit(vector):
+    if vector is None:
+        return None
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+def replay_events(answer, chunk_words=REPLAY_CHUNK_WORDS):
+    """The SSE events get_sarvam_stream would have produced for this answer."""
+    words = re.split(r"(?<=\s)", answer)
+    for i in range(0, len(words), chunk_words):
+        yield f"data: {json.dumps({'content': ''.join(words[i:i + chunk_words])})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+class AnswerCache:
+    """
+    Bounded LRU + TTL cache of finished answers, looked up by cosine similarity
+    within a (channel, scheme, language) bucket. Without an embedding (bm25 mode,
+    embedding service down) it falls back to an exact normalized-text match.
+    """
+
+    def __init__(self, version, max_size=ANSWER_CACHE_SIZE, ttl_seconds=ANSWER_CACHE_TTL,
+                 threshold=ANSWER_CACHE_SIMILARITY, path=ANSWER_CACHE_PATH):
+        self.version = version
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.generation_ms_total = 0.0  # misses: retrieval + generation, to estimate what a hit saves
+        self.generations = 0
+        self.saved_ms_total = 0.0
+        if path:
+            self._load()
+
+    # ---- persistence -----------------------------------------------------
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        kept, stale = [], 0
+        now = time.time()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("version") != self.version or record.get("expires_at", 0) <= now:
+                    stale += 1
+                    continue
+                kept.append(record)
+        for record in kept[-self.max_size:]:
+            self._insert(record)
+        # Rewrite without the stale / evicted lines so the file doesn't grow forever
+        with open(self.path, "w", encoding="utf-8") as f:
+            for record in self._entries.values():
+                f.write(json.dumps(self._serialize(record), ensure_ascii=False) + "\n")
+        print(f"💾 Answer cache: loaded {len(self._entries)} entries, dropped {stale} stale (version {self.version})")
+
+    def _serialize(self, entry):
+        record = {k: v for k, v in entry.items() if k != "vector"}
+        record["vector"] = entry["vector"].tolist() if entry["vector"] is not None else None
+        return record
+
+    def _append(self, entry):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self._serialize(entry), ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"⚠️ Answer cache write failed: {e}")
+
+    # ---- cache -----------------------------------------------------------
+
+    def _insert(self, record):
+        entry = dict(record)
+        entry["vector"] = _unit(record.get("vector"))
+        self._entries[self._next_id] = entry
+        self._next_id += 1
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def lookup(self, channel, query, embedding, scheme_id=None, lang="en"):
+        """Returns the best cached entry ({"answer", "extra", "similarity", ...}) or None."""
+        query_norm = normalize_query(query)
+        vector = _unit(embedding)
+        now = time.time()
+        with self._lock:
+            best_key, best_score = None, -1.0
+            for key, entry in list(self._entries.items()):
+                if entry["expires_at"] <= now:
+                    del self._entries[key]
+                    continue
+                if (entry["channel"], entry["scheme_id"], entry["lang"]) != (channel, scheme_id, lang):
+                    continue
+                if entry["query"] == query_norm:
+                    score = 1.0
+                elif vector is not None and entry["vector"] is not None:
+                    score = float(np.dot(vector, entry["vector"]))
+                else:
+                    continue
+                if score > best_score:
+                    best_key, best_score = key, score
+            if best_key is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return {**self._entries[best_key], "similarity": round(best_score, 4)}
+
+    def put(self, channel, query, embedding, answer, scheme_id=None, lang="en", extra=None, generation_ms=None):
+        if self.max_size <= 0 or not answer:
+            return
+        entry = {
+            "version": self.version,
+            "channel": channel,
+            "scheme_id": scheme_id,
+            "lang": lang,
+            "query": normalize_query(query),
+            "vector": embedding,
+            "answer": answer,
+            "extra": extra or {},
+            "expires_at": time.time() + self.ttl_seconds,
+        }
+        with self._lock:
+            self._insert(entry)
+            self.stores += 1
+            if generation_ms is not None:
+                self.generation_ms_total += generation_ms
+                self.generations += 1
+            if self.path:
+                self._append(self._entries[next(reversed(self._entries))])
+
+    def record_hit_latency(self, elapsed_ms):
+        """A hit saves roughly the average miss (retrieval + generation) minus its own replay time."""
+        with self._lock:
+            if self.generations:
+                self.saved_ms_total += max(0.0, self.generation_ms_total / self.generations - elapsed_ms)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "similarity_threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "avg_generation_ms": round(self.generation_ms_total / self.generations, 1) if self.generations else None,
+                "saved_ms_total": round(self.saved_ms_total, 1),
+            }
@@ -0,0 +1,174 @@
+import os
+import time
+import base64
+import shutil
+import asyncio
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+
+# ---------------------------------------------------------
+# Binary Audio Delivery (raw bytes / short-lived URLs, optional Opus or MP3)
+# ---------------------------------------------------------
+# base64 inside JSON costs a third more bytes and the client can't start
+# playback until the whole body is parsed. On 2G/3G links that is the slow
+# part of a voice turn. Here TTS WAV is optionally re-encoded with ffmpeg
+# (a 24 kbps Opus clip is ~1/15th of the 16-bit WAV) and handed out as raw
+# bytes or parked under a short-lived token the client fetches as a URL.
+AUDIO_FORMATS = {
+    # format: (media type, ffmpeg output args)
+    "wav": ("audio/wav", None),
+    "opus": ("audio/ogg", ["-c:a", "libopus", "-b:a", os.getenv("AUDIO_OPUS_BITRATE", "24k"), "-f", "ogg"]),
+    "mp3": ("audio/mpeg", ["-c:a", "libmp3lame", "-b:a", os.getenv("AUDIO_MP3_BITRATE", "48k"), "-f", "mp3"]),
+}
+FFMPEG_PATH = os.getenv("FFMPEG_PATH") or shutil.which("ffmpeg")
+AUDIO_TRANSCODE_TIMEOUT = float(os.getenv("AUDIO_TRANSCODE_TIMEOUT", "10"))
+AUDIO_TRANSCODE_CACHE_SIZE = int(os.getenv("AUDIO_TRANSCODE_CACHE_SIZE", "64"))  # welcome line, fallbacks
+AUDIO_URL_TTL = float(os.getenv("AUDIO_URL_TTL", "120"))  # seconds a fetchable clip stays around
+AUDIO_URL_MAX_CLIPS = int(os.getenv("AUDIO_URL_MAX_CLIPS", "256"))
+# Per header, after percent-encoding. Proxies cap the whole header block at 4-8 KB.
+AUDIO_HEADER_MAX_BYTES = int(os.getenv("AUDIO_HEADER_MAX_BYTES", "1024"))
+
+DELIVERY_MODES = ("json", "binary", "url")
+
+
+_HEADER_SAFE = " ,.?!'"
+
+
+def header_text(text, max_bytes=AUDIO_HEADER_MAX_BYTES):
+    """
+    (value, truncated). Headers are latin-1 only, so Hindi text travels percent-encoded
+    (decodeURIComponent on the client). The cap counts encoded bytes, since a Devanagari
+    character becomes 9 of them. The cut never splits a character.
+    """
+    encoded = quote(text or "", safe=_HEADER_SAFE)
+    if len(encoded) <= max_bytes:
+        return encoded, False
+    pieces, size = [], 0
+    for char in text:
+        piece = quote(char, safe=_HEADER_SAFE)
+        if size + len(piece) > max_bytes:
+            break
+        pieces.append(piece)
+        size += len(piece)
+    return "".join(pieces), True
+
+
+class AudioDelivery:
+    def __init__(self, ffmpeg_path=FFMPEG_PATH, cache_size=AUDIO_TRANSCODE_CACHE_SIZE,
+                 url_ttl=AUDIO_URL_TTL, max_clips=AUDIO_URL_MAX_CLIPS):
+        self.ffmpeg_path = ffmpeg_path
+        self.cache_size = cache_size
+        self.url_ttl = url_ttl
+        self.max_clips = max_clips
+        self._lock = threading.Lock()
+        self._transcoded = OrderedDict()  # (sha1 of wav, format) -> bytes
+        self._clips = OrderedDict()  # token -> (audio, media_type, expires_at)
+        self.transcodes = 0
+        self.transcode_cache_hits = 0
+        self.transcode_failures = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        if not ffmpeg_path:
+            print("⚠️ ffmpeg not found: binary audio is delivered as WAV only")
+
+    def resolve_format(self, audio_format):
+        """Requested format if we can produce it, else WAV."""
+        audio_format = (audio_format or "wav").lower()
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unsupported audio format '{audio_format}' (use one of {', '.join(AUDIO_FORMATS)})")
+        if AUDIO_FORMATS[audio_format][1] and not self.ffmpeg_path:
+            return "wav"
+        return audio_format
+
+    async def _ffmpeg(self, wav, args):
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-i", "pipe:0", *args, "pipe:1",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            out, err = await asyncio.wait_for(process.communicate(wav), AUDIO_TRANSCODE_TIMEOUT)
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+            raise
+        if process.returncode != 0 or not out:
+            raise RuntimeError(err.decode("utf-8", "replace").strip() or f"ffmpeg exited with {process.returncode}")
+        return out
+
+    async def encode(self, audio_base64, audio_format="wav"):
+        """
+        TTS base64 WAV -> (audio bytes, format actually used, media type).
+        A failed transcode falls back to the original WAV rather than failing the turn.
+        """
+        wav = base64.b64decode(audio_base64)
+        audio_format = self.resolve_format(audio_format)
+        args = AUDIO_FORMATS[audio_format][1]
+        if not args:
+            return wav, "wav", AUDIO_FORMATS["wav"][0]
+
+        key = (hashlib.sha1(wav).hexdigest(), audio_format)
+        with self._lock:
+            cached = self._transcoded.get(key)
+            if cached is not None:
+                self._transcoded.move_to_end(key)
+                self.transcode_cache_hits += 1
+                return cached, audio_format, AUDIO_FORMATS[audio_format][0]
+
+        try:
+            audio = await self._ffmpeg(wav, args)
+        except Exception as e:
+            print(f"⚠️ Transcode to {audio_format} failed, sending WAV: {e}")
+            with self._lock:
+                self.transcode_failures += 1
+            return wav, "wav", AUDIO_FORMATS["wav"][0]
+
+        with self._lock:
+            self.transcodes += 1
+            self.bytes_in += len(wav)
+            self.bytes_out += len(audio)
+            self._transcoded[key] = audio
+            while len(self._transcoded) > self.cache_size:
+                self._transcoded.popitem(last=False)
+        return audio, audio_format, AUDIO_FORMATS[audio_format][0]
+
+    # ---- short-lived URLs ------------------------------------------------
+
+    def park(self, audio, media_type):
+        """Stores a clip for url_ttl seconds; returns the token for GET /api/audio/{token}."""
+        token = secrets.token_urlsafe(16)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            self._clips[token] = (audio, media_type, now + self.url_ttl)
+            while len(self._clips) > self.max_clips:
+                self._clips.popitem(last=False)
+        return token
+
+    def fetch(self, token):
+        """(audio, media_type) or None once expired. Clips can be fetched more than once until then (range requests, replays)."""
+        with self._lock:
+            self._expire(time.time())
+            clip = self._clips.get(token)
+        return (clip[0], clip[1]) if clip else None
+
+    def _expire(self, now):
+        # Same TTL for every clip, so insertion order is expiry order
+        while self._clips:
+            token, (_, _, expires_at) = next(iter(self._clips.items()))
+            if expires_at > now:
+                break
+            del self._clips[token]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ffmpeg": bool(self.ffmpeg_path),
+                "transcodes": self.transcodes,
+                "transcode_cache_hits": self.transcode_cache_hits,
+                "transcode_failures": self.transcode_failures,
+                "compression_ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+                "parked_clips": len(self._clips),
+            }
@@ -0,0 +1,206 @@
+import io
+import os
+import time
+import wave
+import shutil
+import asyncio
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from voice_session import pcm_to_wav
+
+# ---------------------------------------------------------
+# Audio Preprocessing before STT (16 kHz mono, silence trim, FLAC)
+# ---------------------------------------------------------
+# Browsers record 48 kHz stereo webm at a high bitrate; saarika only needs
+# 16 kHz mono. Each recording is decoded, downmixed and resampled, trimmed
+# to the span that actually has speech and re-encoded losslessly before it
+# is uploaded. Recordings with no speech in them never reach the paid STT
+# call. Decoding and encoding shell out to ffmpeg and the numpy work is
+# CPU-bound, so everything runs on a small thread pool off the event loop.
+AUDIO_PREP_ENABLED = os.getenv("AUDIO_PREP_ENABLED", "true").lower() == "true"
+AUDIO_PREP_SAMPLE_RATE = int(os.getenv("AUDIO_PREP_SAMPLE_RATE", "16000"))
+AUDIO_PREP_CODEC = os.getenv("AUDIO_PREP_CODEC", "flac")  # flac (needs ffmpeg) | wav
+AUDIO_PREP_WORKERS = int(os.getenv("AUDIO_PREP_WORKERS", "2"))
+AUDIO_PREP_TIMEOUT = float(os.getenv("AUDIO_PREP_TIMEOUT", "15"))
+AUDIO_SILENCE_DB = float(os.getenv("AUDIO_SILENCE_DB", "-50"))  # dBFS, same floor as the socket VAD
+AUDIO_MIN_SPEECH_MS = int(os.getenv("AUDIO_MIN_SPEECH_MS", "250"))  # less voiced audio than this = nothing said
+AUDIO_TRIM_PADDING_MS = int(os.getenv("AUDIO_TRIM_PADDING_MS", "200"))  # kept around the speech so words aren't clipped
+FRAME_MS = 20
+FFMPEG_PATH = os.getenv("FFMPEG_PATH") or shutil.which("ffmpeg")
+
+CODECS = {
+    # codec: (filename suffix, content type)
+    "flac": (".flac", "audio/flac"),
+    "wav": (".wav", "audio/wav"),
+}
+
+
+def _ffmpeg(args, data, ffmpeg_path=FFMPEG_PATH):
+    result = subprocess.run(
+        [ffmpeg_path, "-hide_banner", "-loglevel", "error", *args],
+        input=data, capture_output=True, timeout=AUDIO_PREP_TIMEOUT
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or f"ffmpeg exited with {result.returncode}")
+    return result.stdout
+
+
+def _read_wav(audio_bytes):
+    """(float32 mono samples, sample_rate) for 16-bit PCM WAV, else None."""
+    try:
+        with wave.open(io.BytesIO(audio_bytes)) as wav:
+            if wav.getsampwidth() != 2:
+                return None
+            channels, rate = wav.getnchannels(), wav.getframerate()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2").astype(np.float32)
+    except (wave.Error, EOFError):
+        return None
+    if channels > 1:
+        samples = samples[:len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def resample(samples, rate, target_rate):
+    """Linear interpolation; good enough for speech going to STT."""
+    if rate == target_rate or samples.size == 0:
+        return samples
+    duration = samples.size / rate
+    target = np.arange(int(duration * target_rate)) / target_rate
+    return np.interp(target, np.arange(samples.size) / rate, samples).astype(np.float32)
+
+
+def decode(audio_bytes, sample_rate=AUDIO_PREP_SAMPLE_RATE, ffmpeg_path=FFMPEG_PATH):
+    """Any recording -> float32 mono samples at sample_rate. None when it can't be decoded here."""
+    if ffmpeg_path:
+        try:
+            pcm = _ffmpeg(["-i", "pipe:0", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"],
+                          audio_bytes, ffmpeg_path)
+            return np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"⚠️ ffmpeg could not decode recording: {e}")
+    # Without ffmpeg only plain WAV can be handled
+    parsed = _read_wav(audio_bytes)
+    if parsed is None:
+        return None
+    return resample(parsed[0], parsed[1], sample_rate)
+
+
+def trim_silence(samples, sample_rate=AUDIO_PREP_SAMPLE_RATE):
+    """(samples between the first and last voiced frame plus padding, voiced milliseconds)."""
+    frame = int(sample_rate * FRAME_MS / 1000)
+    count = samples.size // frame
+    if count == 0:
+        return samples[:0], 0
+    frames = samples[:count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    level_db = 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+    voiced = np.flatnonzero(level_db > AUDIO_SILENCE_DB)
+    if voiced.size == 0:
+        return samples[:0], 0
+    padding = AUDIO_TRIM_PADDING_MS // FRAME_MS
+    start = max(0, voiced[0] - padding) * frame
+    end = min(count, voiced[-1] + 1 + padding) * frame
+    return samples[start:end], int(voiced.size * FRAME_MS)
+
+
+def encode(samples, sample_rate=AUDIO_PREP_SAMPLE_RATE, codec=AUDIO_PREP_CODEC, ffmpeg_path=FFMPEG_PATH):
+    """Samples -> (audio bytes, codec actually used). FLAC is roughly half the size of the same WAV."""
+    pcm = np.clip(samples, -32768, 32767).astype("<i2").tobytes()
+    if codec == "flac" and ffmpeg_path:
+        try:
+            return _ffmpeg(["-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+                            "-c:a", "flac", "-f", "flac", "pipe:1"], pcm, ffmpeg_path), "flac"
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"⚠️ FLAC encode failed, sending WAV: {e}")
+    return pcm_to_wav(pcm, sample_rate), "wav"
+
+
+class AudioPreprocessor:
+    """
+    prepare() / prepare_pcm() -> {"audio", "filename", "content_type", "silent", "speech_ms",
+    "input_bytes", "output_bytes", "processed"}. "silent" means don't call STT. "processed"
+    is False when the recording couldn't be decoded and is passed through untouched.
+    """
+
+    def __init__(self, sample_rate=AUDIO_PREP_SAMPLE_RATE, codec=AUDIO_PREP_CODEC, workers=AUDIO_PREP_WORKERS,
+                 ffmpeg_path=FFMPEG_PATH):
+        self.sample_rate = sample_rate
+        self.codec = codec
+        self.ffmpeg_path = ffmpeg_path
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-prep")
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.rejected_silent = 0
+        self.passthrough = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.prep_ms_total = 0.0
+        if not ffmpeg_path:
+            print("⚠️ ffmpeg not found: only WAV recordings are preprocessed before STT")
+
+    def _finish(self, samples, input_bytes, filename):
+        trimmed, speech_ms = trim_silence(samples, self.sample_rate)
+        if speech_ms < AUDIO_MIN_SPEECH_MS:
+            return {"audio": None, "filename": filename, "content_type": None, "silent": True,
+                    "speech_ms": speech_ms, "input_bytes": input_bytes, "output_bytes": 0, "processed": True}
+        audio, codec = encode(trimmed, self.sample_rate, self.codec, self.ffmpeg_path)
+        suffix, content_type = CODECS[codec]
+        return {"audio": audio, "filename": os.path.splitext(filename)[0] + suffix, "content_type": content_type,
+                "silent": False, "speech_ms": speech_ms, "input_bytes": input_bytes, "output_bytes": len(audio),
+                "processed": True}
+
+    def _prepare_sync(self, audio_bytes, filename, content_type):
+        samples = decode(audio_bytes, self.sample_rate, self.ffmpeg_path) if audio_bytes else np.zeros(0, np.float32)
+        if samples is None:
+            return {"audio": audio_bytes, "filename": filename, "content_type": content_type, "silent": False,
+                    "speech_ms": None, "input_bytes": len(audio_bytes), "output_bytes": len(audio_bytes),
+                    "processed": False}
+        return self._finish(samples, len(audio_bytes), filename)
+
+    def _prepare_pcm_sync(self, pcm, sample_rate, filename):
+        samples = resample(np.frombuffer(pcm, dtype="<i2").astype(np.float32), sample_rate, self.sample_rate)
+        return self._finish(samples, len(pcm), filename)
+
+    async def _run(self, fn, *args):
+        started = time.perf_counter()
+        result = await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.prep_ms_total += elapsed_ms
+            if not result["processed"]:
+                self.passthrough += 1
+            else:
+                self.processed += 1
+                self.rejected_silent += result["silent"]
+                self.bytes_in += result["input_bytes"]
+                self.bytes_out += result["output_bytes"]
+        print(f"🎚️ Audio prep: {result['input_bytes']} -> {result['output_bytes']} bytes, "
+              f"{result['speech_ms']} ms speech{' (silent, STT skipped)' if result['silent'] else ''} "
+              f"in {elapsed_ms:.0f}ms")
+        return result
+
+    async def prepare(self, audio_bytes, filename="audio.webm", content_type="application/octet-stream"):
+        """A browser upload (webm / ogg / wav / ...)."""
+        return await self._run(self._prepare_sync, audio_bytes, filename, content_type)
+
+    async def prepare_pcm(self, pcm, sample_rate, filename="utterance.wav"):
+        """Raw PCM16 mono, e.g. an utterance cut by the WebSocket VAD."""
+        return await self._run(self._prepare_pcm_sync, pcm, sample_rate, filename)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            calls = self.processed + self.passthrough
+            return {
+                "ffmpeg": bool(self.ffmpeg_path),
+                "codec": self.codec if self.ffmpeg_path else "wav",
+                "processed": self.processed,
+                "passthrough": self.passthrough,
+                "rejected_silent": self.rejected_silent,
+                "compression_ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+                "avg_prep_ms": round(self.prep_ms_total / calls, 1) if calls else None,
+            }
@@ -0,0 +1,379 @@
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+import tempfile
+import numpy as np
+
+from content_store import load_content_store
+from bm25_index import load_bm25_index, tokenize
+from vector_store import PineconeVectorIndex, LocalVectorIndex, write_local_index, LOCAL_INDEX_DIR
+
+# ---------------------------------------------------------
+# Retrieval Benchmark: recall@k, MRR, latency percentiles, bytes on the wire
+# ---------------------------------------------------------
+# Runs a labelled query set (data/benchmark/queries.json, Hindi + English questions
+# mapped to chunk_ids in data/chunks) against one retrieval backend:
+#   bm25      -> bm25_index.BM25Index over the content store
+#   local     -> vector_store.LocalVectorIndex
+#   main      -> main.high_quality_search (whatever RETRIEVAL_MODE / VECTOR_BACKEND say)
+#   query_db  -> query_db.high_quality_search (MiniLM + CrossEncoder)
+# With --offline, Pinecone is replaced by an in-process stand-in (hashing embedder +
+# brute-force index over data/chunks), so the whole run needs no network or API keys.
+#
+#   python benchmark_retrieval.py --backend main --offline
+#   python benchmark_retrieval.py --backend bm25 --k 5 --scoped
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "benchmark")
+QUERIES_FILE = os.path.join(BENCHMARK_DIR, "queries.json")
+BACKENDS = ("bm25", "local", "main", "query_db")
+
+FAKE_EMBED_DIM = 1024  # same width as multilingual-e5-large
+
+
+def load_queries(path=QUERIES_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ---------------------------------------------------------
+# Offline stand-in for Pinecone
+# ---------------------------------------------------------
+
+def hashing_embed(text, dim=FAKE_EMBED_DIM):
+    """
+    Deterministic bag-of-features embedding (word tokens + character trigrams hashed into `dim` buckets).
+    Not semantic, but stable across runs, so ranking changes come from the code under test.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokenize(text):
+        vector[zlib.crc32(token.encode("utf-8")) % dim] += 1.0
+        padded = f" {token} "
+        for i in range(len(padded) - 2):
+            vector[zlib.crc32(padded[i:i + 3].encode("utf-8")) % dim] += 0.5
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _payload_size(obj):
+    return len(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+
+class _Record:
+    """Attribute access like the Pinecone SDK response objects (.values, .matches, .id, .score...)."""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class TransferMeter:
+    """Approximate request + response bytes, measured as the JSON bodies the SDK would exchange."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.calls = 0
+
+    def add(self, request, response):
+        self.bytes += _payload_size(request) + _payload_size(response)
+        self.calls += 1
+
+
+class FakeInference:
+    def __init__(self, meter, embed_fn=hashing_embed):
+        self.meter = meter
+        self.embed_fn = embed_fn
+
+    def embed(self, model, inputs, parameters=None):
+        vectors = [[float(x) for x in self.embed_fn(text)] for text in inputs]
+        self.meter.add(
+            {"model": model, "inputs": [{"text": t} for t in inputs], "parameters": parameters or {}},
+            {"data": [{"values": v} for v in vectors]}
+        )
+        return [_Record(values=v) for v in vectors]
+
+
+class FakeIndex:
+    """Brute-force cosine index over the content store; understands the scheme_ids `$in` filter."""
+
+    def __init__(self, content_store, meter, passage_encoder=None):
+        self.content_store = content_store
+        self.meter = meter
+        # Passages must live in the same space as the caller's query vectors (query_db uses MiniLM)
+        self.passage_encoder = passage_encoder
+        self._matrix = None
+
+    def _embeddings(self):
+        if self._matrix is None:
+            if self.passage_encoder is not None:
+                matrix = np.asarray(self.passage_encoder(self.content_store.contents), dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                matrix = matrix / np.where(norms == 0, 1.0, norms)
+            else:
+                matrix = np.stack([hashing_embed(text) for text in self.content_store.contents])
+            self._matrix = matrix
+        return self._matrix
+
+    def query(self, vector, top_k=10, include_metadata=False, filter=None, **kwargs):
+        matrix = self._embeddings()
+        query_vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        scores = matrix @ (query_vector / norm if norm else query_vector)
+
+        allowed = None
+        if filter:
+            allowed = set(filter.get("scheme_ids", {}).get("$in", []))
+        order = np.argsort(-scores)
+
+        matches = []
+        for row in order:
+            metadata = self.content_store.metadatas[row]
+            if allowed is not None and not allowed.intersection(metadata.get("scheme_ids", [])):
+                continue
+            matches.append(_Record(
+                id=self.content_store.ids[row],
+                score=float(scores[row]),
+                metadata=metadata if include_metadata else None
+            ))
+            if len(matches) >= top_k:
+                break
+
+        self.meter.add(
+            {"vector": [float(x) for x in query_vector], "topK": top_k,
+             "includeMetadata": include_metadata, "filter": filter},
+            {"matches": [
+                {"id": m.id, "score": m.score, **({"metadata": m.metadata} if include_metadata else {})}
+                for m in matches
+            ]}
+        )
+        return _Record(matches=matches)
+
+
+class FakePinecone:
+    """Drop-in for pinecone.Pinecone: every .Index(name) serves the same local corpus."""
+
+    meter = TransferMeter()
+    content_store = None
+    passage_encoder = None
+
+    def __init__(self, api_key=None, **kwargs):
+        self.inference = FakeInference(FakePinecone.meter)
+        self._indexes = {}
+
+    def Index(self, name):
+        if name not in self._indexes:
+            self._indexes[name] = FakeIndex(
+                FakePinecone.content_store, FakePinecone.meter, FakePinecone.passage_encoder
+            )
+        return self._indexes[name]
+
+
+def install_fake_pinecone(content_store):
+    """Must run before importing main / query_db (they construct Pinecone at import time)."""
+    import pinecone
+    FakePinecone.content_store = content_store
+    pinecone.Pinecone = FakePinecone
+    os.environ.setdefault("PINECONE_API_KEY", "offline")
+    os.environ.setdefault("SARVAM_API_KEY", "offline")
+
+
+# ---------------------------------------------------------
+# Backends: each returns search(query, k, scheme_id) -> ranked chunk_ids
+# ---------------------------------------------------------
+
+def _text_to_id(content_store):
+    """main / query_db return chunk text; map it back to ids (first id wins for duplicate text)."""
+    text_to_id = {}
+    for chunk_id, content in zip(content_store.ids, content_store.contents):
+        text_to_id.setdefault(content, chunk_id)
+    return text_to_id
+
+
+def make_bm25_backend(content_store, offline):
+    bm25_index = load_bm25_index(content_store)
+    return lambda query, k, scheme_id: [m["id"] for m in bm25_index.query(query, top_k=k, scheme_id=scheme_id)]
+
+
+def make_local_backend(content_store, offline, index_dir=LOCAL_INDEX_DIR):
+    if offline:
+        # The on-disk index holds e5 vectors; offline queries are hashed, so index with the same embedder
+        embeddings = np.stack([hashing_embed(text) for text in content_store.contents])
+        with tempfile.TemporaryDirectory(prefix="bench_index_") as tmp_dir:
+            write_local_index(content_store.ids, embeddings, content_store.metadatas, "offline-hashing", tmp_dir)
+            vector_index = LocalVectorIndex(tmp_dir)
+            # Copy out of the mmap before the directory goes away
+            vector_index.embeddings = np.array(vector_index.embeddings)
+        embed = hashing_embed
+    else:
+        from pinecone import Pinecone
+        from main import EMBED_MODEL
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+
+        def embed(query):
+            return pc.inference.embed(model=EMBED_MODEL, inputs=[query], parameters={"input_type": "query"})[0].values
+
+        vector_index = LocalVectorIndex(index_dir)
+    return lambda query, k, scheme_id: [m["id"] for m in vector_index.query(embed(query), top_k=k, scheme_id=scheme_id)]
+
+
+def make_main_backend(content_store, offline):
+    import main
+    text_to_id = _text_to_id(content_store)
+    if offline:
+        # VECTOR_BACKEND=local would hold e5 vectors that hashed queries can't match
+        main.vector_index = PineconeVectorIndex(main.pc.Index(main.index_name))
+
+    def search(query, k, scheme_id):
+        # Measure retrieval, not the embedding cache
+        main.embedding_cache.clear()
+        return [text_to_id.get(text) for text in main.high_quality_search(query, top_n=k, scheme_id=scheme_id)]
+    return search
+
+
+def make_query_db_backend(content_store, offline):
+    import query_db
+    text_to_id = _text_to_id(content_store)
+    if offline:
+        # Index passages with query_db's own bi-encoder so its MiniLM query vectors line up
+        query_db.index.passage_encoder = lambda texts: query_db.bi_encoder.encode(texts)
+
+    def search(query, k, scheme_id):
+        # query_db has no scheme scoping; fetch_k matches its default
+        hits = query_db.high_quality_search(query, fetch_k=max(k, 20), top_n=k)
+        return [text_to_id.get(doc) for doc, _, _ in hits]
+    return search
+
+
+BACKEND_FACTORIES = {
+    "bm25": make_bm25_backend,
+    "local": make_local_backend,
+    "main": make_main_backend,
+    "query_db": make_query_db_backend,
+}
+
+
+# ---------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------
+
+def recall_at_k(ranked_ids, relevant, k):
+    if not relevant:
+        return 0.0
+    return len(set(ranked_ids[:k]) & set(relevant)) / len(relevant)
+
+
+def reciprocal_rank(ranked_ids, relevant, k):
+    for rank, chunk_id in enumerate(ranked_ids[:k], start=1):
+        if chunk_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile (no interpolation, so p99 of a small run is the worst sample)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(np.ceil(pct / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def summarize(rows):
+    latencies = [ms for row in rows for ms in row["latencies_ms"]]
+    return {
+        "queries": len(rows),
+        "recall_at_k": round(sum(r["recall"] for r in rows) / len(rows), 4) if rows else 0.0,
+        "mrr": round(sum(r["rr"] for r in rows) / len(rows), 4) if rows else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "avg_bytes_per_query": round(sum(r["bytes"] for r in rows) / len(rows)) if rows else 0,
+    }
+
+
+def run_benchmark(search, queries, k=5, repeat=3, scoped=False, meter=None):
+    rows = []
+    for item in queries:
+        scheme_id = item.get("scheme_id") if scoped else None
+        latencies = []
+        bytes_before = meter.bytes if meter else 0
+        ranked = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ranked = search(item["query"], k, scheme_id)
+            latencies.append((time.perf_counter() - start) * 1000)
+        transferred = ((meter.bytes - bytes_before) / repeat) if meter else 0
+
+        rows.append({
+            "query": item["query"],
+            "lang": item.get("lang", "unknown"),
+            "retrieved": ranked[:k],
+            "relevant": item["relevant"],
+            "recall": recall_at_k(ranked, item["relevant"], k),
+            "rr": reciprocal_rank(ranked, item["relevant"], k),
+            "latencies_ms": latencies,
+            "bytes": transferred,
+        })
+
+    report = {"overall": summarize(rows), "by_lang": {}}
+    for lang in sorted({row["lang"] for row in rows}):
+        report["by_lang"][lang] = summarize([row for row in rows if row["lang"] == lang])
+    return report, rows
+
+
+def print_report(backend, k, report, rows, verbose=False):
+    print(f"\n📊 Retrieval benchmark: backend={backend}, k={k}")
+    header = f"{'slice':<10}{'n':>4}{'recall@k':>10}{'MRR':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'bytes/q':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in [("overall", report["overall"])] + list(report["by_lang"].items()):
+        print(f"{name:<10}{stats['queries']:>4}{stats['recall_at_k']:>10.3f}{stats['mrr']:>8.3f}"
+              f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['avg_bytes_per_query']:>10}")
+
+    misses = [row for row in rows if row["rr"] == 0.0]
+    if misses:
+        print(f"\n⚠️ {len(misses)} queries found no relevant chunk in the top {k}")
+        if verbose:
+            for row in misses:
+                print(f"   - {row['query']}\n     got: {row['retrieved']}\n     want: {row['relevant']}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark a retrieval backend against the labelled query set.")
+    parser.add_argument("--backend", choices=BACKENDS, default="main")
+    parser.add_argument("--offline", action="store_true",
+                        help="Replace Pinecone with an in-process stand-in (no network, no API keys)")
+    parser.add_argument("--queries", default=QUERIES_FILE)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query")
+    parser.add_argument("--scoped", action="store_true", help="Pass each query's scheme_id to the backend")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="List the queries that missed")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    content_store = load_content_store()
+
+    meter = None
+    if args.offline:
+        install_fake_pinecone(content_store)
+        meter = FakePinecone.meter
+    elif args.backend in ("main", "query_db"):
+        print("ℹ️ Live run: bytes are only measured with --offline")
+
+    search = BACKEND_FACTORIES[args.backend](content_store, args.offline)
+
+    # One untimed pass so lazy model loads / index builds don't land in p99
+    search(queries[0]["query"], args.k, None)
+
+    report, rows = run_benchmark(search, queries, k=args.k, repeat=args.repeat, scoped=args.scoped, meter=meter)
+    if args.json:
+        json.dump({"backend": args.backend, "k": args.k, "offline": args.offline, **report},
+                  sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print_report(args.backend, args.k, report, rows, verbose=args.verbose)
+
+
+if __name__ == "__main__":
+    main_cli()
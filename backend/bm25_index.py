@@ -0,0 +1,103 @@
+import re
+import math
+from collections import Counter, defaultdict
+
+# ---------------------------------------------------------
+# Keyword Retrieval (BM25) + Reciprocal-Rank Fusion
+# ---------------------------------------------------------
+# Scheme guidelines are full of exact tokens ("BLC", "AHP", "EWS", "5.1.1",
+# "Annexure-II") that dense embeddings blur. A small in-memory inverted index
+# over data/chunks catches those, and RRF merges it with the vector results.
+
+# Keeps dotted section numbers ("5.1.1") and hyphenated names ("PMAY-G", "Annexure-II")
+# as single tokens, and covers Devanagari as well as Latin text.
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)+|[\w\u0900-\u097F]+(?:-[\w\u0900-\u097F]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "for", "from", "how", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "the", "to", "what", "which", "who", "with",
+    "can", "will", "under", "this", "that", "shall",
+}
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_PATTERN.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        # "pmay-g" should also match a query that says "pmay g"
+        if "-" in token:
+            tokens.extend(part for part in token.split("-") if part and part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over chunk content, held entirely in memory (a few hundred chunks)."""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.metadatas = []
+        self.doc_lengths = []
+        self.postings = defaultdict(list)  # term -> [(doc_idx, term_freq)]
+
+        for chunk in chunks:
+            doc_idx = len(self.ids)
+            self.ids.append(chunk["chunk_id"])
+            self.metadatas.append(chunk.get("metadata", {}))
+
+            # Header names carry a lot of signal ("5.1 Beneficiary Led Construction (BLC)")
+            headers = " ".join(
+                str(v) for k, v in chunk.get("metadata", {}).items() if k.startswith("Header")
+            )
+            term_freqs = Counter(tokenize(headers + " " + chunk["content"]))
+            self.doc_lengths.append(sum(term_freqs.values()))
+            for term, freq in term_freqs.items():
+                self.postings[term].append((doc_idx, freq))
+
+        self.avg_doc_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        n_docs = len(self.ids)
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, text, top_k=5, scheme_id=None):
+        scores = defaultdict(float)
+        for term in set(tokenize(text)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_idx, freq in self.postings[term]:
+                if scheme_id and scheme_id not in self.metadatas[doc_idx].get("scheme_ids", []):
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_idx] / self.avg_doc_length)
+                scores[doc_idx] += idf * freq * (self.k1 + 1) / (freq + norm)
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+        # Same id + score shape as the vector backends; text comes from the content store
+        return [{"id": self.ids[doc_idx], "score": score} for doc_idx, score in ranked]
+
+
+def load_bm25_index(content_store):
+    bm25_index = BM25Index(content_store.chunks())
+    print(f"BM25 keyword index built! ({len(bm25_index)} chunks, {len(bm25_index.idf)} terms)")
+    return bm25_index
+
+
+def reciprocal_rank_fusion(result_lists, k=60, top_k=5):
+    """
+    Merges ranked match lists by summing 1 / (k + rank) per chunk id.
+    """
+    fused_scores = defaultdict(float)
+    for results in result_lists:
+        for rank, match in enumerate(results, start=1):
+            fused_scores[match["id"]] += 1.0 / (k + rank)
+
+    ranked = sorted(fused_scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+    return [{"id": chunk_id, "score": score} for chunk_id, score in ranked]
@@ -1,17 +1,30 @@
 import os
-import json
 import time
+import argparse
+import queue
+import threading
 from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+from vector_store import write_local_index, LocalVectorIndex, LOCAL_INDEX_DIR
+from index_manifest import load_manifest, save_manifest, diff_chunks, manifest_path_for
+from content_store import load_chunks
+from dedup import dedup_chunks, DEDUP_THRESHOLD
 
 load_dotenv()
 
-# 1. Initialize the local model
+# 1. Local model is only needed for the Pinecone ingestion path, so load it lazily.
 # 'all-MiniLM-L6-v2' is fast, lightweight, and perfect for a MacBook Air.
 # It produces 384-dimensional embeddings.
-print("Loading local embedding model...")
-model = SentenceTransformer('all-MiniLM-L6-v2')
+INGEST_EMBED_MODEL = 'all-MiniLM-L6-v2'
+model = None
+
+def get_model():
+    global model
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+        print("Loading local embedding model...")
+        model = SentenceTransformer(INGEST_EMBED_MODEL)
+    return model
 
 # 2. Initialize Pinecone
 pinecone_api_key = os.getenv("PINECONE_API_KEY")
@@ -21,6 +34,26 @@ if not pinecone_api_key:
 pc = Pinecone(api_key=pinecone_api_key)
 index_name = "yojana-setu"
 
+# The local index must be embedded with the same model main.py uses for queries
+LOCAL_EMBED_MODEL = "multilingual-e5-large"
+LOCAL_EMBED_BATCH = 96  # Pinecone Inference limit for multilingual-e5-large
+
+# Pipelined ingestion settings (overridable from the CLI)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))   # chunks per upsert request
+ENCODE_BATCH_SIZE = int(os.getenv("ENCODE_BATCH_SIZE", "64"))    # SentenceTransformer forward-pass size
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "4"))
+PIPELINE_DEPTH = int(os.getenv("PIPELINE_DEPTH", "4"))           # encoded batches waiting for upsert
+
+def load_deduped_chunks(chunks_dir, dedup=True, threshold=DEDUP_THRESHOLD):
+    """Chunks to embed: near-duplicates collapse into one vector that lists every source."""
+    chunks = load_chunks(chunks_dir)
+    if not dedup:
+        return chunks
+    kept, duplicate_of = dedup_chunks(chunks, threshold)
+    if duplicate_of:
+        print(f"Collapsed {len(duplicate_of)} near-duplicate chunks (Jaccard >= {threshold})")
+    return kept
+
 def get_or_create_index():
     existing_indexes = pc.list_indexes().names()
     if index_name not in existing_indexes:
@@ -37,56 +70,201 @@ def get_or_create_index():
         print(f"Index '{index_name}' created successfully.")
     return pc.Index(index_name)
 
-index = get_or_create_index()
-
-def process_and_store_chunks(chunks_dir="data/chunks"):
+def process_and_store_chunks(chunks_dir="data/chunks", batch_size=INGEST_BATCH_SIZE,
+                             upsert_workers=UPSERT_WORKERS, queue_depth=PIPELINE_DEPTH, dedup=True):
+    """
+    Incremental, pipelined ingestion into Pinecone:
+    the local manifest decides which chunks are new or edited (no per-batch fetch calls),
+    the main thread encodes whole batches in one SentenceTransformer.encode call while
+    `upsert_workers` threads push finished batches to Pinecone concurrently.
+    The bounded queue keeps at most `queue_depth` encoded batches in memory.
+    """
     # Ensure the directory exists
     if not os.path.exists(chunks_dir):
         print(f"Error: Directory {chunks_dir} not found.")
         return
 
-    for filename in os.listdir(chunks_dir):
-        if filename.endswith(".json"):
-            file_path = os.path.join(chunks_dir, filename)
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                chunks_data = json.load(f)
-            
-            print(f"Processing {filename} ({len(chunks_data)} chunks)...")
-            
-            # Batch upsert to Pinecone
-            batch_size = 100
-            for i in range(0, len(chunks_data), batch_size):
-                batch = chunks_data[i:i + batch_size]
-                
-                # Fetch existing IDs in the batch to avoid duplicates
-                # Pinecone fetch allows retrieving by IDs
-                ids_to_check = [chunk["chunk_id"] for chunk in batch]
-                existing = index.fetch(ids=ids_to_check)
-                existing_ids = set(existing.vectors.keys())
-                
-                upsert_data = []
-                for chunk in batch:
-                    chunk_id = chunk["chunk_id"]
-                    if chunk_id in existing_ids:
-                        continue
-                        
-                    content = chunk["content"]
-                    metadata = chunk["metadata"]
-                    # Store content in metadata so we can retrieve it
-                    metadata["content"] = content
-                    
-                    # 3. Generate embedding locally
-                    embedding = model.encode(content).tolist()
-                    
-                    upsert_data.append((chunk_id, embedding, metadata))
-                
-                if upsert_data:
-                    # 4. Store in Pinecone
-                    index.upsert(vectors=upsert_data)
-                    print(f"Upserted {len(upsert_data)} vectors from batch {i//batch_size + 1}")
-            
-            print(f"✅ Successfully processed {filename}.")
+    index = get_or_create_index()
+    chunks = load_deduped_chunks(chunks_dir, dedup)
+
+    manifest_path = manifest_path_for(index_name)
+    manifest = load_manifest(manifest_path)
+    pending, unchanged, stale, current_hashes = diff_chunks(chunks, manifest, INGEST_EMBED_MODEL)
+    print(
+        f"Processing {len(chunks)} chunks: {len(pending)} new/changed, {len(unchanged)} unchanged, "
+        f"{len(stale)} removed (batch size {batch_size}, {upsert_workers} upsert workers)..."
+    )
+
+    # Vectors for chunks that disappeared from data/chunks
+    for i in range(0, len(stale), 1000):
+        stale_batch = stale[i:i + 1000]
+        index.delete(ids=stale_batch)
+        for chunk_id in stale_batch:
+            manifest.pop(chunk_id, None)
+        print(f"Deleted {len(stale_batch)} stale vectors")
+
+    if not pending:
+        save_manifest(manifest_path, manifest)
+        print("✅ Index already up to date.")
+        return {"elapsed_seconds": 0.0, "chunks_per_sec": 0.0, "skipped": len(unchanged),
+                "deleted": len(stale), "upserted": 0, "failed": 0, "upsert_seconds": 0.0}
+
+    model = get_model()
+    upsert_queue = queue.Queue(maxsize=queue_depth)
+    stats = {"upserted": 0, "failed": 0, "upsert_seconds": 0.0}
+    stats_lock = threading.Lock()
+
+    def upsert_worker():
+        while True:
+            item = upsert_queue.get()
+            if item is None:
+                break
+            batch_no, upsert_data = item
+            started = time.perf_counter()
+            try:
+                # 4. Store in Pinecone
+                index.upsert(vectors=upsert_data)
+                with stats_lock:
+                    stats["upserted"] += len(upsert_data)
+                    # Only record chunks Pinecone actually accepted
+                    for chunk_id, _, _ in upsert_data:
+                        manifest[chunk_id] = {"hash": current_hashes[chunk_id], "model": INGEST_EMBED_MODEL}
+                print(f"Upserted {len(upsert_data)} vectors from batch {batch_no}")
+            except Exception as e:
+                with stats_lock:
+                    stats["failed"] += len(upsert_data)
+                print(f"❌ Upsert failed for batch {batch_no}: {e}")
+            finally:
+                with stats_lock:
+                    stats["upsert_seconds"] += time.perf_counter() - started
+
+    workers = [threading.Thread(target=upsert_worker, daemon=True) for _ in range(max(1, upsert_workers))]
+    for worker in workers:
+        worker.start()
+
+    started = time.perf_counter()
+    encode_seconds = 0.0
+    try:
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+
+            # 3. Generate embeddings locally, one forward pass sequence per batch
+            encode_started = time.perf_counter()
+            embeddings = model.encode(
+                [chunk["content"] for chunk in batch],
+                batch_size=min(batch_size, ENCODE_BATCH_SIZE),
+                convert_to_numpy=True
+            )
+            encode_seconds += time.perf_counter() - encode_started
+
+            # Text stays in data/chunks (served by content_store); metadata only carries filterable tags
+            upsert_data = [
+                (chunk["chunk_id"], embedding.tolist(), chunk["metadata"])
+                for chunk, embedding in zip(batch, embeddings)
+            ]
+
+            # Blocks when the upsert workers fall behind (bounded pipeline)
+            upsert_queue.put((i // batch_size + 1, upsert_data))
+    finally:
+        for _ in workers:
+            upsert_queue.put(None)
+        for worker in workers:
+            worker.join()
+        save_manifest(manifest_path, manifest)
+
+    elapsed = time.perf_counter() - started
+    processed = stats["upserted"] + stats["failed"]
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    print(
+        f"✅ Ingestion done in {elapsed:.1f}s: {stats['upserted']} upserted, {len(unchanged)} unchanged, "
+        f"{len(stale)} deleted, {stats['failed']} failed -> {rate:.1f} chunks/sec "
+        f"(encode {encode_seconds:.1f}s, upsert {stats['upsert_seconds']:.1f}s across workers)"
+    )
+    return {"elapsed_seconds": elapsed, "chunks_per_sec": rate, "skipped": len(unchanged),
+            "deleted": len(stale), **stats}
+
+def build_local_index(chunks_dir="data/chunks", index_dir=LOCAL_INDEX_DIR, dedup=True):
+    """
+    Emits the memory-mapped index used by VECTOR_BACKEND=local.
+    Passages are embedded with Pinecone Inference so they live in the same space as main.py's queries.
+    Rows for chunks whose manifest hash is unchanged are copied from the previous index.
+    """
+    if not os.path.exists(chunks_dir):
+        print(f"Error: Directory {chunks_dir} not found.")
+        return
+
+    chunks = load_deduped_chunks(chunks_dir, dedup)
+    manifest_path = os.path.join(index_dir, "manifest.json")
+    manifest = load_manifest(manifest_path)
+    pending, unchanged, stale, current_hashes = diff_chunks(chunks, manifest, LOCAL_EMBED_MODEL)
+
+    previous_rows = {}
+    if unchanged:
+        try:
+            previous = LocalVectorIndex(index_dir)
+            # Copy rows out of the mmap so the file can be overwritten below
+            previous_rows = {chunk_id: previous.embeddings[i].tolist() for i, chunk_id in enumerate(previous.ids)}
+            del previous
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Previous local index unreadable ({e}), re-embedding everything")
+            pending, unchanged = chunks, []
+
+    # Manifest says unchanged but the row is missing -> embed it again
+    pending_ids = {chunk["chunk_id"] for chunk in pending}
+    for chunk in chunks:
+        if chunk["chunk_id"] not in pending_ids and chunk["chunk_id"] not in previous_rows:
+            pending.append(chunk)
+            pending_ids.add(chunk["chunk_id"])
+    print(f"Embedding {len(pending)} of {len(chunks)} chunks with {LOCAL_EMBED_MODEL} ({len(stale)} removed)...")
+
+    new_rows = {}
+    for i in range(0, len(pending), LOCAL_EMBED_BATCH):
+        batch = pending[i:i + LOCAL_EMBED_BATCH]
+        res = pc.inference.embed(
+            model=LOCAL_EMBED_MODEL,
+            inputs=[chunk["content"] for chunk in batch],
+            parameters={"input_type": "passage", "truncate": "END"}
+        )
+        for chunk, item in zip(batch, res):
+            new_rows[chunk["chunk_id"]] = item.values
+        print(f"Embedded batch {i//LOCAL_EMBED_BATCH + 1} ({len(batch)} chunks)")
+
+    embeddings = [
+        new_rows[chunk["chunk_id"]] if chunk["chunk_id"] in new_rows else previous_rows[chunk["chunk_id"]]
+        for chunk in chunks
+    ]
+
+    write_local_index(
+        ids=[chunk["chunk_id"] for chunk in chunks],
+        embeddings=embeddings,
+        metadatas=[chunk["metadata"] for chunk in chunks],
+        model=LOCAL_EMBED_MODEL,
+        index_dir=index_dir
+    )
+    save_manifest(manifest_path, {
+        chunk_id: {"hash": digest, "model": LOCAL_EMBED_MODEL}
+        for chunk_id, digest in current_hashes.items()
+    })
+    print(f"✅ Local index written to {index_dir}")
 
 if __name__ == "__main__":
-    process_and_store_chunks()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Embed data/chunks into a vector index.")
+    parser.add_argument("--backend", choices=["pinecone", "local"], default="pinecone",
+                        help="pinecone: upsert to the remote index, local: write the mmap index for VECTOR_BACKEND=local")
+    parser.add_argument("--chunks-dir", default="data/chunks")
+    parser.add_argument("--index-dir", default=LOCAL_INDEX_DIR)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE,
+                        help="Chunks encoded together and sent in one upsert")
+    parser.add_argument("--upsert-workers", type=int, default=UPSERT_WORKERS,
+                        help="Concurrent Pinecone upsert threads")
+    parser.add_argument("--queue-depth", type=int, default=PIPELINE_DEPTH,
+                        help="Encoded batches allowed to wait for an upsert worker")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Embed near-duplicate chunks separately instead of collapsing them")
+    args = parser.parse_args()
+
+    if args.backend == "local":
+        build_local_index(args.chunks_dir, args.index_dir, dedup=not args.no_dedup)
+    else:
+        process_and_store_chunks(args.chunks_dir, args.batch_size, args.upsert_workers, args.queue_depth,
+                                 dedup=not args.no_dedup)
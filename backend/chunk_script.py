@@ -1,61 +1,238 @@
 import os
 import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+from schemes import scheme_ids_for_source
 
-def batch_process_markdowns(input_dir="data/markdowns", output_dir="data/chunks"):
-    # 1. Ensure the output directory exists
-    os.makedirs(output_dir, exist_ok=True)
+# Splitter settings; part of every markdown hash so changing them re-chunks everything
+HEADERS_TO_SPLIT_ON = [
+    ("#", "Header 1"),
+    ("##", "Header 2"),
+    ("###", "Header 3"),
+]
+CHUNK_SIZE = 1200
+CHUNK_OVERLAP = 150
+SEPARATORS = ["\n\n", "\n", ".", " ", ""]
+
+CHUNK_MANIFEST_FILE = ".chunk_manifest.json"
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", str(os.cpu_count() or 1)))
+SIDE_EMBED_MODEL = os.getenv("SIDE_EMBED_MODEL", "all-MiniLM-L6-v2")
+
+_splitters = None
+
+
+def get_splitters():
+    # Built once per process (each pool worker gets its own pair)
+    global _splitters
+    if _splitters is None:
+        _splitters = (
+            MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS_TO_SPLIT_ON),
+            RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                separators=SEPARATORS
+            )
+        )
+    return _splitters
 
-    # 2. Define the markdown hierarchy
-    headers_to_split_on = [
-        ("#", "Header 1"),
-        ("##", "Header 2"),
-        ("###", "Header 3"),
+
+def split_markdown(markdown_document, filename):
+    """Header split, then character split. Returns chunk dicts in the data/chunks shape."""
+    markdown_splitter, text_splitter = get_splitters()
+
+    # Perform the semantic split
+    md_header_splits = markdown_splitter.split_text(markdown_document)
+
+    # Add generic metadata (you can expand this logic if needed)
+    scheme_ids = scheme_ids_for_source(filename)
+    for split in md_header_splits:
+        split.metadata["source_document"] = filename
+        # Canonical SCHEME_REGISTRY ids so retrieval can be scoped to one scheme
+        if scheme_ids:
+            split.metadata["scheme_ids"] = scheme_ids
+
+    # Perform the secondary character-based split
+    final_chunks = text_splitter.split_documents(md_header_splits)
+
+    return [
+        {
+            "chunk_id": f"{filename.replace('.md', '')}_chunk_{index}",
+            "content": chunk.page_content,
+            "metadata": chunk.metadata
+        }
+        for index, chunk in enumerate(final_chunks)
     ]
 
-    markdown_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers_to_split_on)
-    
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1200,
-        chunk_overlap=150, 
-        separators=["\n\n", "\n", ".", " ", ""]
-    )
 
-    # 3. Iterate through all .md files
+def batch_process_markdowns(input_dir="data/markdowns", output_dir="data/chunks"):
+    # 1. Ensure the output directory exists
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 2. Iterate through all .md files
     for filename in os.listdir(input_dir):
         if filename.endswith(".md"):
             file_path = os.path.join(input_dir, filename)
-            
+
             with open(file_path, 'r', encoding='utf-8') as f:
                 markdown_document = f.read()
 
-            # Perform the semantic split
-            md_header_splits = markdown_splitter.split_text(markdown_document)
-
-            # Add generic metadata (you can expand this logic if needed)
-            for split in md_header_splits:
-                split.metadata["source_document"] = filename
-
-            # Perform the secondary character-based split
-            final_chunks = text_splitter.split_documents(md_header_splits)
-
-            # 4. Prepare the data for JSON serialization
-            chunks_data = []
-            for index, chunk in enumerate(final_chunks):
-                chunks_data.append({
-                    "chunk_id": f"{filename.replace('.md', '')}_chunk_{index}",
-                    "content": chunk.page_content,
-                    "metadata": chunk.metadata
-                })
+            chunks_data = split_markdown(markdown_document, filename)
 
-            # 5. Save the chunks to a JSON file in the output directory
+            # 3. Save the chunks to a JSON file in the output directory
             output_filename = filename.replace(".md", "_chunks.json")
             output_path = os.path.join(output_dir, output_filename)
-            
+
             with open(output_path, 'w', encoding='utf-8') as f:
                 json.dump(chunks_data, f, indent=4, ensure_ascii=False)
-            
-            print(f"✅ Processed {filename}: Generated {len(final_chunks)} chunks -> Saved to {output_filename}")
+
+            print(f"✅ Processed {filename}: Generated {len(chunks_data)} chunks -> Saved to {output_filename}")
+
+
+# ---------------------------------------------------------
+# Incremental mode: process pool + markdown hashes + JSONL
+# ---------------------------------------------------------
+# Only markdowns whose bytes (or the splitter settings) changed since the last run
+# are re-chunked, spread over a process pool. Each file becomes one compact
+# <stem>_chunks.jsonl (one chunk per line) and, with --embed, a
+# <stem>_embeddings.npy whose rows line up with the JSONL lines.
+
+def markdown_hash(file_path):
+    settings = json.dumps([HEADERS_TO_SPLIT_ON, CHUNK_SIZE, CHUNK_OVERLAP, SEPARATORS])
+    digest = hashlib.sha256(settings.encode("utf-8"))
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _chunk_file(file_path, filename):
+    # Pool worker: must stay a top-level function so it pickles
+    with open(file_path, "r", encoding="utf-8") as f:
+        return filename, split_markdown(f.read(), filename)
+
+
+def _output_paths(output_dir, filename):
+    stem = filename.replace(".md", "")
+    return (
+        os.path.join(output_dir, f"{stem}_chunks.jsonl"),
+        os.path.join(output_dir, f"{stem}_embeddings.npy"),
+        os.path.join(output_dir, f"{stem}_chunks.json"),
+    )
+
+
+def _write_jsonl(path, chunks):
+    # Write-then-rename so a crash never leaves a truncated chunk file behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def _load_chunk_manifest(output_dir):
+    path = os.path.join(output_dir, CHUNK_MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_chunk_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, CHUNK_MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+_side_model = None
+
+
+def _write_side_embeddings(path, chunks, model_name):
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    global _side_model
+    if _side_model is None:
+        print(f"Loading {model_name} for side embeddings...")
+        _side_model = SentenceTransformer(model_name)
+    embeddings = _side_model.encode([chunk["content"] for chunk in chunks], batch_size=64)
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, np.asarray(embeddings, dtype=np.float32))
+    os.replace(tmp_path, path)
+
+
+def incremental_process_markdowns(input_dir="data/markdowns", output_dir="data/chunks",
+                                  workers=CHUNK_WORKERS, embed=False, embed_model=SIDE_EMBED_MODEL):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _load_chunk_manifest(output_dir)
+
+    current = {}
+    pending = []
+    for filename in sorted(os.listdir(input_dir)):
+        if not filename.endswith(".md"):
+            continue
+        file_path = os.path.join(input_dir, filename)
+        digest = markdown_hash(file_path)
+        current[filename] = digest
+
+        jsonl_path, embeddings_path, _ = _output_paths(output_dir, filename)
+        entry = manifest.get(filename, {})
+        up_to_date = entry.get("hash") == digest and os.path.exists(jsonl_path)
+        if embed:
+            up_to_date = up_to_date and entry.get("embed_model") == embed_model and os.path.exists(embeddings_path)
+        if not up_to_date:
+            pending.append((file_path, filename))
+
+    # Markdowns that disappeared take their outputs with them
+    for filename in [name for name in manifest if name not in current]:
+        for path in _output_paths(output_dir, filename)[:2]:
+            if os.path.exists(path):
+                os.remove(path)
+        del manifest[filename]
+        print(f"🗑️ Removed chunks for deleted {filename}")
+
+    print(f"📄 {len(current)} markdowns: {len(pending)} to chunk, {len(current) - len(pending)} unchanged")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as pool:
+            futures = [pool.submit(_chunk_file, file_path, filename) for file_path, filename in pending]
+            # Write each file as soon as its worker finishes instead of waiting for the whole batch
+            for future in as_completed(futures):
+                filename, chunks = future.result()
+                jsonl_path, embeddings_path, legacy_path = _output_paths(output_dir, filename)
+                _write_jsonl(jsonl_path, chunks)
+                # The old pretty-printed file would otherwise be loaded twice
+                if os.path.exists(legacy_path):
+                    os.remove(legacy_path)
+
+                entry = {"hash": current[filename], "chunks": len(chunks)}
+                if embed:
+                    _write_side_embeddings(embeddings_path, chunks, embed_model)
+                    entry["embed_model"] = embed_model
+                manifest[filename] = entry
+                # Saved per file so an interrupted run keeps the work it finished
+                _save_chunk_manifest(output_dir, manifest)
+                print(f"✅ Processed {filename}: Generated {len(chunks)} chunks -> Saved to {os.path.basename(jsonl_path)}")
+
+    _save_chunk_manifest(output_dir, manifest)
+    return {"markdowns": len(current), "chunked": len(pending), "skipped": len(current) - len(pending)}
+
 
 if __name__ == "__main__":
-    batch_process_markdowns()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Split guideline markdowns into retrieval chunks.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Parallel, hash-skipping run that writes compact JSONL")
+    parser.add_argument("--workers", type=int, default=CHUNK_WORKERS)
+    parser.add_argument("--embed", action="store_true",
+                        help=f"With --incremental, also write <stem>_embeddings.npy ({SIDE_EMBED_MODEL})")
+    parser.add_argument("--input-dir", default="data/markdowns")
+    parser.add_argument("--output-dir", default="data/chunks")
+    args = parser.parse_args()
+
+    if args.incremental:
+        incremental_process_markdowns(args.input_dir, args.output_dir, workers=args.workers, embed=args.embed)
+    else:
+        batch_process_markdowns(args.input_dir, args.output_dir)
@@ -0,0 +1,70 @@
+import os
+import json
+from schemes import tag_chunk_schemes
+
+# ---------------------------------------------------------
+# Chunk Content Store
+# ---------------------------------------------------------
+# Chunk text lives here, loaded once at startup from data/chunks, instead of
+# inside Pinecone metadata. Vector queries only return ids + scores, which
+# keeps query payloads tiny and lets us fix text without re-upserting vectors.
+CHUNKS_DIR = os.getenv(
+    "CHUNKS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "chunks")
+)
+
+
+def load_chunks(chunks_dir=CHUNKS_DIR):
+    """
+    Reads every *_chunks.json / *_chunks.jsonl file (sorted for stable ordering) and backfills scheme tags.
+    When `chunk_script.py --incremental` has written a .jsonl for a document, its old .json is ignored.
+    """
+    filenames = sorted(os.listdir(chunks_dir))
+    jsonl_stems = {name[:-len(".jsonl")] for name in filenames if name.endswith("_chunks.jsonl")}
+
+    chunks = []
+    for filename in filenames:
+        path = os.path.join(chunks_dir, filename)
+        if filename.endswith("_chunks.jsonl"):
+            with open(path, "r", encoding="utf-8") as f:
+                chunks.extend(tag_chunk_schemes(json.loads(line)) for line in f if line.strip())
+        elif filename.endswith(".json") and filename[:-len(".json")] not in jsonl_stems \
+                and not filename.startswith("."):
+            with open(path, "r", encoding="utf-8") as f:
+                chunks.extend(tag_chunk_schemes(chunk) for chunk in json.load(f))
+    return chunks
+
+
+class ContentStore:
+    """chunk_id -> text/metadata lookups backed by parallel lists (no per-chunk dict objects kept)."""
+
+    def __init__(self, chunks):
+        self.ids = [chunk["chunk_id"] for chunk in chunks]
+        self.contents = [chunk["content"] for chunk in chunks]
+        self.metadatas = [chunk.get("metadata", {}) for chunk in chunks]
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self._positions
+
+    def get(self, chunk_id, default=None):
+        position = self._positions.get(chunk_id)
+        return self.contents[position] if position is not None else default
+
+    def get_metadata(self, chunk_id):
+        position = self._positions.get(chunk_id)
+        return self.metadatas[position] if position is not None else {}
+
+    def chunks(self):
+        """Yields chunk dicts in the same shape as data/chunks (used to build the BM25 index)."""
+        for chunk_id, content, metadata in zip(self.ids, self.contents, self.metadatas):
+            yield {"chunk_id": chunk_id, "content": content, "metadata": metadata}
+
+
+def load_content_store(chunks_dir=CHUNKS_DIR):
+    store = ContentStore(load_chunks(chunks_dir))
+    print(f"Chunk content store loaded! ({len(store)} chunks)")
+    return store
@@ -0,0 +1,102 @@
+import os
+import re
+from dedup import dedup_texts
+
+# ---------------------------------------------------------
+# Token-Budgeted Context Assembly for RAG prompts
+# ---------------------------------------------------------
+# Every route used to paste all retrieved chunks into its prompt. Prompt size
+# drives time-to-first-token and cost, so each channel gets a token budget:
+# chunks go in by rank, duplicates are dropped, whitespace is squeezed, and
+# the last chunk that doesn't fit is cut at a sentence boundary.
+CHANNELS = {
+    # Phone calls want a 2-3 sentence answer; keep the prompt tiny
+    "ivr": {"budget": 350, "separator": "\n"},
+    "voice": {"budget": 700, "separator": "\n"},
+    "chat": {"budget": 1500, "separator": "\n\n---\n\n"},
+    "agent": {"budget": 1500, "separator": "\n\n---\n\n"},
+}
+# Per-channel override, e.g. CONTEXT_BUDGET_IVR=250
+for _channel, _settings in CHANNELS.items():
+    _settings["budget"] = int(os.getenv(f"CONTEXT_BUDGET_{_channel.upper()}", str(_settings["budget"])))
+
+MIN_PARTIAL_TOKENS = int(os.getenv("CONTEXT_MIN_PARTIAL_TOKENS", "40"))  # smaller leftovers aren't worth a fragment
+
+_DEVANAGARI = re.compile(r"[\u0900-\u097F]")
+_SENTENCE_END = re.compile(r"(?<=[.!?\u0964])\s")
+
+
+def estimate_tokens(text):
+    """
+    Tokenizer-free estimate: ~4 chars per token for Latin text, ~2 for Devanagari
+    (Indic scripts split into far more tokens in the Llama/Sarvam vocabularies).
+    """
+    if not text:
+        return 0
+    devanagari = len(_DEVANAGARI.findall(text))
+    return (len(text) - devanagari + 3) // 4 + (devanagari + 1) // 2
+
+
+def compact(text):
+    """Drops the blank lines and runs of spaces PDF extraction leaves behind."""
+    lines = (re.sub(r"[ \t]+", " ", line).strip() for line in (text or "").splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _trim_to_tokens(text, max_tokens):
+    """Longest sentence-aligned prefix within max_tokens (falls back to a hard cut)."""
+    sentence_ends = [m.start() for m in _SENTENCE_END.finditer(text)]
+    best = ""
+    for end in sentence_ends:
+        if estimate_tokens(text[:end]) > max_tokens:
+            break
+        best = text[:end]
+    if best:
+        return best
+    # No sentence fits: cut on a word boundary instead
+    words, kept = text.split(" "), []
+    for word in words:
+        if estimate_tokens(" ".join(kept + [word])) > max_tokens:
+            break
+        kept.append(word)
+    return " ".join(kept)
+
+
+def assemble_context(chunks, channel="chat", budget=None):
+    """
+    Builds the facts string for a prompt from ranked chunk texts.
+    Returns {"text", "tokens", "budget", "chunks_used", "chunks_total", "truncated"}.
+    """
+    settings = CHANNELS.get(channel, CHANNELS["chat"])
+    budget = budget if budget is not None else settings["budget"]
+    separator = settings["separator"]
+    separator_tokens = estimate_tokens(separator)
+
+    candidates = [c for c in (compact(chunk) for chunk in dedup_texts(chunks or [])) if c]
+    parts, used, truncated = [], 0, False
+    for text in candidates:
+        cost = estimate_tokens(text) + (separator_tokens if parts else 0)
+        if used + cost <= budget:
+            parts.append(text)
+            used += cost
+            continue
+        # Budget nearly spent: one sentence-trimmed fragment, then stop (rank order matters more than fill)
+        remaining = budget - used - (separator_tokens if parts else 0)
+        if remaining >= MIN_PARTIAL_TOKENS:
+            fragment = _trim_to_tokens(text, remaining)
+            if fragment:
+                parts.append(fragment)
+                used += estimate_tokens(fragment) + (separator_tokens if len(parts) > 1 else 0)
+        truncated = True
+        break
+
+    print(f"📏 Context [{channel}]: {len(parts)}/{len(candidates)} chunks, ~{used}/{budget} tokens"
+          + (" (trimmed)" if truncated else ""))
+    return {
+        "text": separator.join(parts),
+        "tokens": used,
+        "budget": budget,
+        "chunks_used": len(parts),
+        "chunks_total": len(candidates),
+        "truncated": truncated,
+    }
@@ -0,0 +1,156 @@
+import os
+import re
+import zlib
+import numpy as np
+from collections import defaultdict
+
+# ---------------------------------------------------------
+# Near-Duplicate Chunk Detection (MinHash over word shingles)
+# ---------------------------------------------------------
+# The splitter's 150-char overlap and paragraphs repeated across the PMAY-G / PMAY-U
+# guidelines produce chunks that say the same thing. At index time
+# (build_vector_db.py) near-duplicates collapse into one representative that keeps
+# back-references to every source; at query time (main.py) overlapping hits are
+# dropped before the context string is built.
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))                # Jaccard, index time
+RESULT_DEDUP_THRESHOLD = float(os.getenv("RESULT_DEDUP_THRESHOLD", "0.6"))  # coverage, query time
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+LSH_BANDS = 16  # 16 bands x 4 rows: pairs above ~0.6 Jaccard almost always share a band
+
+_WORD_PATTERN = re.compile(r"[\w\u0900-\u097F]+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of hashed word k-shingles; short texts fall back to a single shingle of all their words."""
+    words = _WORD_PATTERN.findall((text or "").lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash_signature(shingle_set):
+    if not shingle_set:
+        return np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    hashes = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+    # (a*h + b) mod p for every permutation at once; crc32 and a < 2^31 keep a*h inside uint64
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def coverage(a, b):
+    """Share of `a` already present in `b` (1.0 when a's shingles are all inside b)."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a)
+
+
+def _candidate_pairs(signatures):
+    rows = NUM_PERM // LSH_BANDS
+    pairs = set()
+    for band in range(LSH_BANDS):
+        buckets = defaultdict(list)
+        for i, signature in enumerate(signatures):
+            buckets[signature[band * rows:(band + 1) * rows].tobytes()].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def dedup_chunks(chunks, threshold=DEDUP_THRESHOLD):
+    """
+    Collapses near-duplicate chunks (shingle Jaccard >= threshold) into the first one seen.
+    The survivor's metadata gets the union of scheme_ids plus `source_documents` and
+    `duplicate_ids` listing every collapsed chunk, so scoped search and citations still
+    cover all sources. Returns (kept_chunks, {duplicate_id: kept_id}).
+    """
+    shingle_sets = [shingles(chunk["content"]) for chunk in chunks]
+    signatures = [minhash_signature(s) for s in shingle_sets]
+
+    # Union-find over LSH candidates that really are similar (verified on the exact shingle sets)
+    parent = list(range(len(chunks)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for x, y in sorted(_candidate_pairs(signatures)):
+        if jaccard(shingle_sets[x], shingle_sets[y]) >= threshold:
+            root_x, root_y = find(x), find(y)
+            if root_x != root_y:
+                # Lower index wins so the survivor is stable across runs
+                parent[max(root_x, root_y)] = min(root_x, root_y)
+
+    groups = defaultdict(list)
+    for i in range(len(chunks)):
+        groups[find(i)].append(i)
+
+    kept = []
+    duplicate_of = {}
+    for i, chunk in enumerate(chunks):
+        members = groups.get(i)
+        if members is None:
+            continue
+        if len(members) == 1:
+            kept.append(chunk)
+            continue
+
+        metadata = dict(chunk.get("metadata", {}))
+        sources, scheme_ids = [], []
+        for member in members:
+            member_meta = chunks[member].get("metadata", {})
+            source = member_meta.get("source_document")
+            if source and source not in sources:
+                sources.append(source)
+            for scheme_id in member_meta.get("scheme_ids", []):
+                if scheme_id not in scheme_ids:
+                    scheme_ids.append(scheme_id)
+        if scheme_ids:
+            metadata["scheme_ids"] = scheme_ids
+        metadata["source_documents"] = sources
+        metadata["duplicate_ids"] = [chunks[member]["chunk_id"] for member in members[1:]]
+        for member in members[1:]:
+            duplicate_of[chunks[member]["chunk_id"]] = chunk["chunk_id"]
+        kept.append({**chunk, "metadata": metadata})
+
+    return kept, duplicate_of
+
+
+def dedup_texts(texts, threshold=RESULT_DEDUP_THRESHOLD):
+    """
+    Drops hits that mostly repeat a higher-ranked hit. When a lower-ranked hit instead
+    contains a higher-ranked fragment, the fuller text takes the fragment's rank.
+    """
+    kept, kept_shingles = [], []
+    for text in texts:
+        text_shingles = shingles(text)
+        redundant = False
+        for i, seen in enumerate(kept_shingles):
+            if coverage(text_shingles, seen) >= threshold:
+                redundant = True
+                break
+            if coverage(seen, text_shingles) >= threshold:
+                kept[i], kept_shingles[i] = text, text_shingles
+                redundant = True
+                break
+        if not redundant:
+            kept.append(text)
+            kept_shingles.append(text_shingles)
+    return kept
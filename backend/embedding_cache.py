@@ -0,0 +1,83 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+# ---------------------------------------------------------
+# Query-Embedding Cache (sits in front of pc.inference.embed)
+# ---------------------------------------------------------
+# IVR and voice callers repeat the same handful of questions, so a small
+# LRU with a TTL removes most embedding round trips.
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+EMBED_CACHE_TTL = float(os.getenv("EMBED_CACHE_TTL", "86400"))  # seconds
+
+
+def normalize_query(text):
+    """Case-folds and collapses whitespace so trivially different phrasings share a key."""
+    return re.sub(r"\s+", " ", text or "").strip().casefold()
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU + TTL cache keyed on (model, normalized query).
+    Thread-safe: high_quality_search runs inside the default executor.
+    """
+
+    def __init__(self, max_size=EMBED_CACHE_SIZE, ttl_seconds=EMBED_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, model, text):
+        return (model, normalize_query(text))
+
+    def get(self, model, text):
+        key = self._key(model, text)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, embedding = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, model, text, embedding):
+        if self.max_size <= 0:
+            return
+        key = self._key(model, text)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -1,31 +1,148 @@
+import os
 import re
+import argparse
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def auto_add_markdown_headers(input_filepath, output_filepath):
-    with open(input_filepath, 'r', encoding='utf-8') as f:
-        text = f.read()
+# ---------------------------------------------------------
+# Markdown header formatter for extracted guideline text
+# ---------------------------------------------------------
+# Every line is classified once against a single precompiled alternation of the
+# family's header rules and streamed straight to the output file, so a
+# multi-hundred-page guideline formats in one linear pass with constant memory.
+#
+#   python format_md.py sauditg.md                   -> sauditg_formatted.md
+#   python format_md.py extracted/ --output-dir data/markdowns --workers 4
+FORMAT_WORKERS = int(os.getenv("FORMAT_WORKERS", str(os.cpu_count() or 1)))
+INPUT_EXTENSIONS = (".md", ".txt")
 
-    # 1. Level 3 Headers (e.g., "5.1.1 The BLC vertical...")
-    # Matches a digit, dot, digit, dot, digit, space, then text
-    text = re.sub(r'^(\d+\.\d+\.\d+\s.*)$', r'### \1', text, flags=re.MULTILINE)
+# A rule is (header level, regex). The regex must match the whole line (without its
+# newline) and put the header text in a group named "text". Rules are tried in
+# order, so the more specific numbering (5.1.1) comes before the less specific (5.1).
+NUMBERED_RULES = [
+    # Level 3 Headers (e.g., "5.1.1 The BLC vertical...")
+    (3, r"(?P<text>\d+\.\d+\.\d+\s.*)"),
+    # Level 2 Headers (e.g., "5.1 Beneficiary Led Construction (BLC)")
+    (2, r"(?P<text>\d+\.\d+\s[A-Za-z].*)"),
+    # Level 1 Headers (e.g., "1. Scope of PMAY-U 2.0")
+    (1, r"(?P<text>\d+\.\s[A-Za-z].*)"),
+]
 
-    # 2. Level 2 Headers (e.g., "5.1 Beneficiary Led Construction (BLC)")
-    # Matches a digit, dot, digit, space, then text
-    text = re.sub(r'^(\d+\.\d+\s[A-Za-z].*)$', r'## \1', text, flags=re.MULTILINE)
+ANNEXURE_RULE = (1, r"\s*(?P<text>Annexure-\w+)\s*")
 
-    # 3. Level 1 Headers (e.g., "1. Scope of PMAY-U 2.0")
-    # Matches a digit, dot, space, then text
-    text = re.sub(r'^(\d+\.\s[A-Za-z].*)$', r'# \1', text, flags=re.MULTILINE)
+RULE_SETS = {
+    # PMAY-U style guidelines (the original rule set)
+    "default": NUMBERED_RULES + [
+        (1, r"\s*(?P<text>Definitions for the purpose of the Mission)\s*"),
+        (1, r"\s*(?P<text>Abbreviations)\s*"),
+        ANNEXURE_RULE,
+    ],
+    # RHISS: "Scheme" instead of "Mission", acronyms under their own heading
+    "rhiss": NUMBERED_RULES + [
+        (1, r"\s*(?P<text>Definitions for the Purposes of the Scheme)\s*"),
+        (1, r"\s*(?P<text>LIST OF ACRONYMS)\s*"),
+        ANNEXURE_RULE,
+    ],
+    # Social audit guidelines number their sections "2.1.DEFINITION OF SOCIAL AUDIT"
+    "social_audit": [
+        (1, r"(?P<text>\d+\.\d+\.\s?[A-Z][A-Z ,&()-]+)"),
+    ] + NUMBERED_RULES + [ANNEXURE_RULE],
+}
 
-    # 4. Special Top-Level Sections (Definitions, Abbreviations, Annexures)
-    text = re.sub(r'^\s*(Definitions for the purpose of the Mission)\s*$', r'# \1', text, flags=re.MULTILINE)
-    text = re.sub(r'^\s*(Abbreviations)\s*$', r'# \1', text, flags=re.MULTILINE)
-    text = re.sub(r'^\s*(Annexure-\w+)\s*$', r'# \1', text, flags=re.MULTILINE)
+# Filename prefix -> rule set; anything else uses "default"
+FAMILY_BY_PREFIX = {
+    "rhiss": "rhiss",
+    "saudit": "social_audit",
+}
 
-    # Save the formatted text
-    with open(output_filepath, 'w', encoding='utf-8') as f:
-        f.write(text)
-    
-    print(f"Formatting complete! Saved to {output_filepath}")
 
-# Run it on your file
-auto_add_markdown_headers('sauditg.md', 'sauditg_formatted.md')
\ No newline at end of file
+def family_for(filename):
+    name = os.path.basename(filename).lower()
+    for prefix, family in FAMILY_BY_PREFIX.items():
+        if name.startswith(prefix):
+            return family
+    return "default"
+
+
+@lru_cache(maxsize=None)
+def compile_rules(family="default"):
+    """One regex for the whole rule set; the name of the matched group says which rule fired."""
+    rules = RULE_SETS[family]
+    branches = [pattern.replace("(?P<text>", f"(?P<r{i}>") for i, (_, pattern) in enumerate(rules)]
+    combined = re.compile("|".join(f"(?:{branch})" for branch in branches))
+    levels = {f"r{i}": level for i, (level, _) in enumerate(rules)}
+    return combined, levels
+
+
+def format_line(line, compiled):
+    """Returns the line with a markdown header prefix if a rule matches, else unchanged."""
+    combined, levels = compiled
+    body = line.rstrip("\r\n")
+    # Lines that already carry a header are left alone (re-running is a no-op)
+    if not body or body.startswith("#"):
+        return line
+    match = combined.fullmatch(body)
+    if match is None:
+        return line
+    group = match.lastgroup
+    newline = line[len(body):]
+    return f"{'#' * levels[group]} {match.group(group)}{newline}"
+
+
+def auto_add_markdown_headers(input_filepath, output_filepath, family=None):
+    compiled = compile_rules(family or family_for(input_filepath))
+    headers = 0
+    # Stream line by line: memory stays flat however long the guideline is
+    with open(input_filepath, 'r', encoding='utf-8') as src, open(output_filepath, 'w', encoding='utf-8') as dst:
+        for line in src:
+            formatted = format_line(line, compiled)
+            if formatted is not line:
+                headers += 1
+            dst.write(formatted)
+
+    print(f"Formatting complete! Saved to {output_filepath} ({headers} headers)")
+    return headers
+
+
+def formatted_path_for(input_filepath, output_dir=None):
+    stem = os.path.splitext(os.path.basename(input_filepath))[0]
+    return os.path.join(output_dir or os.path.dirname(input_filepath), f"{stem}_formatted.md")
+
+
+def format_directory(input_dir, output_dir=None, family=None, workers=FORMAT_WORKERS):
+    """Formats every extracted .md/.txt in input_dir in parallel. Returns {filename: header_count}."""
+    output_dir = output_dir or input_dir
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [
+        os.path.join(input_dir, name) for name in sorted(os.listdir(input_dir))
+        # Re-running on a directory shouldn't format its own outputs again
+        if name.endswith(INPUT_EXTENSIONS) and not name.endswith("_formatted.md")
+    ]
+    if not jobs:
+        return {}
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        futures = {
+            pool.submit(auto_add_markdown_headers, path, formatted_path_for(path, output_dir), family): path
+            for path in jobs
+        }
+        for future in as_completed(futures):
+            results[os.path.basename(futures[future])] = future.result()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add markdown headers to extracted guideline text.")
+    parser.add_argument("input", help="A .md/.txt file or a directory of them")
+    parser.add_argument("--output", help="Output file (single-file mode)")
+    parser.add_argument("--output-dir", help="Output directory (directory mode, defaults to the input directory)")
+    parser.add_argument("--family", choices=sorted(RULE_SETS),
+                        help="Rule set to use (default: picked from each filename)")
+    parser.add_argument("--workers", type=int, default=FORMAT_WORKERS)
+    args = parser.parse_args()
+
+    if os.path.isdir(args.input):
+        format_directory(args.input, args.output_dir, family=args.family, workers=args.workers)
+    else:
+        auto_add_markdown_headers(args.input, args.output or formatted_path_for(args.input), family=args.family)
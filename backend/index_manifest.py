@@ -0,0 +1,66 @@
+import os
+import json
+import hashlib
+
+# ---------------------------------------------------------
+# Index Manifest: chunk_id -> content hash -> embedding model
+# ---------------------------------------------------------
+# Lets build_vector_db.py re-embed only new/edited chunks and delete vanished
+# ones without asking Pinecone what it already has.
+MANIFEST_DIR = os.getenv(
+    "MANIFEST_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "manifests")
+)
+
+
+def chunk_hash(chunk):
+    """Hash of everything we upsert for a chunk (text + metadata), so edits to either are picked up."""
+    payload = json.dumps(
+        {"content": chunk["content"], "metadata": chunk.get("metadata", {})},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def manifest_path_for(index_name, manifest_dir=MANIFEST_DIR):
+    return os.path.join(manifest_dir, f"{index_name}.json")
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("chunks", {})
+
+
+def save_manifest(path, entries):
+    # Write-then-rename so an interrupted run never leaves a half-written manifest
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"chunks": entries}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def diff_chunks(chunks, manifest, model):
+    """
+    Compares the current chunk set against the manifest.
+    Returns (changed_chunks, unchanged_ids, stale_ids, current_hashes).
+    A chunk is "changed" if it is new, its hash moved, or it was embedded with another model.
+    """
+    current_hashes = {}
+    changed = []
+    unchanged = []
+    for chunk in chunks:
+        chunk_id = chunk["chunk_id"]
+        digest = chunk_hash(chunk)
+        current_hashes[chunk_id] = digest
+        entry = manifest.get(chunk_id)
+        if entry and entry.get("hash") == digest and entry.get("model") == model:
+            unchanged.append(chunk_id)
+        else:
+            changed.append(chunk)
+
+    stale = [chunk_id for chunk_id in manifest if chunk_id not in current_hashes]
+    return changed, unchanged, stale, current_hashes
@@ -0,0 +1,173 @@
+import os
+import re
+import threading
+from schemes import SCHEME_REGISTRY
+
+# ---------------------------------------------------------
+# Rule-Based Intent + Scheme Classifier
+# ---------------------------------------------------------
+# Most agent / voice messages name their scheme outright ("Jan Dhan", "PMAY-G",
+# "ग्रामीण आवास") and carry an obvious apply/query cue, so an in-process match
+# answers them in microseconds. Only messages below INTENT_CONFIDENCE_THRESHOLD
+# ("haan ji", "yes please", a housing question with no scheme) go to the LLM.
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7"))
+
+_TOKEN_PATTERN = re.compile(r"[\w\u0900-\u097F]+(?:\.\d+)*")
+
+# Names that don't say rural vs urban; the LLM prompt maps plain "PM Awas Yojana" to PMAY-G too
+GENERIC_ALIASES = {
+    "pmay": "pmay-g",
+    "pm awas": "pmay-g",
+    "pm awas yojana": "pmay-g",
+    "awas yojana": "pmay-g",
+    "pradhan mantri awas yojana": "pmay-g",
+    "pradhan mantri awaas yojana": "pmay-g",
+    "housing scheme": "pmay-g",
+    "आवास योजना": "pmay-g",
+    "प्रधानमंत्री आवास योजना": "pmay-g",
+    "पीएम आवास योजना": "pmay-g",
+}
+GENERIC_SCHEME_CONFIDENCE = 0.6
+
+# Words that mean "this is about some scheme" even though none is named
+_SCHEME_HINTS = re.compile(
+    r"\b(yojana|scheme|house|housing|ghar|makan|awas|account|khata|subsidy)\b|योजना|घर|मकान|आवास|खाता",
+    re.IGNORECASE
+)
+
+# (pattern, weight). Asking *how* to apply is a question, so it is a query cue and wins over "apply".
+QUERY_CUES = [
+    (r"\bhow (?:do|can|to|should) (?:i |we )?apply\b|\bapply kaise\b|kaise apply|आवेदन कैसे", 3.0),
+    (r"\b(?:what|which|who|when|where|why|how|is|are|does|do|can)\b", 1.0),
+    (r"\b(?:tell me|explain|details?|eligib\w*|documents?|benefits?|overview|information|info)\b", 1.0),
+    (r"\b(?:kya|kaise|kaun|kise|kisko|kitna|kitne|kitni|kab|kahan|kyun|batao|bataiye|jankari)\b", 1.0),
+    (r"क्या|कैसे|कौन|किसे|किसको|कितना|कितने|कितनी|कब|कहाँ|क्यों|बताइए|बताओ|जानकारी|पात्रता", 1.0),
+    (r"\?", 1.0),
+]
+APPLY_CUES = [
+    (r"\b(?:i|we) (?:want|would like|wish|need) to (?:apply|register|enroll|submit)\b", 3.0),
+    (r"\b(?:help me|please) (?:apply|register|enroll|submit)\b|\bapply for me\b", 3.0),
+    (r"\bapply (?:karna|karni|karvana|kar do|kardo|karo|karenge|karunga|karungi)\b", 3.0),
+    (r"आवेदन (?:करना|करें|कर दो|करवाना|करूँ|करूंगा|करूंगी)|अप्लाई", 3.0),
+    (r"\b(?:apply|register|enroll|enrol|submit|sign up|signup|avedan)\b", 2.0),
+    (r"\b(?:fill (?:the |my )?form|start (?:my |the )?application)\b", 2.0),
+]
+
+
+def _compile(cues):
+    return [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in cues]
+
+
+def _tokens(text):
+    return _TOKEN_PATTERN.findall((text or "").lower().replace("-", " "))
+
+
+class AliasTrie:
+    """Token-level trie: longest alias match at each position, so "rural housing interest subsidy" beats "rural housing"."""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, alias, value):
+        node = self.root
+        for token in _tokens(alias):
+            node = node.setdefault(token, {})
+        node[None] = value
+
+    def find_all(self, text):
+        tokens = _tokens(text)
+        found = []
+        i = 0
+        while i < len(tokens):
+            node, match, match_end = self.root, None, i
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if None in node:
+                    match, match_end = node[None], j + 1
+            if match is not None:
+                found.append(match)
+                i = match_end
+            else:
+                i += 1
+        return found
+
+
+class IntentClassifier:
+    def __init__(self, registry=SCHEME_REGISTRY, threshold=INTENT_CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+        self.trie = AliasTrie()
+        for scheme_id, info in registry.items():
+            # The canonical id and the display name count as aliases too
+            for alias in [scheme_id, info.get("name", "")] + info.get("aliases", []):
+                if alias:
+                    self.trie.add(alias, (scheme_id, 1.0))
+        for alias, scheme_id in GENERIC_ALIASES.items():
+            if scheme_id in registry:
+                self.trie.add(alias, (scheme_id, GENERIC_SCHEME_CONFIDENCE))
+        self.query_cues = _compile(QUERY_CUES)
+        self.apply_cues = _compile(APPLY_CUES)
+
+        self._lock = threading.Lock()
+        self.total = 0
+        self.rule_answers = 0
+        self.llm_fallbacks = 0
+
+    def _score(self, cues, text):
+        return sum(weight for pattern, weight in cues if pattern.search(text))
+
+    def _classify_scheme(self, text):
+        matches = self.trie.find_all(text)
+        strongest = {}
+        for scheme_id, confidence in matches:
+            strongest[scheme_id] = max(confidence, strongest.get(scheme_id, 0.0))
+        if not strongest:
+            # "ghar ke liye yojana" names no scheme but clearly means one; let the LLM pick
+            return None, (0.5 if _SCHEME_HINTS.search(text) else 0.9)
+        explicit = [s for s, c in strongest.items() if c >= 1.0]
+        if len(explicit) == 1:
+            return explicit[0], 1.0
+        if len(explicit) > 1:
+            # Comparing two schemes: a specific answer needs the LLM
+            return explicit[0], 0.5
+        scheme_id = max(strongest, key=strongest.get)
+        return scheme_id, strongest[scheme_id]
+
+    def _classify_intent(self, text):
+        query_score = self._score(self.query_cues, text)
+        apply_score = self._score(self.apply_cues, text)
+        if query_score == apply_score:
+            # No cues at all ("yes", "haan ji") or a genuine tie
+            return "query", 0.4
+        intent = "apply" if apply_score > query_score else "query"
+        margin = abs(apply_score - query_score)
+        return intent, min(0.95, 0.6 + 0.15 * margin)
+
+    def classify(self, text):
+        """Returns {"intent", "scheme_id", "confidence"}; confidence is the weaker of the two decisions."""
+        intent, intent_confidence = self._classify_intent(text or "")
+        scheme_id, scheme_confidence = self._classify_scheme(text or "")
+        return {
+            "intent": intent,
+            "scheme_id": scheme_id,
+            "confidence": round(min(intent_confidence, scheme_confidence), 3),
+        }
+
+    def record(self, used_llm):
+        with self._lock:
+            self.total += 1
+            if used_llm:
+                self.llm_fallbacks += 1
+            else:
+                self.rule_answers += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "requests": self.total,
+                "rule_answers": self.rule_answers,
+                "llm_fallbacks": self.llm_fallbacks,
+                "fallback_rate": round(self.llm_fallbacks / self.total, 4) if self.total else 0.0,
+            }
@@ -0,0 +1,358 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+import httpx
+from metrics import UPSTREAM_TTFB_SECONDS, METRICS_ENABLED, current_route, timed
+
+try:
+    import h2  # noqa: F401  (httpx only negotiates HTTP/2 when the h2 package is present)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# ---------------------------------------------------------
+# Async LLM / Speech Gateway (Sarvam + Groq)
+# ---------------------------------------------------------
+# The sarvamai / groq SDK calls are synchronous; made from an async route they
+# block the event loop and every other request on the worker waits. All chat,
+# speech-to-text and text-to-speech traffic goes through this module instead:
+# one pooled keep-alive httpx.AsyncClient per provider, per-call timeouts,
+# retries with backoff on 429/5xx/network errors, and a semaphore per provider
+# so a burst can't open hundreds of upstream requests at once.
+SARVAM_BASE_URL = os.getenv("SARVAM_BASE_URL", "https://api.sarvam.ai")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.5"))
+SARVAM_MAX_CONCURRENCY = int(os.getenv("SARVAM_MAX_CONCURRENCY", "16"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "16"))
+
+# ---- connection pool ----
+# One application-lifetime pool per provider: HTTP/2 multiplexes concurrent
+# streams over a single TLS connection, keep-alive spares the DNS/TCP/TLS
+# setup on every request, and warm-up opens the first connection at startup.
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1" and HTTP2_AVAILABLE
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "8"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "120"))
+HTTP_POOL_WARMUP = os.getenv("HTTP_POOL_WARMUP", "1") == "1"
+HTTP_POOL_WARMUP_CONNECTIONS = int(os.getenv("HTTP_POOL_WARMUP_CONNECTIONS", "1" if HTTP2_ENABLED else "2"))
+TTFB_WINDOW = int(os.getenv("TTFB_WINDOW", "500"))  # recent requests kept for the TTFB percentiles
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+PROVIDERS = {
+    "sarvam": {
+        "base_url": SARVAM_BASE_URL,
+        "chat_path": "/v1/chat/completions",
+        "max_concurrency": SARVAM_MAX_CONCURRENCY,
+        "headers": lambda: {"api-subscription-key": os.getenv("SARVAM_API_KEY", "")},
+    },
+    "groq": {
+        "base_url": GROQ_BASE_URL,
+        "chat_path": "/chat/completions",
+        "max_concurrency": GROQ_MAX_CONCURRENCY,
+        "headers": lambda: {"Authorization": f"Bearer {os.getenv('GROQ_API_KEY', '')}"},
+    },
+}
+
+
+class LLMGatewayError(Exception):
+    """Upstream call failed after retries (status is None for network errors / timeouts)."""
+
+    def __init__(self, provider, message, status=None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.status = status
+
+
+class PoolMetrics:
+    """Per-provider connection reuse and time-to-first-byte (response headers) counters."""
+
+    def __init__(self, window=TTFB_WINDOW):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.errors = 0
+        self.ttfb_ms = deque(maxlen=window)
+
+    def record(self, ttfb_ms, new_connection):
+        with self._lock:
+            self.requests += 1
+            self.new_connections += int(new_connection)
+            self.ttfb_ms.append(ttfb_ms)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self.ttfb_ms)
+            reused = self.requests - self.new_connections
+
+            def pct(q):
+                return round(samples[min(len(samples) - 1, int(q * len(samples)))], 1) if samples else None
+
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+                "reuse_rate": round(reused / self.requests, 4) if self.requests else 0.0,
+                "errors": self.errors,
+                "ttfb_ms_p50": pct(0.5),
+                "ttfb_ms_p95": pct(0.95),
+            }
+
+
+def _connection_trace():
+    """httpx trace hook: notes whether this request had to open a new TCP connection."""
+    state = {"new_connection": False}
+
+    async def trace(event, info):
+        if event == "connection.connect_tcp.started":
+            state["new_connection"] = True
+
+    return {"trace": trace}, state
+
+
+_sync_clients = {}
+_sync_clients_lock = threading.Lock()
+
+
+def shared_sync_client(provider="sarvam"):
+    """
+    Process-wide pooled httpx.Client for SDKs that only take a sync client
+    (the sarvamai document_intelligence calls), so they reuse connections too.
+    """
+    with _sync_clients_lock:
+        client = _sync_clients.get(provider)
+        if client is None or client.is_closed:
+            settings = PROVIDERS[provider]
+            client = httpx.Client(
+                timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+                http2=HTTP2_ENABLED,
+                limits=httpx.Limits(
+                    max_connections=settings["max_concurrency"],
+                    max_keepalive_connections=min(HTTP_POOL_MAX_KEEPALIVE, settings["max_concurrency"]),
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS
+                )
+            )
+            _sync_clients[provider] = client
+        return client
+
+
+class LLMGateway:
+    def __init__(self, providers=PROVIDERS, timeout=LLM_TIMEOUT_SECONDS, max_retries=LLM_MAX_RETRIES,
+                 backoff=LLM_RETRY_BACKOFF_SECONDS, transport=None):
+        self.providers = providers
+        self.timeout = httpx.Timeout(timeout, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._transport = transport  # tests pass an httpx.MockTransport
+        self._clients = {}
+        self._semaphores = {}
+        self.metrics = {provider: PoolMetrics() for provider in providers}
+
+    # ---- connection pool -------------------------------------------------
+
+    def client(self, provider):
+        """Lazily built, then reused for the life of the process (keep-alive connections)."""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            settings = self.providers[provider]
+            client = httpx.AsyncClient(
+                base_url=settings["base_url"],
+                timeout=self.timeout,
+                http2=HTTP2_ENABLED,
+                limits=httpx.Limits(
+                    max_connections=settings["max_concurrency"],
+                    max_keepalive_connections=min(HTTP_POOL_MAX_KEEPALIVE, settings["max_concurrency"]),
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS
+                ),
+                transport=self._transport
+            )
+            self._clients[provider] = client
+        return client
+
+    def _semaphore(self, provider):
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(self.providers[provider]["max_concurrency"])
+        return self._semaphores[provider]
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    async def warm_up(self, providers=("sarvam",), connections=HTTP_POOL_WARMUP_CONNECTIONS):
+        """
+        Opens pooled connections at startup so the first user request skips DNS/TCP/TLS.
+        Any HTTP response (even a 404 on "/") means the connection is up; failures are only logged.
+        """
+        async def touch(provider):
+            started = time.perf_counter()
+            try:
+                await self.client(provider).head("/", timeout=LLM_CONNECT_TIMEOUT_SECONDS * 2)
+                return (time.perf_counter() - started) * 1000
+            except httpx.HTTPError as e:
+                print(f"⚠️ {provider} warm-up failed: {type(e).__name__}")
+                return None
+
+        for provider in providers:
+            timings = await asyncio.gather(*(touch(provider) for _ in range(connections)))
+            warmed = [t for t in timings if t is not None]
+            if warmed:
+                version = "HTTP/2" if HTTP2_ENABLED else "HTTP/1.1"
+                print(f"🔥 {provider} pool warm: {len(warmed)} connection(s), {version}, {max(warmed):.0f} ms")
+
+    def stats(self):
+        return {
+            "http2": HTTP2_ENABLED,
+            "providers": {provider: metrics.stats() for provider, metrics in self.metrics.items()},
+        }
+
+    # ---- request plumbing ------------------------------------------------
+
+    def _record_ttfb(self, provider, started, new_connection):
+        elapsed = time.perf_counter() - started
+        self.metrics[provider].record(elapsed * 1000, new_connection)
+        if METRICS_ENABLED:
+            UPSTREAM_TTFB_SECONDS.observe(elapsed, route=current_route.get(), provider=provider)
+
+    async def _sleep_before_retry(self, attempt):
+        await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    async def _request(self, provider, method, path, **kwargs):
+        headers = {**self.providers[provider]["headers"](), **kwargs.pop("headers", {})}
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            extensions, trace_state = _connection_trace()
+            try:
+                async with self._semaphore(provider):
+                    client = self.client(provider)
+                    request = client.build_request(method, path, headers=headers, extensions=extensions, **kwargs)
+                    started = time.perf_counter()
+                    # stream=True returns at the response headers, which is where TTFB is measured
+                    response = await client.send(request, stream=True)
+                    self._record_ttfb(provider, started, trace_state["new_connection"])
+                    try:
+                        await response.aread()
+                    finally:
+                        await response.aclose()
+            except httpx.TransportError as e:
+                # Timeouts, resets and protocol errors (a dropped HTTP/2 stream is a RemoteProtocolError)
+                self.metrics[provider].record_error()
+                last_error = LLMGatewayError(provider, f"{type(e).__name__}: {e}")
+            else:
+                if response.status_code < 400:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        raise LLMGatewayError(provider, f"Invalid JSON response - {response.text[:300]}",
+                                              response.status_code)
+                last_error = LLMGatewayError(
+                    provider, f"HTTP {response.status_code} - {response.text[:300]}", response.status_code
+                )
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise last_error
+            if attempt < self.max_retries:
+                print(f"⚠️ {provider} {path} failed ({last_error}), retrying...")
+                await self._sleep_before_retry(attempt)
+        raise last_error
+
+    # ---- chat ------------------------------------------------------------
+
+    async def chat(self, messages, provider="sarvam", model="sarvam-30b", **params):
+        """Non-streaming chat completion. Returns the assistant message text."""
+        payload = {"model": model, "messages": messages, **params}
+        data = await self._request(provider, "POST", self.providers[provider]["chat_path"], json=payload)
+        try:
+            return data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise LLMGatewayError(provider, f"Unexpected chat response - {str(data)[:300]}")
+
+    async def chat_stream(self, messages, provider="sarvam", model="sarvam-m", **params):
+        """
+        Streaming chat completion; yields content deltas as they arrive.
+        Failures before the first delta are retried like chat(); after that they are raised.
+        """
+        payload = {"model": model, "messages": messages, "stream": True, **params}
+        path = self.providers[provider]["chat_path"]
+        headers = self.providers[provider]["headers"]()
+        for attempt in range(self.max_retries + 1):
+            started_streaming = False
+            extensions, trace_state = _connection_trace()
+            try:
+                async with self._semaphore(provider):
+                    started = time.perf_counter()
+                    async with self.client(provider).stream("POST", path, headers=headers, json=payload,
+                                                            extensions=extensions) as response:
+                        self._record_ttfb(provider, started, trace_state["new_connection"])
+                        if response.status_code >= 400:
+                            body = (await response.aread()).decode(errors="replace")
+                            error = LLMGatewayError(provider, f"HTTP {response.status_code} - {body[:300]}",
+                                                    response.status_code)
+                            if response.status_code not in RETRYABLE_STATUS or attempt == self.max_retries:
+                                raise error
+                            print(f"⚠️ {provider} stream failed ({error}), retrying...")
+                        else:
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data_str = line[5:].strip()
+                                if data_str == "[DONE]":
+                                    return
+                                if not data_str:
+                                    continue
+                                try:
+                                    data = json.loads(data_str)
+                                except json.JSONDecodeError:
+                                    continue
+                                choices = data.get("choices") or []
+                                content = choices[0].get("delta", {}).get("content") if choices else None
+                                if content:
+                                    started_streaming = True
+                                    yield content
+                            return
+            except httpx.TransportError as e:
+                self.metrics[provider].record_error()
+                if started_streaming or attempt == self.max_retries:
+                    raise LLMGatewayError(provider, f"{type(e).__name__}: {e}")
+                print(f"⚠️ {provider} stream failed ({type(e).__name__}), retrying...")
+            await self._sleep_before_retry(attempt)
+
+    # ---- speech ----------------------------------------------------------
+
+    async def transcribe(self, audio_bytes, filename="audio.wav", model="saarika:v2.5", language_code=None,
+                         content_type="application/octet-stream"):
+        """Sarvam speech-to-text. Returns the transcript ("" when nothing was heard)."""
+        data = {"model": model}
+        if language_code:
+            data["language_code"] = language_code
+        with timed("stt", "sarvam"):
+            result = await self._request(
+                "sarvam", "POST", "/speech-to-text",
+                data=data,
+                files={"file": (filename, audio_bytes, content_type)}
+            )
+        return result.get("transcript") or result.get("transcription") or ""
+
+    async def synthesize(self, text, target_language_code="hi-IN", model="bulbul:v3", speaker="shubh", **params):
+        """Sarvam text-to-speech. Returns the base64-encoded audio."""
+        payload = {
+            "text": text,
+            "target_language_code": target_language_code,
+            "model": model,
+            "speaker": speaker,
+            **params
+        }
+        with timed("tts", "sarvam"):
+            result = await self._request("sarvam", "POST", "/text-to-speech", json=payload)
+        audios = result.get("audios") or [""]
+        return audios[0]
@@ -0,0 +1,259 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from llm_gateway import LLMGatewayError
+from metrics import LLM_SECONDS, LLM_TTFT_SECONDS, METRICS_ENABLED, current_route, observe_stage
+
+# ---------------------------------------------------------
+# Latency-Aware LLM Router (Sarvam / Groq) with Hedged Requests
+# ---------------------------------------------------------
+# Each task lists the (provider, model) endpoints that can serve it. Calls go to
+# the fastest healthy endpoint by rolling p50; failures fall over to the next
+# one. Short, latency-critical tasks can be hedged: if the first endpoint hasn't
+# answered after roughly its p95, a second request goes to the runner-up and the
+# first answer wins (the loser is cancelled).
+ROUTES = {
+    # task: ([(provider, model), ...] in preference order, hedge?)
+    "intent": ([("sarvam", "sarvam-30b"), ("groq", "llama-3.3-70b-versatile")], True),
+    "ivr": ([("sarvam", "sarvam-30b"), ("groq", "llama-3.3-70b-versatile")], True),
+    "extract": ([("sarvam", "sarvam-30b"), ("groq", "llama-3.3-70b-versatile")], False),
+    "chat": ([("sarvam", "sarvam-30b"), ("groq", "llama-3.3-70b-versatile")], False),
+    "voice": ([("groq", "llama-3.3-70b-versatile"), ("sarvam", "sarvam-30b")], False),
+    "stream": ([("sarvam", "sarvam-m"), ("groq", "llama-3.3-70b-versatile")], False),
+}
+# Per-task override, e.g. LLM_ROUTE_IVR="groq:llama-3.3-70b-versatile,sarvam:sarvam-30b"
+for _task, (_endpoints, _hedge) in list(ROUTES.items()):
+    _override = os.getenv(f"LLM_ROUTE_{_task.upper()}")
+    if _override:
+        ROUTES[_task] = ([tuple(e.strip().split(":", 1)) for e in _override.split(",") if e.strip()], _hedge)
+
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "1") == "1"
+LLM_HEDGE_DELAY_MS = float(os.getenv("LLM_HEDGE_DELAY_MS", "800"))  # until the primary has a p95
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "150"))
+LLM_HEDGE_MAX_DELAY_MS = float(os.getenv("LLM_HEDGE_MAX_DELAY_MS", "3000"))
+
+LLM_ROUTER_WINDOW = int(os.getenv("LLM_ROUTER_WINDOW", "200"))  # recent calls per endpoint
+LLM_ROUTER_MIN_SAMPLES = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "5"))
+LLM_ROUTER_MAX_ERROR_RATE = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.5"))
+LLM_ROUTER_COOLDOWN_SECONDS = float(os.getenv("LLM_ROUTER_COOLDOWN_SECONDS", "30"))
+
+
+class EndpointStats:
+    """Rolling latency (successful calls) and error rate for one provider/model."""
+
+    def __init__(self, window=LLM_ROUTER_WINDOW):
+        self._lock = threading.Lock()
+        self.outcomes = deque(maxlen=window)  # (latency_ms or None on error)
+        self.last_error_at = 0.0
+        self.requests = 0
+        self.cancelled = 0  # hedge losers: no latency to learn from, kept out of the window
+
+    def record(self, latency_ms=None, ok=True):
+        with self._lock:
+            self.requests += 1
+            self.outcomes.append(latency_ms if ok else None)
+            if not ok:
+                self.last_error_at = time.monotonic()
+
+    def record_cancelled(self):
+        with self._lock:
+            self.cancelled += 1
+
+    def _latencies(self):
+        return sorted(v for v in self.outcomes if v is not None)
+
+    def percentile(self, q):
+        with self._lock:
+            samples = self._latencies()
+        if len(samples) < LLM_ROUTER_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def error_rate(self):
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return sum(1 for v in self.outcomes if v is None) / len(self.outcomes)
+
+    def healthy(self):
+        """Unhealthy = too many recent errors; re-probed once the cooldown since the last error passes."""
+        with self._lock:
+            if len(self.outcomes) < LLM_ROUTER_MIN_SAMPLES:
+                return True
+            recent_error = time.monotonic() - self.last_error_at < LLM_ROUTER_COOLDOWN_SECONDS
+        return not (recent_error and self.error_rate() >= LLM_ROUTER_MAX_ERROR_RATE)
+
+    def stats(self):
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "requests": self.requests,
+            "cancelled": self.cancelled,
+            "p50_ms": round(p50, 1) if p50 is not None else None,
+            "p95_ms": round(p95, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 4),
+            "healthy": self.healthy(),
+        }
+
+
+def _observe_llm(provider, model, seconds, ttft=None, failed=False):
+    """Feeds /metrics: per-call duration (and time to first token for streams), errors as stage failures."""
+    if not METRICS_ENABLED:
+        return
+    if failed:
+        observe_stage("llm", seconds, provider, failed=True)
+        return
+    route = current_route.get()
+    LLM_SECONDS.observe(seconds, route=route, provider=provider, model=model)
+    if ttft is not None:
+        LLM_TTFT_SECONDS.observe(ttft, route=route, provider=provider, model=model)
+
+
+class LLMRouter:
+    def __init__(self, gateway, routes=ROUTES, hedging=LLM_HEDGING_ENABLED, hedge_delay_ms=LLM_HEDGE_DELAY_MS):
+        self.gateway = gateway  # anything with async chat() / chat_stream() like LLMGateway
+        self.routes = routes
+        self.hedging = hedging
+        self.hedge_delay_ms = hedge_delay_ms
+        self.endpoints = {}
+        self.hedge_stats = {"hedged_calls": 0, "hedges_fired": 0, "hedge_wins": 0}
+
+    def _stats_for(self, provider, model, mode="chat"):
+        key = (provider, model, mode)
+        if key not in self.endpoints:
+            self.endpoints[key] = EndpointStats()
+        return self.endpoints[key]
+
+    def rank(self, task, mode="chat"):
+        """
+        Endpoints for a task, best first: healthy before unhealthy, then by rolling p50.
+        An endpoint without enough samples sorts as fast so it gets measured; ties keep the configured order.
+        """
+        endpoints, _ = self.routes.get(task, self.routes["chat"])
+
+        def key(item):
+            position, (provider, model) = item
+            stats = self._stats_for(provider, model, mode)
+            p50 = stats.percentile(0.5)
+            return (not stats.healthy(), p50 if p50 is not None else 0.0, position)
+
+        return [endpoint for _, endpoint in sorted(enumerate(endpoints), key=key)]
+
+    def _hedge_delay(self, provider, model):
+        p95 = self._stats_for(provider, model).percentile(0.95)
+        delay = self.hedge_delay_ms if p95 is None else p95
+        return min(LLM_HEDGE_MAX_DELAY_MS, max(LLM_HEDGE_MIN_DELAY_MS, delay)) / 1000
+
+    async def _call(self, endpoint, messages, params):
+        provider, model = endpoint
+        stats = self._stats_for(provider, model)
+        started = time.perf_counter()
+        try:
+            text = await self.gateway.chat(messages, provider=provider, model=model, **params)
+        except LLMGatewayError:
+            stats.record(ok=False)
+            _observe_llm(provider, model, time.perf_counter() - started, failed=True)
+            raise
+        except asyncio.CancelledError:
+            # Lost a hedge race. The time so far is only a lower bound; as a "success" it
+            # would drag p50 down for the slow endpoint, so it is counted apart instead.
+            stats.record_cancelled()
+            raise
+        elapsed = time.perf_counter() - started
+        stats.record(elapsed * 1000)
+        _observe_llm(provider, model, elapsed)
+        return text
+
+    async def _hedged(self, primary, backup, messages, params, attempted):
+        """First successful answer of primary and (after the hedge delay) backup. Raises if all tried fail."""
+        self.hedge_stats["hedged_calls"] += 1
+        tasks = {asyncio.create_task(self._call(primary, messages, params)): primary}
+        attempted.append(primary)
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(*primary))
+            if done:
+                # Answered (or failed fast) before the hedge delay: no second request
+                return done.pop().result()
+
+            print(f"🏁 Hedging {primary[0]}/{primary[1]} with {backup[0]}/{backup[1]}")
+            self.hedge_stats["hedges_fired"] += 1
+            tasks[asyncio.create_task(self._call(backup, messages, params))] = backup
+            attempted.append(backup)
+
+            pending, last_error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if tasks[task] == backup:
+                            self.hedge_stats["hedge_wins"] += 1
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            # The slower request (or both, if our caller was cancelled) is abandoned
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def chat(self, messages, task="chat", hedge=None, **params):
+        """Routed, non-streaming chat completion. Returns the text from whichever endpoint answered."""
+        ranked = self.rank(task)
+        hedge = self.routes.get(task, self.routes["chat"])[1] if hedge is None else hedge
+        last_error = None
+        if hedge and self.hedging and len(ranked) > 1:
+            attempted = []
+            try:
+                return await self._hedged(ranked[0], ranked[1], messages, params, attempted)
+            except LLMGatewayError as e:
+                print(f"⚠️ Hedged {task} call failed on {len(attempted)} endpoint(s): {e}")
+                last_error = e
+                ranked = [endpoint for endpoint in ranked if endpoint not in attempted]
+        for endpoint in ranked:
+            try:
+                return await self._call(endpoint, messages, params)
+            except LLMGatewayError as e:
+                print(f"⚠️ {endpoint[0]}/{endpoint[1]} failed for {task}, trying next endpoint: {e}")
+                last_error = e
+        raise last_error or LLMGatewayError("router", f"no endpoint configured for task {task}")
+
+    async def chat_stream(self, messages, task="stream", **params):
+        """
+        Routed streaming chat; yields deltas. Latency is time to the first delta.
+        Fails over only while nothing has been yielded yet.
+        """
+        last_error = None
+        for provider, model in self.rank(task, mode="stream"):
+            stats = self._stats_for(provider, model, "stream")
+            started = time.perf_counter()
+            first, ttft = True, None
+            try:
+                async for delta in self.gateway.chat_stream(messages, provider=provider, model=model, **params):
+                    if first:
+                        ttft = time.perf_counter() - started
+                        stats.record(ttft * 1000)
+                        first = False
+                    yield delta
+                if first:
+                    stats.record((time.perf_counter() - started) * 1000)
+                _observe_llm(provider, model, time.perf_counter() - started, ttft=ttft)
+                return
+            except LLMGatewayError as e:
+                stats.record(ok=False)
+                _observe_llm(provider, model, time.perf_counter() - started, failed=True)
+                if not first:
+                    raise
+                print(f"⚠️ {provider}/{model} stream failed for {task}, trying next endpoint: {e}")
+                last_error = e
+        raise last_error or LLMGatewayError("router", f"no endpoint configured for task {task}")
+
+    def stats(self):
+        return {
+            "hedging": self.hedging,
+            **self.hedge_stats,
+            "endpoints": {
+                f"{provider}/{model}" + ("" if mode == "chat" else f" [{mode}]"): stats.stats()
+                for (provider, model, mode), stats in self.endpoints.items()
+            },
+        }
@@ -1,22 +1,40 @@
 import os
+import re
 import json
-import httpx
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
-from fastapi.responses import StreamingResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, HTMLResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from submission_agent import validate_document_with_sarvam, submit_to_portal_agent
 import shutil
-import uuid
+import time
 import asyncio
 import uvicorn
+from contextlib import asynccontextmanager
+from starlette.routing import Match
 
 from pinecone import Pinecone
-from sarvamai import SarvamAI
-from groq import Groq
 from storage_service import StorageService
+from schemes import SCHEME_REGISTRY, resolve_scheme_filter
+from vector_store import load_vector_index, VECTOR_BACKEND
+from embedding_cache import EmbeddingCache
+from bm25_index import load_bm25_index, reciprocal_rank_fusion
+from content_store import load_content_store
+from rerank_service import RerankService, rerank_order
+from dedup import dedup_texts
+from context_builder import assemble_context
+from intent_classifier import IntentClassifier
+from llm_gateway import LLMGateway, LLMGatewayError, HTTP_POOL_WARMUP
+from llm_router import LLMRouter
+from metrics import REQUEST_SECONDS, METRICS_ENABLED, UNMATCHED_ROUTE, current_route, timed, observe_stage, render as render_metrics
+from tts_cache import TTSCache, TTS_CACHE_ENABLED
+from speech_stream import stream_speech
+from voice_session import VoiceSession, pcm_to_wav
+from audio_delivery import AudioDelivery, DELIVERY_MODES, AUDIO_FORMATS, header_text
+from audio_preprocess import AudioPreprocessor, AUDIO_PREP_ENABLED
+from answer_cache import AnswerCache, ANSWER_CACHE_ENABLED, content_fingerprint, fingerprint, detect_language, replay_events
 
 load_dotenv()
 
@@ -26,52 +44,97 @@ load_dotenv()
 # Initialize DynamoDB storage service
 storage_service = StorageService()
 
-app = FastAPI(title="Yojana-Setu Phygital Backend")
-sarvam_client = SarvamAI(api_subscription_key=os.getenv("SARVAM_API_KEY", "dummy_sarvam"))
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY", "dummy_groq_key"))
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up that should not slow down import (globals below are defined by the time this runs)
+    if rerank_service is not None:
+        # Load the CrossEncoder in its worker thread so the first request doesn't pay for it
+        rerank_service.start()
+    if HTTP_POOL_WARMUP:
+        # Open the api.sarvam.ai connection now instead of on the first user's request
+        await llm_gateway.warm_up(["sarvam"])
+    prerender_task = None
+    if tts_cache is not None and TTS_PRERENDER:
+        # Fixed voice lines are synthesized in the background; startup doesn't wait for them
+        prerender_task = asyncio.create_task(tts_cache.prerender(
+            llm_gateway.synthesize, FIXED_TTS_PROMPTS, model=TTS_MODEL, speaker=TTS_SPEAKER
+        ))
+    yield
+    if prerender_task is not None and not prerender_task.done():
+        prerender_task.cancel()
+    if audio_preprocessor is not None:
+        audio_preprocessor.close()
+    await llm_gateway.aclose()
+
+app = FastAPI(title="Yojana-Setu Phygital Backend", lifespan=lifespan)
+
+# Every Sarvam / Groq chat, STT and TTS call goes through this (async, pooled, retried)
+llm_gateway = LLMGateway()
+# Picks the fastest healthy provider/model per task and hedges intent + IVR calls
+llm_router = LLMRouter(llm_gateway)
+
+# Synthesized speech is cached on disk by (text, language, model, speaker)
+tts_cache = TTSCache() if TTS_CACHE_ENABLED else None
+TTS_PRERENDER = os.getenv("TTS_PRERENDER", "true").lower() == "true"
+TTS_MODEL = "bulbul:v3"
+TTS_SPEAKER = "shubh"
+
+# Voice replies as raw bytes / fetchable URLs (optionally Opus or MP3) instead of base64 in JSON
+audio_delivery = AudioDelivery()
+# Recordings are downsampled, trimmed and FLAC-encoded before STT; silent ones skip it entirely
+audio_preprocessor = AudioPreprocessor() if AUDIO_PREP_ENABLED else None
+
+WELCOME_GREETING = "Namaste! Main Shubh hoon, Yojana Setu se aapka digital sahayak. Sarkari yojanaon se judi koi bhi jaankari chahiye, toh bas mujhe bataiye. Main yahan aapki sunne aur madad karne ke liye hoon. Boliye, aaj main aapki kya sahayata kar sakta hoon?"
+VOICE_NOT_HEARD = "Maaf kijiyega, main aapki aawaz samajh nahi paya. Kripya thoda zor se aur saaf boliyee."
+
+def speech_language(text):
+    """Hindi voice for Devanagari text, Indian English otherwise (romanized Hindi included)."""
+    return "hi-IN" if re.search(r"[\u0900-\u097F]", text or "") else "en-IN"
+
+# Lines every voice session can hit, rendered at startup
+FIXED_TTS_PROMPTS = [(WELCOME_GREETING, "hi-IN"), (VOICE_NOT_HEARD, speech_language(VOICE_NOT_HEARD))]
+
+async def synthesize_speech(text, target_language_code):
+    """Base64 audio in Shubh's voice; repeats come from the TTS cache instead of Sarvam."""
+    if tts_cache is None:
+        return await llm_gateway.synthesize(text, target_language_code=target_language_code,
+                                            model=TTS_MODEL, speaker=TTS_SPEAKER)
+    return await tts_cache.synthesize(llm_gateway.synthesize, text, target_language_code=target_language_code,
+                                      model=TTS_MODEL, speaker=TTS_SPEAKER)
 
 @app.get("/")
 async def root():
     return {"status": "online", "message": "AI-For-Bharat Backend is running!"}
 
+@app.middleware("http")
+async def record_route_metrics(request: Request, call_next):
+    """Tags every stage timer with the route template and times the request up to its response headers."""
+    # 404 scans get one constant label; a raw path per request would grow /metrics without bound
+    route = UNMATCHED_ROUTE
+    for candidate in app.router.routes:
+        if candidate.matches(request.scope)[0] == Match.FULL:
+            route = getattr(candidate, "path", route)
+            break
+    token = current_route.set(route)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        if METRICS_ENABLED and route != "/metrics":
+            REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method, status=status)
+        current_route.reset(token)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-User-Text", "X-Agent-Text", "X-Voice-Meta", "X-Audio-Format", "X-Text-Truncated"],  # binary voice replies
 )
 
-# ---------------------------------------------------------
-# Scheme Registry: Maps schemes to required docs & portals
-# ---------------------------------------------------------
-# portal_url will be updated later when dummy sites are ready
-SCHEME_REGISTRY = {
-    "pmay-g": {
-        "name": "Pradhan Mantri Awaas Yojana - Gramin (PMAY-G)",
-        "required_docs": ["aadhar", "income", "photo"],
-        "portal_url": "https://dummy-pmawas.vercel.app/",
-        "description": "Housing scheme for rural areas"
-    },
-    "pmay-u": {
-        "name": "Pradhan Mantri Awaas Yojana - Urban (PMAY-U)",
-        "required_docs": ["aadhar", "income", "photo"],
-        "portal_url": "https://dummy-pmawas.vercel.app/",
-        "description": "Housing scheme for urban areas"
-    },
-    "pmjdy": {
-        "name": "Pradhan Mantri Jan Dhan Yojana (PMJDY)",
-        "required_docs": ["aadhar", "photo"],
-        "portal_url": "https://pm-kisan-portal.vercel.app/",
-        "description": "Financial inclusion - bank accounts for all"
-    },
-    "rhiss": {
-        "name": "Rural Housing Interest Subsidy Scheme (RHISS)",
-        "required_docs": ["aadhar"],
-        "portal_url": "http://127.0.0.1:8000/mock-gov-portal",
-        "description": "Housing scheme for rural areas"
-    },
-}
-
 def get_scheme_list_for_prompt():
     lines = []
     for key, info in SCHEME_REGISTRY.items():
@@ -82,89 +145,152 @@ def get_scheme_list_for_prompt():
 # ---------------------------------------------------------
 # RAG Setup: Database Connection (Models are lazy-loaded later)
 # ---------------------------------------------------------
-# Connect to Pinecone
+# Connect to Pinecone (query embeddings always come from Pinecone Inference)
 pinecone_api_key = os.getenv("PINECONE_API_KEY")
 pc = Pinecone(api_key=pinecone_api_key)
 index_name = "yojana-setu-v2"
-index = pc.Index(index_name)
-print("Pinecone Database connected!")
+EMBED_MODEL = "multilingual-e5-large"
+
+# Vector search runs either on Pinecone or on the local mmap index (VECTOR_BACKEND=local).
+# Either way it only returns chunk ids; the text is looked up in the local content store.
+vector_index = load_vector_index(pc, index_name)
+content_store = load_content_store()
+
+# Shared by every route that calls high_quality_search (/api/chat, /api/agent, voice, IVR)
+embedding_cache = EmbeddingCache()
+
+# Retrieval mode: "dense" (vectors only), "bm25" (keywords only) or "hybrid" (both, merged by RRF)
+RETRIEVAL_MODES = ("dense", "bm25", "hybrid")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense").lower()
+if RETRIEVAL_MODE not in RETRIEVAL_MODES:
+    # A typo ("hybird") would otherwise quietly fall through to dense-only
+    raise ValueError(f"Unknown RETRIEVAL_MODE '{RETRIEVAL_MODE}'. Use one of: {', '.join(RETRIEVAL_MODES)}.")
+RETRIEVAL_TOP_N = int(os.getenv("RETRIEVAL_TOP_N", "5"))
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))  # candidates pulled from each retriever before fusion
+bm25_index = load_bm25_index(content_store) if RETRIEVAL_MODE in ("bm25", "hybrid") else None
+
+# Overlapping chunks (splitter overlap, paragraphs repeated across guidelines) waste context slots:
+# fetch a few extra candidates and drop hits that repeat a higher-ranked one.
+RESULT_DEDUP_ENABLED = os.getenv("RESULT_DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_FETCH_EXTRA = int(os.getenv("DEDUP_FETCH_EXTRA", "3"))
+
+# Optional CrossEncoder reranking for /api/agent (batched across concurrent requests).
+# Off by default to keep startup free of local models.
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "20"))
+rerank_service = RerankService() if RERANK_ENABLED else None
 
 # ---------------------------------------------------------
 # Helper Functions
 # ---------------------------------------------------------
 
-def high_quality_search(query, top_n=5):
-    # Step 1: Semantic Search (fetch_k results)
-    # ⚡ Use Pinecone Serverless Inference (Cloud-based thinking)
-    try:
+def embed_query(query):
+    # Repeat questions skip the Pinecone Inference round trip entirely
+    cached = embedding_cache.get(EMBED_MODEL, query)
+    if cached is not None:
+        return cached
+
+    with timed("embed", "pinecone"):
         res = pc.inference.embed(
-            model="multilingual-e5-large",
+            model=EMBED_MODEL,
             inputs=[query],
             parameters={"input_type": "query"}
         )
-        query_embedding = res[0].values
-    except Exception as e:
-        print(f"⚠️ Pinecone Inference failed: {e}")
-        return []
+    query_embedding = res[0].values
+    embedding_cache.put(EMBED_MODEL, query, query_embedding)
+    return query_embedding
+
+def high_quality_search(query, top_n=RETRIEVAL_TOP_N, scheme_id=None):
+    # Scope to one scheme's chunks when we know it; otherwise search the whole corpus
+    scheme_id = resolve_scheme_filter(scheme_id)
+    if scheme_id:
+        results = _search(query, top_n, scheme_id)
+        if results:
+            return results
+        # Index not tagged yet (or nothing relevant in that scheme) -> fall back to everything
+        print(f"⚠️ No results scoped to {scheme_id}, searching all schemes")
+    return _search(query, top_n, None)
+
+def _search(query, top_n, scheme_id):
+    candidates_n = top_n + DEDUP_FETCH_EXTRA if RESULT_DEDUP_ENABLED else top_n
+
+    # Keyword-only mode never touches the embedding service
+    if RETRIEVAL_MODE == "bm25":
+        with timed("bm25_query", "local"):
+            keyword_matches = bm25_index.query(query, top_k=candidates_n, scheme_id=scheme_id)
+        return finalize_results(keyword_matches, top_n)
+
+    fetch_k = max(candidates_n, HYBRID_FETCH_K) if RETRIEVAL_MODE == "hybrid" else candidates_n
 
-    # Fast retrieval from Pinecone Cloud
-    results = index.query(
-        vector=query_embedding,
-        top_k=top_n,
-        include_metadata=True
-    )
+    # Step 1: Semantic Search (fetch_k results)
+    # ⚡ Use Pinecone Serverless Inference (Cloud-based thinking)
+    try:
+        query_embedding = embed_query(query)
+        # Fast retrieval from the configured vector backend (Pinecone Cloud or local mmap index)
+        with timed("vector_query", VECTOR_BACKEND):
+            matches = vector_index.query(query_embedding, top_k=fetch_k, scheme_id=scheme_id)
+    except Exception as e:
+        print(f"⚠️ Dense retrieval failed: {e}")
+        if RETRIEVAL_MODE != "hybrid":
+            return []
+        matches = []  # Hybrid can still answer from the keyword index
+
+    # Step 2 (hybrid): merge with exact-token BM25 hits via reciprocal-rank fusion
+    if RETRIEVAL_MODE == "hybrid":
+        with timed("bm25_query", "local"):
+            keyword_matches = bm25_index.query(query, top_k=fetch_k, scheme_id=scheme_id)
+        matches = reciprocal_rank_fusion([matches, keyword_matches], top_k=candidates_n)
     
-    if not results.matches:
+    if not matches:
         return []
         
-    return [match.metadata.get('content', '') for match in results.matches if match.metadata]
-
-async def async_high_quality_search(query, top_n=5):
-    import asyncio
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, high_quality_search, query, top_n)
+    return finalize_results(matches, top_n)
+
+def finalize_results(matches, top_n):
+    """Resolves text, drops near-duplicate hits, and trims back to top_n."""
+    contents = resolve_contents(matches)
+    if RESULT_DEDUP_ENABLED:
+        contents = dedup_texts(contents)
+    return contents[:top_n]
+
+def resolve_contents(matches):
+    """Maps id-only matches to chunk text from the content store (in rank order)."""
+    contents = []
+    for match in matches:
+        content = content_store.get(match["id"])
+        if content:
+            contents.append(content)
+        else:
+            print(f"⚠️ Chunk {match['id']} is in the vector index but not in data/chunks")
+    return contents
+
+async def async_high_quality_search(query, top_n=RETRIEVAL_TOP_N, scheme_id=None):
+    # to_thread (unlike run_in_executor) carries the route label into the worker thread's timers
+    with timed("retrieval"):
+        return await asyncio.to_thread(high_quality_search, query, top_n, scheme_id)
+
+async def async_reranked_search(query, top_n=RETRIEVAL_TOP_N, scheme_id=None):
+    """Over-fetches candidates and reranks them; keeps vector order if the rerank budget runs out."""
+    if rerank_service is None:
+        return await async_high_quality_search(query, top_n, scheme_id)
+    candidates = await async_high_quality_search(query, max(top_n, RERANK_FETCH_K), scheme_id)
+    with timed("rerank", "cross-encoder"):
+        scores = await rerank_service.rerank(query, candidates)
+    return rerank_order(candidates, scores, top_n)
 
 async def get_sarvam_stream(system_prompt: str, user_query: str):
-    url = "https://api.sarvam.ai/v1/chat/completions"
-    headers = {
-        "api-subscription-key": os.getenv("SARVAM_API_KEY", ""),
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "sarvam-m",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_query}
-        ],
-        "stream": True
-    }
-    
-    async with httpx.AsyncClient() as client:
-        # Use httpx to stream the Sarvam LLM response back
-        async with client.stream("POST", url, headers=headers, json=payload, timeout=60.0) as response:
-            if response.status_code != 200:
-                error_body = await response.aread()
-                # Yield error to frontend in case auth or LLM fails
-                yield f"data: {json.dumps({'error': f'Sarvam API Error: {response.status_code} - {error_body.decode()}'})}\n\n"
-                yield "data: [DONE]\n\n"
-                return
-                
-            async for line in response.aiter_lines():
-                if line.startswith("data:"):
-                    data_str = line[5:].strip()
-                    if data_str == "[DONE]":
-                        yield "data: [DONE]\n\n"
-                        break
-                    if not data_str:
-                        continue
-                    try:
-                        data = json.loads(data_str)
-                        if "choices" in data and len(data["choices"]) > 0:
-                            content = data["choices"][0].get("delta", {}).get("content")
-                            if content:
-                                yield f"data: {json.dumps({'content': content})}\n\n"
-                    except json.JSONDecodeError:
-                        pass
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_query}
+    ]
+    try:
+        # Stream the LLM response back (sarvam-m unless the router has failed over)
+        async for content in llm_router.chat_stream(messages, task="stream"):
+            yield f"data: {json.dumps({'content': content})}\n\n"
+    except LLMGatewayError as e:
+        # Yield error to frontend in case auth or LLM fails
+        yield f"data: {json.dumps({'error': f'LLM API Error: {e}'})}\n\n"
+    yield "data: [DONE]\n\n"
 
 # ---------------------------------------------------------
 # API Endpoints
@@ -233,26 +359,11 @@ async def login(phone: str = Form(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/chat")
-async def chat_with_agent(
-    user_text: str = Form(...),
-    user_name: str = Form("Citizen")
-):
-    user_query = user_text
-    
-    # 1. Retrieve Facts from the Database
-    retrieved_facts = high_quality_search(user_query)
-    
-    # Format the facts into a single string
-    context_string = "\n\n---\n\n".join(retrieved_facts)
-    
-    if not context_string:
-        # Fallback if nothing is found in the DB
-        context_string = "No specific scheme guidelines were found for this query."
+# ---------------------------------------------------------
+# Prompt Templates + Semantic Answer Cache
+# ---------------------------------------------------------
 
-    # 2. Build the System Prompt for Sarvam LLM
-    scheme_list = get_scheme_list_for_prompt()
-    system_prompt = f"""You are a helpful, empathetic "Phygital" caseworker for Yojana-Setu, assisting rural citizens in India.
+CHAT_SYSTEM_PROMPT = """You are a helpful, empathetic "Phygital" caseworker for Yojana-Setu, assisting rural citizens in India.
 Your goal is to answer their questions about government schemes clearly and simply.
 
 You MUST base your answer ONLY on the following official guidelines and facts provided. 
@@ -282,8 +393,101 @@ If you are unsure which scheme the user wants to apply for, ask them to clarify.
 Do NOT include the [APPLY_READY:...] tag if the user is just asking questions and not ready to apply.
 """
 
+AGENT_QUERY_PROMPT = """You are a helpful, empathetic caseworker for Yojana-Setu, assisting rural citizens in India.
+Answer their question clearly and simply based ONLY on these facts:
+
+{context_string}
+
+IMPORTANT GUIDELINES:
+- When a user asks about documents needed, required information, or how to apply, give a DETAILED and STRUCTURED answer.
+- List ALL specific form fields they need to fill (e.g., Full Name, Father's Name, Date of Birth, Gender, Aadhaar Number, Mobile Number, Category, Income, Address, State, District, PIN Code etc.).
+- Mention exact document requirements including accepted file formats (JPG, PNG, PDF) and maximum file sizes (2MB for documents, 1MB for photos).
+- For fields with dropdown options (like Gender, Category, State), list the available options.
+- Use numbered sections and bullet points for clarity.
+- If the user seems interested in applying, let them know you can help them apply by uploading their documents.
+Do not use jargon. Be warm and encouraging."""
+
+# Finished query answers, replayed for near-identical questions. The version covers the
+# chunk contents, retrieval mode and the two templates above, so editing any of them
+# (or re-chunking) starts a fresh cache.
+ANSWER_CACHE_VERSION = fingerprint(
+    content_fingerprint(content_store), index_name, RETRIEVAL_MODE,
+    CHAT_SYSTEM_PROMPT, AGENT_QUERY_PROMPT, get_scheme_list_for_prompt(), os.getenv("PROMPT_VERSION", "")
+)
+answer_cache = AnswerCache(ANSWER_CACHE_VERSION) if ANSWER_CACHE_ENABLED else None
+
+def query_embedding_or_none(query):
+    """Embedding for the answer cache (shared with retrieval via embedding_cache); None in bm25 mode or on failure."""
+    if RETRIEVAL_MODE == "bm25":
+        return None
+    try:
+        return embed_query(query)
+    except Exception as e:
+        print(f"⚠️ Answer cache embedding failed: {e}")
+        return None
+
+async def async_query_embedding(query):
+    return await asyncio.to_thread(query_embedding_or_none, query)
+
+async def cache_completed_answer(stream, on_complete):
+    """Passes SSE events through untouched; hands the full answer to on_complete if the stream ended without an error."""
+    parts, failed = [], False
+    async for event in stream:
+        if event.startswith("data:"):
+            try:
+                data = json.loads(event[5:].strip())
+                if isinstance(data, dict):
+                    parts.append(data.get("content", ""))
+                    failed = failed or "error" in data
+            except json.JSONDecodeError:
+                pass
+        yield event
+    if parts and not failed:
+        on_complete("".join(parts))
+
+@app.post("/api/chat")
+async def chat_with_agent(
+    user_text: str = Form(...),
+    user_name: str = Form("Citizen")
+):
+    user_query = user_text
+    started = time.perf_counter()
+    lang = detect_language(user_query)
+    # "Documents for PMAY-G" vs "...PMAY-U" embed almost identically; the scheme keeps them in separate buckets
+    cache_scheme = resolve_scheme_filter(intent_classifier.classify(user_query)["scheme_id"]) if answer_cache else None
+
+    # 0. Frequent questions are answered from the semantic answer cache
+    embedding = await async_query_embedding(user_query) if answer_cache else None
+    if answer_cache:
+        hit = answer_cache.lookup("chat", user_query, embedding, cache_scheme, lang)
+        if hit:
+            print(f"⚡ Answer cache hit [chat] (similarity {hit['similarity']})")
+            answer_cache.record_hit_latency((time.perf_counter() - started) * 1000)
+            return StreamingResponse(replay_events(hit["answer"]), media_type="text/event-stream")
+
+    # 1. Retrieve Facts from the Database
+    retrieved_facts = await async_high_quality_search(user_query)
+    
+    # Fit the facts into the chat channel's token budget
+    context_string = assemble_context(retrieved_facts, channel="chat")["text"]
+    
+    if not context_string:
+        # Fallback if nothing is found in the DB
+        context_string = "No specific scheme guidelines were found for this query."
+
+    # 2. Build the System Prompt for Sarvam LLM
+    scheme_list = get_scheme_list_for_prompt()
+    system_prompt = CHAT_SYSTEM_PROMPT.format(context_string=context_string, scheme_list=scheme_list)
+
+    stream = get_sarvam_stream(system_prompt, user_query)
+    if answer_cache and retrieved_facts:
+        def remember(answer):
+            answer_cache.put("chat", user_query, embedding, answer, scheme_id=cache_scheme, lang=lang,
+                             generation_ms=(time.perf_counter() - started) * 1000)
+        stream = cache_completed_answer(stream, remember)
+
     return StreamingResponse(
-        get_sarvam_stream(system_prompt, user_query), 
+        stream, 
         media_type="text/event-stream"
     )
 
@@ -327,10 +531,7 @@ async def process_submission(
         Sign off: Team Yojana Setu."""
 
     # 5. Generate final conversational response
-    chat_response = sarvam_client.chat.completions(model='sarvam-30b', 
-        messages=[{"role": "user", "content": system_prompt}]
-    )
-    agent_response_text = chat_response.choices[0].message.content
+    agent_response_text = await llm_router.chat([{"role": "user", "content": system_prompt}], task="chat")
     
     # This endpoint doesn't have session_id, so this part is not directly applicable here.
     # The user's instruction seems to be for the agent_orchestrator function.
@@ -345,7 +546,29 @@ async def process_submission(
 # Orchestrator Agent — The "Brain" 
 # ---------------------------------------------------------
 
-def detect_intent(user_text: str):
+# In-process intent/scheme rules; the Sarvam classifier below only runs when they're unsure
+intent_classifier = IntentClassifier()
+
+async def async_detect_intent(user_text: str, classified=None):
+    """
+    Classifies intent + scheme with local rules, falling back to the LLM below the confidence threshold.
+    classified: an intent_classifier.classify(user_text) result the caller already has.
+    Returns: {"intent": "query"|"apply", "scheme_id": str|None}
+    """
+    if classified is None:
+        with timed("intent", "rules"):
+            classified = intent_classifier.classify(user_text)
+    result = classified
+    if result["confidence"] >= intent_classifier.threshold:
+        intent_classifier.record(used_llm=False)
+        print(f"🧠 Intent (rules, {result['confidence']}): {result['intent']}, {result['scheme_id']}")
+        return {"intent": result["intent"], "scheme_id": result["scheme_id"]}
+
+    intent_classifier.record(used_llm=True)
+    with timed("intent", "llm"):
+        return await llm_detect_intent(user_text)
+
+async def llm_detect_intent(user_text: str):
     """
     Uses Sarvam LLM to classify user intent and extract scheme info.
     Returns: {"intent": "query"|"apply", "scheme_id": str|None}
@@ -373,11 +596,7 @@ Examples:
 - "What documents do I need?" → {{"intent": "query", "scheme_id": null}}
 - "Submit my application for Jan Dhan" → {{"intent": "apply", "scheme_id": "pmjdy"}}"""
 
-    response = sarvam_client.chat.completions(model='sarvam-30b', 
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    raw = response.choices[0].message.content.strip()
+    raw = (await llm_router.chat([{"role": "user", "content": prompt}], task="intent")).strip()
     print(f"🧠 Intent Detection Raw: {raw}")
     
     # Parse JSON from response
@@ -395,12 +614,90 @@ Examples:
         print(f"⚠️ Intent parse failed, defaulting to query")
         return {"intent": "query", "scheme_id": None}
 
-async def async_detect_intent(user_text: str):
-    import asyncio
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, detect_intent, user_text)
+# ---------------------------------------------------------
+# Speculative retrieval: search while the intent is still being detected
+# ---------------------------------------------------------
+# Most traffic is questions, so retrieval starts on the local scheme guess at the
+# same time as detect_intent. The result is used when the intent comes back as
+# "query" for the same scheme, re-run when the scheme changed, and cancelled
+# for "apply" (the executor thread finishes, its result is simply dropped).
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+speculation_stats = {"hits": 0, "rescoped": 0, "discarded": 0, "saved_ms_total": 0.0}
+
+async def _timed(coro):
+    started = time.perf_counter()
+    result = await coro
+    return result, (time.perf_counter() - started) * 1000
+
+async def _timed_search(search, user_text, scheme_id):
+    # The search coroutine is created inside the task, so dropping the task before it starts leaves nothing un-awaited
+    return await _timed(search(user_text, scheme_id=scheme_id))
+
+def _drop_task(task):
+    task.cancel()
+    # Retrieve any exception so an abandoned search never logs "exception was never retrieved"
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+async def detect_intent_and_retrieve(user_text, scheme_id=None, search=None, retrieve=True, classified=None):
+    """
+    Returns (intent_result, detected_scheme, retrieved_facts, timings).
+    retrieved_facts is empty unless the intent is "query" (and retrieve is set); timings holds intent_ms,
+    retrieval_ms, total_ms, the speculation outcome and the latency it saved.
+    classified: the caller's intent_classifier.classify(user_text) result, if it already ran it.
+    """
+    search = search or async_high_quality_search
+    started = time.perf_counter()
+    if classified is None:
+        with timed("intent", "rules"):
+            classified = intent_classifier.classify(user_text)
+    guessed_scheme = resolve_scheme_filter(scheme_id or classified["scheme_id"])
+
+    retrieval_task = None
+    if retrieve and SPECULATIVE_RETRIEVAL:
+        retrieval_task = asyncio.create_task(_timed_search(search, user_text, guessed_scheme))
+
+    try:
+        intent_result, intent_ms = await _timed(async_detect_intent(user_text, classified))
+    except BaseException:
+        # Intent failed (both LLM providers down) or we were cancelled: don't leak the speculative search
+        if retrieval_task:
+            _drop_task(retrieval_task)
+        raise
+    detected_scheme = scheme_id or intent_result["scheme_id"]  # explicit > detected
+    timings = {"intent_ms": round(intent_ms, 1), "retrieval_ms": None, "speculation": "off", "saved_ms": 0.0}
+
+    if intent_result["intent"] != "query" or not retrieve:
+        if retrieval_task:
+            _drop_task(retrieval_task)
+            timings["speculation"] = "discarded"
+            speculation_stats["discarded"] += 1
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return intent_result, detected_scheme, [], timings
+
+    if retrieval_task and resolve_scheme_filter(detected_scheme) == guessed_scheme:
+        retrieved_facts, retrieval_ms = await retrieval_task
+        timings["speculation"] = "hit"
+        speculation_stats["hits"] += 1
+    else:
+        if retrieval_task:
+            # Scoped to the wrong scheme; search again with the one the classifier settled on
+            _drop_task(retrieval_task)
+            timings["speculation"] = "rescoped"
+            speculation_stats["rescoped"] += 1
+        retrieved_facts, retrieval_ms = await _timed(search(user_text, scheme_id=detected_scheme))
+
+    total_ms = (time.perf_counter() - started) * 1000
+    timings["retrieval_ms"] = round(retrieval_ms, 1)
+    timings["total_ms"] = round(total_ms, 1)
+    if timings["speculation"] == "hit":
+        # What running the two stages back to back would have cost, minus what it did cost
+        timings["saved_ms"] = round(max(0.0, intent_ms + retrieval_ms - total_ms), 1)
+        speculation_stats["saved_ms_total"] += timings["saved_ms"]
+    print(f"⏱️ Intent {timings['intent_ms']}ms + retrieval {timings['retrieval_ms']}ms "
+          f"({timings['speculation']}, saved {timings['saved_ms']}ms)")
+    return intent_result, detected_scheme, retrieved_facts, timings
 
-def extract_user_details(ocr_text: str):
+async def async_extract_user_details(ocr_text: str):
     prompt = f"""You are a data extraction assistant. Extract personal details from the following OCR text of uploaded documents to fill a government scheme application form.
 
 Available fields to extract (return ONLY a valid JSON object matching these keys):
@@ -432,10 +729,7 @@ Text:
 '''
 """
     try:
-        response = sarvam_client.chat.completions(model='sarvam-30b', 
-            messages=[{"role": "user", "content": prompt}]
-        )
-        raw = response.choices[0].message.content.strip()
+        raw = (await llm_router.chat([{"role": "user", "content": prompt}], task="extract")).strip()
         if "```" in raw:
             raw = raw.split("```")[1].replace("json", "").strip()
         # Ensure it's valid JSON
@@ -444,79 +738,116 @@ Text:
         print("Failed to extract details:", e)
         return {}
 
-async def async_extract_user_details(ocr_text: str):
-    import asyncio
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, extract_user_details, ocr_text)
 
+def check_audio_delivery(delivery: str, audio_format: str):
+    """400 for an unknown delivery mode or format, before any STT / TTS work is spent."""
+    if delivery not in DELIVERY_MODES:
+        raise HTTPException(status_code=400, detail=f"delivery must be one of {', '.join(DELIVERY_MODES)}")
+    if audio_format not in AUDIO_FORMATS:
+        raise HTTPException(status_code=400, detail=f"audio_format must be one of {', '.join(AUDIO_FORMATS)}")
+
+async def voice_reply(payload: dict, audio_base64: str, delivery: str = "json", audio_format: str = "wav"):
+    """
+    Shapes a voice reply for the requested delivery:
+      json   -> payload + audio_base64 (the original contract)
+      binary -> the audio itself as the body; user_text / agent_text / meta go in X-* headers,
+                capped at AUDIO_HEADER_MAX_BYTES each (X-Text-Truncated: true when cut)
+      url    -> payload + audio_url, fetchable for AUDIO_URL_TTL seconds
+    """
+    if delivery == "json":
+        return {**payload, "audio_base64": audio_base64}
+    with timed("audio_encode", "ffmpeg"):
+        audio, used_format, media_type = await audio_delivery.encode(audio_base64, audio_format)
+    if delivery == "url":
+        token = audio_delivery.park(audio, media_type)
+        return {**payload, "audio_url": f"/api/audio/{token}", "audio_format": used_format,
+                "audio_size": len(audio), "expires_in": audio_delivery.url_ttl}
+    headers = {"X-Audio-Format": used_format, "Cache-Control": "no-store"}
+    truncated = False
+    for header, key in (("X-User-Text", "user_text"), ("X-Agent-Text", "agent_text")):
+        if key in payload:
+            headers[header], cut = header_text(payload[key])
+            truncated = truncated or cut
+    if "meta" in payload:
+        # Cut JSON is useless, so meta is left out rather than truncated
+        meta, cut = header_text(json.dumps(payload["meta"], ensure_ascii=False))
+        if cut:
+            truncated = True
+        else:
+            headers["X-Voice-Meta"] = meta
+    if truncated:
+        # Long replies: the full text is in the delivery=url / json envelope
+        headers["X-Text-Truncated"] = "true"
+    return Response(content=audio, media_type=media_type, headers=headers)
+
+@app.get("/api/audio/{token}")
+async def get_parked_audio(token: str):
+    """Audio handed out by delivery=url. Gone after AUDIO_URL_TTL seconds."""
+    clip = audio_delivery.fetch(token)
+    if clip is None:
+        raise HTTPException(status_code=404, detail="Audio expired or not found")
+    audio, media_type = clip
+    return Response(content=audio, media_type=media_type, headers={"Cache-Control": "private, max-age=60"})
 
 @app.get("/api/voice-agent/welcome")
-async def get_welcome_audio():
+async def get_welcome_audio(delivery: str = "json", audio_format: str = "wav"):
     """
-    Returns the initial welcome greeting from Shubh (male voice) as base64 audio.
+    Returns the initial welcome greeting from Shubh (male voice).
+    delivery=json (base64, default) | binary | url; audio_format=wav | opus | mp3 for binary / url.
     """
+    check_audio_delivery(delivery, audio_format)
     try:
-        greeting_text = "Namaste! Main Shubh hoon, Yojana Setu se aapka digital sahayak. Sarkari yojanaon se judi koi bhi jaankari chahiye, toh bas mujhe bataiye. Main yahan aapki sunne aur madad karne ke liye hoon. Boliye, aaj main aapki kya sahayata kar sakta hoon?"
-        tts_response = sarvam_client.text_to_speech.convert(
-            text=greeting_text,
-            target_language_code="hi-IN",
-            model="bulbul:v3",
-            speaker="shubh"
-        )
-        audio_base64 = tts_response.audios[0] if hasattr(tts_response, 'audios') else tts_response.get("audios", [""])[0]
-        return {"audio_base64": audio_base64}
+        # Pre-rendered at startup, so this is normally a disk read
+        audio_base64 = await synthesize_speech(WELCOME_GREETING, "hi-IN")
+        return await voice_reply({"agent_text": WELCOME_GREETING}, audio_base64, delivery, audio_format)
     except Exception as e:
         print(f"❌ Welcome Audio Error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch welcome audio")
 
-@app.post("/api/voice-agent")
-async def voice_agent_orchestrator(
-    audio: UploadFile = File(...),
-    user_name: str = Form("Citizen"),
-    scheme_id: Optional[str] = Form(None)
-):
+async def transcribe_audio(audio_bytes, filename, content_type="application/octet-stream", pcm_sample_rate=None):
     """
-    🎤 Voice-to-Voice Agent Endpoint
-    1. Transcribe audio -> Text
-    2. Process Text through Orchestrator Logic
-    3. Response Text -> Audio
-    4. Return Text + Audio
+    Preprocesses then transcribes. Raw PCM (the WebSocket path) is passed with its pcm_sample_rate.
+    Returns "" without calling STT when the recording has no speech in it.
     """
-    # 1. Save temp audio
+    if audio_preprocessor is not None:
+        try:
+            with timed("audio_prep"):
+                if pcm_sample_rate:
+                    prepared = await audio_preprocessor.prepare_pcm(audio_bytes, pcm_sample_rate, filename)
+                else:
+                    prepared = await audio_preprocessor.prepare(audio_bytes, filename, content_type)
+            if prepared["silent"]:
+                return ""
+            audio_bytes, filename, content_type = prepared["audio"], prepared["filename"], prepared["content_type"]
+        except Exception as e:
+            # Never lose a turn to preprocessing; the original recording still goes to STT
+            print(f"⚠️ Audio preprocessing failed, sending the original: {e}")
+    if pcm_sample_rate and content_type == "audio/pcm":
+        audio_bytes, content_type = pcm_to_wav(audio_bytes, pcm_sample_rate), "audio/wav"
+
+    # saarika:v2.5 takes flac / wav as well as the browser's webm
+    return await llm_gateway.transcribe(
+        audio_bytes,
+        filename=filename,
+        model="saarika:v2.5",
+        content_type=content_type
+    )
+
+async def transcribe_upload(audio: UploadFile):
+    """Reads the upload (no temp file needed; it goes straight into the STT request) and transcribes it."""
     ext = audio.filename.split(".")[-1] if audio.filename else "wav"
-    temp_audio_path = f"temp_voice_{uuid.uuid4()}.{ext}"
-    try:
-        with open(temp_audio_path, "wb") as buffer:
-            shutil.copyfileobj(audio.file, buffer)
-            
-        # 2. Transcribe (STT) - using saarika:v2.5 which supports direct webm processing
-        with open(temp_audio_path, "rb") as f:
-            stt_response = sarvam_client.speech_to_text.transcribe(
-                file=f,
-                model="saarika:v2.5"
-            )
-        user_text = getattr(stt_response, "transcript", None) or getattr(stt_response, "transcription", "")
-        print(f"🎙️ Voice Transcript: {user_text}")
+    audio_bytes = await audio.read()
+    user_text = await transcribe_audio(
+        audio_bytes,
+        filename=audio.filename or f"voice.{ext}",
+        content_type=audio.content_type or "application/octet-stream"
+    )
+    print(f"🎙️ Voice Transcript: {user_text}")
+    return user_text
 
-        if not user_text or user_text.strip() == "":
-            agent_text = "Maaf kijiyega, main aapki aawaz samajh nahi paya. Kripya thoda zor se aur saaf boliyee."
-            detected_intent = "unknown"
-            detected_scheme = None
-        else:
-            # 3. Decision Logic (Dynamic Language Response)
-            intent_result = await async_detect_intent(user_text)
-            detected_intent = intent_result["intent"]
-            detected_scheme = scheme_id or intent_result["scheme_id"]
-            
-            # Get context if it's a query
-            retrieved_facts = []
-            if detected_intent == "query":
-                retrieved_facts = await async_high_quality_search(user_text)
-            
-            context_string = "\n".join(retrieved_facts)
-            
-            # Unified Prompt to ensure language consistency
-            voice_system_prompt = f"""You are 'Shubh', a friendly and knowledgeable AI caseworker for Yojana-Setu interacting over a voice call. 
+def build_voice_prompt(user_name, detected_intent, detected_scheme, context_string, user_text):
+    """System prompt shared by the one-shot and sentence-streamed voice endpoints."""
+    return f"""You are 'Shubh', a friendly and knowledgeable AI caseworker for Yojana-Setu interacting over a voice call. 
             USER CONTEXT: Name: {user_name}, Intent: {detected_intent}, Detected Scheme: {detected_scheme}.
             FACTS FOR REFERENCE: {context_string or 'General government scheme guidance.'}
             
@@ -536,51 +867,281 @@ async def voice_agent_orchestrator(
             - Keep the tone very polite, helpful, and natural (like a human talking on the phone).
             - Do not use markdown (no **bold**, no *italics*, no bullet points like -, *, 1. 2. 3.) because this text will be directly spoken by a Text-to-Speech voice engine. Use natural pauses and commas."""
 
-            chat_response = groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
+@app.post("/api/voice-agent")
+async def voice_agent_orchestrator(
+    audio: UploadFile = File(...),
+    user_name: str = Form("Citizen"),
+    scheme_id: Optional[str] = Form(None),
+    delivery: str = Form("json"),
+    audio_format: str = Form("wav")
+):
+    """
+    🎤 Voice-to-Voice Agent Endpoint
+    1. Transcribe audio -> Text
+    2. Process Text through Orchestrator Logic
+    3. Response Text -> Audio
+    4. Return Text + Audio (delivery=json | binary | url, see voice_reply)
+    """
+    check_audio_delivery(delivery, audio_format)
+    try:
+        # 1-2. Read the upload and transcribe it
+        user_text = await transcribe_upload(audio)
+
+        if not user_text or user_text.strip() == "":
+            agent_text = VOICE_NOT_HEARD
+            detected_intent = "unknown"
+            detected_scheme = None
+            stage_timings = {}
+        else:
+            # 3. Decision Logic (Dynamic Language Response)
+            # Context for queries is fetched concurrently with intent detection
+            intent_result, detected_scheme, retrieved_facts, stage_timings = await detect_intent_and_retrieve(
+                user_text, scheme_id
+            )
+            detected_intent = intent_result["intent"]
+            
+            context_string = assemble_context(retrieved_facts, channel="voice")["text"]
+            
+            # Unified Prompt to ensure language consistency
+            voice_system_prompt = build_voice_prompt(user_name, detected_intent, detected_scheme, context_string, user_text)
+
+            agent_text = await llm_router.chat(
+                [
                     {"role": "system", "content": voice_system_prompt},
                     {"role": "user", "content": user_text}
                 ],
+                task="voice",
                 temperature=0.7,
                 max_tokens=600
             )
-            agent_text = chat_response.choices[0].message.content
 
         # 4. Text-to-Speech (Dynamic Language Detection)
-        # Use regex to detect if there are Hindi (Devanagari) characters
-        import re
-        is_hindi = bool(re.search(r'[\u0900-\u097F]', agent_text))
-        target_lang = "hi-IN" if is_hindi else "en-IN"
+        # Hindi (Devanagari) characters select the Hindi voice
+        target_lang = speech_language(agent_text)
         
         print(f"🔊 AI Response ({target_lang}): {agent_text}")
 
-        tts_response = sarvam_client.text_to_speech.convert(
-            text=agent_text,
-            target_language_code=target_lang,
-            model="bulbul:v3",
-            speaker="shubh" 
-        )
-        audio_base64 = tts_response.audios[0] if hasattr(tts_response, 'audios') else tts_response.get("audios", [""])[0]
+        # Fixed lines and repeated answers are served from the TTS cache
+        audio_base64 = await synthesize_speech(agent_text, target_lang)
 
-        return {
+        return await voice_reply({
             "user_text": user_text,
             "agent_text": agent_text,
-            "audio_base64": audio_base64,
-            "meta": {"intent": detected_intent, "scheme": detected_scheme}
-        }
+            "meta": {"intent": detected_intent, "scheme": detected_scheme, "timings": stage_timings}
+        }, audio_base64, delivery, audio_format)
 
     except Exception as e:
         print(f"❌ Voice Agent Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/voice-agent/stream")
+async def voice_agent_stream(
+    audio: UploadFile = File(...),
+    user_name: str = Form("Citizen"),
+    scheme_id: Optional[str] = Form(None)
+):
+    """
+    🎤 Sentence-streamed Voice Agent (SSE)
+    Same pipeline as /api/voice-agent, but the LLM reply is cut into sentences as it
+    streams and each sentence is synthesized concurrently. Events, in order:
+      {"meta": {...}}  ->  {"segment": {"index", "text", "language", "audio_base64"}} ...
+      ->  {"done": {"agent_text", "time_to_first_audio_ms"}}  ->  [DONE]
+    """
+    started = time.perf_counter()
+    try:
+        user_text = await transcribe_upload(audio)
+    except Exception as e:
+        print(f"❌ Voice Stream STT Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        spoken, first_audio_ms = [], None
+        # The 200 is already out, so every failure from here on has to become an event
+        try:
+            if not user_text or not user_text.strip():
+                detected_intent, detected_scheme, stage_timings = "unknown", None, {}
+
+                async def deltas():
+                    yield VOICE_NOT_HEARD
+            else:
+                intent_result, detected_scheme, retrieved_facts, stage_timings = await detect_intent_and_retrieve(
+                    user_text, scheme_id
+                )
+                detected_intent = intent_result["intent"]
+                context_string = assemble_context(retrieved_facts, channel="voice")["text"]
+                messages = [
+                    {"role": "system", "content": build_voice_prompt(
+                        user_name, detected_intent, detected_scheme, context_string, user_text
+                    )},
+                    {"role": "user", "content": user_text}
+                ]
+
+                def deltas():
+                    return llm_router.chat_stream(messages, task="voice", temperature=0.7, max_tokens=600)
+
+            yield f"data: {json.dumps({'meta': {'user_text': user_text, 'intent': detected_intent, 'scheme': detected_scheme, 'timings': stage_timings}})}\n\n"
+
+            async for segment in stream_speech(deltas(), synthesize_speech, speech_language):
+                if first_audio_ms is None and segment["audio_base64"]:
+                    first_audio_ms = round((time.perf_counter() - started) * 1000, 1)
+                    observe_stage("first_audio", first_audio_ms / 1000, "sarvam")
+                spoken.append(segment["text"])
+                yield f"data: {json.dumps({'segment': segment}, ensure_ascii=False)}\n\n"
+        except LLMGatewayError as e:
+            print(f"❌ Voice Stream LLM Error: {e}")
+            yield f"data: {json.dumps({'error': f'LLM API Error: {e}'})}\n\n"
+        except Exception as e:
+            print(f"❌ Voice Stream Error: {e}")
+            yield f"data: {json.dumps({'error': f'Voice pipeline error: {e}'})}\n\n"
+
+        agent_text = " ".join(spoken)
+        print(f"🔊 AI Response (streamed, first audio {first_audio_ms} ms): {agent_text}")
+        yield f"data: {json.dumps({'done': {'agent_text': agent_text, 'time_to_first_audio_ms': first_audio_ms}}, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+async def run_voice_turn(websocket: WebSocket, session: VoiceSession, pcm: bytes):
+    """
+    One socket turn: STT on the finished utterance, then the reply streamed back sentence by sentence.
+    Always ends with a done message; a failure anywhere in the pipeline sends an error just before it.
+    """
+    started = time.perf_counter()
+    user_text, detected_scheme = None, None
+    spoken, first_audio_ms = [], None
+    try:
+        user_text = await transcribe_audio(
+            pcm, filename="utterance.wav", content_type="audio/pcm", pcm_sample_rate=session.sample_rate
+        )
+        print(f"🎙️ Voice Transcript (socket turn {session.turns + 1}): {user_text}")
+
+        if not user_text or not user_text.strip():
+            detected_intent, stage_timings = "unknown", {}
+
+            async def deltas():
+                yield VOICE_NOT_HEARD
+        else:
+            # Follow-ups ("what documents?") stay on the scheme the call is already about
+            classified = intent_classifier.classify(user_text)
+            scheme_hint = session.scheme_hint(classified["scheme_id"])
+            intent_result, detected_scheme, retrieved_facts, stage_timings = await detect_intent_and_retrieve(
+                user_text, scheme_hint, classified=classified
+            )
+            detected_intent = intent_result["intent"]
+            context_string = assemble_context(retrieved_facts, channel="voice")["text"]
+            messages = session.messages(
+                build_voice_prompt(session.user_name, detected_intent, detected_scheme, context_string, user_text),
+                user_text
+            )
+
+            def deltas():
+                return llm_router.chat_stream(messages, task="voice", temperature=0.7, max_tokens=600)
+
+        await session.send(websocket, {
+            "type": "transcript", "user_text": user_text, "intent": detected_intent,
+            "scheme": detected_scheme, "timings": stage_timings
+        })
+
+        async for segment in stream_speech(deltas(), synthesize_speech, speech_language):
+            if first_audio_ms is None and segment["audio_base64"]:
+                first_audio_ms = round((time.perf_counter() - started) * 1000, 1)
+                observe_stage("first_audio", first_audio_ms / 1000, "sarvam")
+            spoken.append(segment["text"])
+            await session.send(websocket, {"type": "segment", **segment})
+    except Exception as e:
+        # STT, intent (both LLM providers down), retrieval or the reply stream; cancellation (barge-in) passes through
+        stage = "STT" if user_text is None else "LLM API" if isinstance(e, LLMGatewayError) else "Voice pipeline"
+        print(f"❌ Voice Socket {stage} Error: {e}")
+        await session.send(websocket, {"type": "error", "detail": f"{stage} Error: {e}"})
+    finally:
+        # Also runs when the caller barges in: only what was actually said goes into the history
+        agent_text = " ".join(spoken)
+        if user_text and user_text.strip() and agent_text:
+            session.remember(user_text, agent_text, detected_scheme)
+
+    print(f"🔊 AI Response (socket, first audio {first_audio_ms} ms): {agent_text}")
+    await session.send(websocket, {"type": "done", "agent_text": agent_text, "time_to_first_audio_ms": first_audio_ms})
+
+def _log_voice_turn_failure(task: asyncio.Task):
+    # Whatever run_voice_turn couldn't report to the client (usually a send on a closed socket)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ Voice socket turn failed: {task.exception()!r}")
+
+@app.websocket("/ws/voice-agent")
+async def voice_agent_socket(websocket: WebSocket):
+    """
+    🎤 Full-duplex Voice Agent over one WebSocket
+    Client -> server:
+      text  {"type": "start", "user_name", "scheme_id", "sample_rate"}   (optional, any time)
+      bytes raw PCM16 little-endian mono frames (16 kHz unless sample_rate says otherwise)
+      text  {"type": "end_of_utterance"}  force the current utterance to end now
+      text  {"type": "stop"}              close the session
+    Server -> client (JSON):
+      ready, speech_start, interrupted, transcript, segment {index, text, language, audio_base64}, done, error
+    Talking over a reply (barge-in) cancels it.
+    """
+    await websocket.accept()
+    current_route.set("/ws/voice-agent")  # the HTTP metrics middleware never sees websocket scopes
+    session = VoiceSession()
+    await session.send(websocket, {"type": "ready", "sample_rate": session.sample_rate})
+
+    def start_turn(pcm):
+        if session.replying:
+            session.reply_task.cancel()
+        session.reply_task = asyncio.create_task(run_voice_turn(websocket, session, pcm))
+        session.reply_task.add_done_callback(_log_voice_turn_failure)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                for event in session.vad.feed(message["bytes"]):
+                    if event == "speech_start":
+                        if session.replying:
+                            session.reply_task.cancel()
+                            await session.send(websocket, {"type": "interrupted"})
+                        await session.send(websocket, {"type": "speech_start"})
+                    else:
+                        start_turn(event[1])
+                continue
+
+            try:
+                control = json.loads(message.get("text") or "{}")
+            except json.JSONDecodeError:
+                control = None
+            if not isinstance(control, dict):  # "5" and [] are valid JSON too
+                await session.send(websocket, {"type": "error", "detail": "Expected JSON control message or PCM bytes"})
+                continue
+            kind = control.get("type")
+            if kind == "start":
+                try:
+                    session.configure(control.get("user_name"), control.get("scheme_id"), control.get("sample_rate"))
+                except ValueError as e:
+                    # Nothing was applied: the socket keeps listening at the current rate
+                    await session.send(websocket, {"type": "error", "detail": f"Invalid start message: {e}"})
+                    continue
+                await session.send(websocket, {"type": "ready", "sample_rate": session.sample_rate})
+            elif kind == "end_of_utterance":
+                pcm = session.vad.flush()
+                if pcm:
+                    start_turn(pcm)
+            elif kind == "stop":
+                if session.replying:
+                    await asyncio.wait([session.reply_task])  # a failed turn was already logged
+                await websocket.close()
+                break
+    except WebSocketDisconnect:
+        pass
     finally:
-        if os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path)
+        if session.replying:
+            session.reply_task.cancel()
+        print(f"🔌 Voice socket closed after {session.turns} turn(s)")
 
 # ---------------------------------------------------------
 # IVR (Twilio Phone Call) Endpoints
 # ---------------------------------------------------------
-from fastapi.responses import Response
 
 @app.post("/api/ivr/welcome")
 async def ivr_welcome():
@@ -618,7 +1179,7 @@ async def ivr_handle_speech(request: Request):
     try:
         # 1. Search knowledge base
         retrieved_facts = await async_high_quality_search(speech_result)
-        context_string = "\n".join(retrieved_facts)
+        context_string = assemble_context(retrieved_facts, channel="ivr")["text"]
         
         # 2. Language detection
         is_hindi = bool(re.search(r'[\u0900-\u097F]', speech_result))
@@ -635,13 +1196,10 @@ async def ivr_handle_speech(request: Request):
         - Keep the answer SHORT (2-3 sentences max) since this is a phone call.
         - Be warm and helpful. End by asking if they have more questions."""
 
-        chat_response = sarvam_client.chat.completions(model='sarvam-30b', 
-            messages=[
-                {"role": "system", "content": ivr_prompt},
-                {"role": "user", "content": speech_result}
-            ]
-        )
-        agent_text = chat_response.choices[0].message.content
+        agent_text = await llm_router.chat([
+            {"role": "system", "content": ivr_prompt},
+            {"role": "user", "content": speech_result}
+        ], task="ivr")
         print(f"🤖 AI Response: {agent_text}")
         
         # 4. Use Polly voice via TwiML (simpler than Sarvam TTS for phone)
@@ -679,6 +1237,8 @@ async def agent_orchestrator(
     scheme_id: str = Form(None),
     session_id: str = Form(None)
 ):
+    request_started = time.perf_counter()
+
     # Fetch stored user profile from database
     stored_profile = storage_service.get_user_profile(user_id) or {}
     print(f"👤 Stored profile for {user_id}: {list(stored_profile.keys())}")
@@ -695,10 +1255,11 @@ async def agent_orchestrator(
     print(f"🤖 AGENT REQUEST: text='{user_text}', files={len(documents) if documents else 0}, scheme_id={scheme_id}")
     print(f"{'='*50}")
     
-    # Step 1: Detect intent
-    intent_result = await async_detect_intent(user_text)
+    # Step 1: Detect intent (questions without uploads get their retrieval started alongside it)
+    intent_result, detected_scheme, retrieved_facts, stage_timings = await detect_intent_and_retrieve(
+        user_text, scheme_id, search=async_reranked_search, retrieve=not documents
+    )
     detected_intent = intent_result["intent"]
-    detected_scheme = scheme_id or intent_result["scheme_id"]  # explicit > detected
     
     print(f"🎯 Intent: {detected_intent}, Scheme: {detected_scheme}")
     
@@ -706,32 +1267,46 @@ async def agent_orchestrator(
     # ROUTE 1: User is asking questions → Knowledge Agent (RAG)
     # --------------------------------------------------
     if detected_intent == "query" and not documents:
-        retrieved_facts = await async_high_quality_search(user_text)
-        context_string = "\n\n---\n\n".join(retrieved_facts)
+        lang = detect_language(user_text)
+        # The retrieval above already embedded the query, so this is an embedding_cache hit
+        embedding = await async_query_embedding(user_text) if answer_cache else None
+        hit = answer_cache.lookup("agent", user_text, embedding, detected_scheme, lang) if answer_cache else None
+        if hit:
+            print(f"⚡ Answer cache hit [agent] (similarity {hit['similarity']})")
+
+            async def replay_with_metadata():
+                yield f"data: {json.dumps({'meta': {'intent': 'query', 'detected_scheme': detected_scheme, 'context_tokens': hit['extra'].get('context_tokens', 0), 'timings': stage_timings}})}\n\n"
+                for event in replay_events(hit["answer"]):
+                    yield event
+                answer_cache.record_hit_latency((time.perf_counter() - request_started) * 1000)
+                if session_id:
+                    storage_service.save_chat_message(session_id, user_id, "chat", "assistant", hit["answer"])
+
+            return StreamingResponse(replay_with_metadata(), media_type="text/event-stream")
+
+        context = assemble_context(retrieved_facts, channel="agent")
+        context_string = context["text"]
         
         if not context_string:
             context_string = "No specific scheme guidelines were found for this query."
         
-        system_prompt = f"""You are a helpful, empathetic caseworker for Yojana-Setu, assisting rural citizens in India.
-Answer their question clearly and simply based ONLY on these facts:
-
-{context_string}
-
-IMPORTANT GUIDELINES:
-- When a user asks about documents needed, required information, or how to apply, give a DETAILED and STRUCTURED answer.
-- List ALL specific form fields they need to fill (e.g., Full Name, Father's Name, Date of Birth, Gender, Aadhaar Number, Mobile Number, Category, Income, Address, State, District, PIN Code etc.).
-- Mention exact document requirements including accepted file formats (JPG, PNG, PDF) and maximum file sizes (2MB for documents, 1MB for photos).
-- For fields with dropdown options (like Gender, Category, State), list the available options.
-- Use numbered sections and bullet points for clarity.
-- If the user seems interested in applying, let them know you can help them apply by uploading their documents.
-Do not use jargon. Be warm and encouraging."""
+        system_prompt = AGENT_QUERY_PROMPT.format(context_string=context_string)
 
         async def stream_with_metadata():
             # Send intent metadata first so the client knows the route
-            yield f"data: {json.dumps({'meta': {'intent': 'query', 'detected_scheme': detected_scheme}})}\n\n"
+            yield f"data: {json.dumps({'meta': {'intent': 'query', 'detected_scheme': detected_scheme, 'context_tokens': context['tokens'], 'timings': stage_timings}})}\n\n"
             
+            def remember(answer):
+                answer_cache.put("agent", user_text, embedding, answer, scheme_id=detected_scheme, lang=lang,
+                                 extra={"context_tokens": context["tokens"]},
+                                 generation_ms=(time.perf_counter() - request_started) * 1000)
+
+            stream = get_sarvam_stream(system_prompt, user_text)
+            if answer_cache and retrieved_facts:
+                stream = cache_completed_answer(stream, remember)
+
             full_response_content = ""
-            async for chunk in get_sarvam_stream(system_prompt, user_text):
+            async for chunk in stream:
                 # Extract content from chunk for saving
                 if chunk.startswith("data:"):
                     try:
@@ -927,10 +1502,7 @@ Do not use jargon. Be warm and encouraging."""
             Sign off: Team Yojana Setu."""
 
         try:
-            chat_response = sarvam_client.chat.completions(model='sarvam-30b', 
-                messages=[{"role": "user", "content": llm_prompt}]
-            )
-            response_text = chat_response.choices[0].message.content
+            response_text = await llm_router.chat([{"role": "user", "content": llm_prompt}], task="chat")
         except Exception as e:
             print(f"⚠️ LLM response generation failed: {e}")
             if is_hindi:
@@ -1067,11 +1639,7 @@ async def apply_for_scheme(
         Application failed: '{submission_result["message"]}'.
         Inform {user_name}. Sign off: Team Yojana Setu."""
 
-    chat_response = sarvam_client.chat.completions(model='sarvam-30b', 
-        messages=[{"role": "user", "content": system_prompt}]
-    )
-    
-    agent_response_text = chat_response.choices[0].message.content
+    agent_response_text = await llm_router.chat([{"role": "user", "content": system_prompt}], task="chat")
     if session_id:
         storage_service.save_chat_message(session_id, user_id, "chat", "assistant", agent_response_text)
         
@@ -1093,6 +1661,27 @@ async def get_profile(phone: str):
         raise HTTPException(status_code=404, detail="Profile not found")
     return profile
 
+@app.get("/api/stats")
+async def get_stats():
+    """Cache and fallback counters for sizing and tuning."""
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "intent_classifier": intent_classifier.stats(),
+        "speculative_retrieval": {**speculation_stats, "saved_ms_total": round(speculation_stats["saved_ms_total"], 1)},
+        "reranker": rerank_service.stats() if rerank_service else None,
+        "http_pool": llm_gateway.stats(),
+        "llm_router": llm_router.stats(),
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "tts_cache": tts_cache.stats() if tts_cache else None,
+        "audio_delivery": audio_delivery.stats(),
+        "audio_preprocessing": audio_preprocessor.stats() if audio_preprocessor else None
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: per-route, per-stage latency histograms and error counters."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/api/chat/sessions/{user_id}")
 async def get_sessions(user_id: str):
     return storage_service.get_user_sessions(user_id)
@@ -0,0 +1,147 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# ---------------------------------------------------------
+# Per-Stage Latency Metrics (Prometheus text format on /metrics)
+# ---------------------------------------------------------
+# Timers and counters around every stage of a request (STT, intent, embed,
+# vector query, rerank, LLM, TTS, OCR phases, Playwright steps, DynamoDB).
+# Kept dependency-free: a histogram is a fixed bucket array under a lock,
+# rendered in the exposition format Prometheus scrapes.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "yojana")
+
+# Seconds. Covers a 2 ms cache hit up to a 60 s Playwright submission.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Set per request by the HTTP middleware; stages recorded outside a request are "background"
+current_route = contextvars.ContextVar("current_route", default="background")
+UNMATCHED_ROUTE = "unmatched"  # requests no route handles (404s, scanners)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+# ---- the metrics the app records ----
+
+STAGE_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_stage_duration_seconds", "Time spent in one stage of a request.",
+    ["route", "stage", "provider"]
+)
+STAGE_ERRORS = Counter(
+    f"{METRICS_PREFIX}_stage_errors_total", "Stages that raised or reported a failure.",
+    ["route", "stage", "provider"]
+)
+LLM_TTFT_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_llm_time_to_first_token_seconds", "Streamed LLM calls: time until the first content delta.",
+    ["route", "provider", "model"]
+)
+LLM_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_llm_duration_seconds", "Complete LLM call, streamed or not.",
+    ["route", "provider", "model"]
+)
+UPSTREAM_TTFB_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_upstream_ttfb_seconds", "Pooled upstream HTTP calls: time until response headers.",
+    ["route", "provider"]
+)
+REQUEST_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_http_request_duration_seconds", "Time until response headers, per route.",
+    ["route", "method", "status"]
+)
+
+REGISTRY = [REQUEST_SECONDS, STAGE_SECONDS, STAGE_ERRORS, LLM_TTFT_SECONDS, LLM_SECONDS, UPSTREAM_TTFB_SECONDS]
+
+
+def observe_stage(stage, seconds, provider="", route=None, failed=False):
+    if not METRICS_ENABLED:
+        return
+    route = route or current_route.get()
+    STAGE_SECONDS.observe(seconds, route=route, stage=stage, provider=provider)
+    if failed:
+        STAGE_ERRORS.inc(route=route, stage=stage, provider=provider)
+
+
+@contextmanager
+def timed(stage, provider=""):
+    """with timed("embed", "pinecone"): ...  — records the duration, and an error if the block raises."""
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - started, provider, failed=failed)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
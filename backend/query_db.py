@@ -2,6 +2,7 @@ import os
 from pinecone import Pinecone
 from dotenv import load_dotenv
 from sentence_transformers import SentenceTransformer, CrossEncoder
+from content_store import load_content_store
 
 load_dotenv()
 
@@ -17,6 +18,9 @@ pc = Pinecone(api_key=pinecone_api_key)
 index_name = "yojana-setu"
 index = pc.Index(index_name)
 
+# Chunk text is no longer stored in Pinecone metadata; look it up locally by id
+content_store = load_content_store()
+
 def high_quality_search(query, fetch_k=20, top_n=3):
     # Step 1: Semantic Search (fetch_k results)
     query_embedding = bi_encoder.encode(query).tolist()
@@ -36,8 +40,7 @@ def high_quality_search(query, fetch_k=20, top_n=3):
     
     for match in results.matches:
         meta = match.metadata or {}
-        # We stored the text inside metadata['content']
-        doc = meta.get('content', '')
+        doc = content_store.get(match.id, '')
         documents.append(doc)
         metadatas.append(meta)
 
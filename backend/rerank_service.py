@@ -0,0 +1,172 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+
+# ---------------------------------------------------------
+# Cross-Request Micro-Batching for the CrossEncoder reranker
+# ---------------------------------------------------------
+# Each request contributes ~20 (query, doc) pairs. Instead of one small forward
+# pass per request, a single worker thread collects pairs from concurrent
+# requests and flushes them as one batch when it is big enough or the oldest
+# request has waited `max_wait_ms`. Results go back to each request's future.
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_MAX_BATCH = int(os.getenv("RERANK_MAX_BATCH", "64"))      # pairs per forward pass
+RERANK_MAX_WAIT_MS = float(os.getenv("RERANK_MAX_WAIT_MS", "10"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))   # per-request; over budget -> keep vector order
+
+
+class _RerankJob:
+    def __init__(self, query, documents, loop, future):
+        self.pairs = [[query, doc] for doc in documents]
+        self.loop = loop
+        self.future = future
+        self.cancelled = False
+
+
+class RerankService:
+    """
+    Off-event-loop reranker. `await rerank(query, docs)` returns one score per doc,
+    or None when the request's time budget runs out first.
+    """
+
+    def __init__(self, model=None, model_name=RERANK_MODEL, max_batch=RERANK_MAX_BATCH,
+                 max_wait_ms=RERANK_MAX_WAIT_MS, budget_ms=RERANK_BUDGET_MS):
+        self.model = model
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.budget_ms = budget_ms
+        self._jobs = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.batches = 0
+        self.pairs_scored = 0
+        self.requests = 0
+        self.budget_skips = 0
+
+    def start(self):
+        """Starts the worker thread (and loads the model in it) if not already running."""
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="rerank-worker", daemon=True)
+                self._worker.start()
+
+    def _load_model(self):
+        if self.model is None:
+            from sentence_transformers import CrossEncoder
+            print(f"Loading reranker model {self.model_name}...")
+            self.model = CrossEncoder(self.model_name)
+            print("✅ Reranker ready")
+
+    def _collect_batch(self):
+        """Blocks for the first job, then keeps taking jobs until the batch is full or the deadline passes."""
+        batch = [self._jobs.get()]
+        pair_count = len(batch[0].pairs)
+        deadline = time.monotonic() + self.max_wait
+        while pair_count < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._jobs.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(job)
+            pair_count += len(job.pairs)
+        return batch
+
+    def _run(self):
+        load_error = None
+        try:
+            self._load_model()
+        except Exception as e:
+            # Keep draining the queue so requests fail fast instead of waiting out their budget
+            print(f"❌ Reranker model failed to load: {e}")
+            load_error = e
+
+        while True:
+            jobs = [job for job in self._collect_batch() if not job.cancelled]
+            if not jobs:
+                continue
+
+            all_pairs = [pair for job in jobs for pair in job.pairs]
+            scores, error = None, load_error
+            if error is None:
+                try:
+                    scores = self.model.predict(all_pairs, batch_size=self.max_batch)
+                except Exception as e:
+                    error = e
+
+            with self.stats_lock:
+                self.batches += 1
+                self.pairs_scored += len(all_pairs)
+
+            offset = 0
+            for job in jobs:
+                result = None if error is not None else [float(s) for s in scores[offset:offset + len(job.pairs)]]
+                offset += len(job.pairs)
+                try:
+                    job.loop.call_soon_threadsafe(_resolve, job.future, result, error)
+                except RuntimeError:
+                    # The caller's event loop closed while its job was in the batch; the worker must survive it
+                    pass
+
+    async def rerank(self, query, documents, budget_ms=None):
+        if not documents:
+            return []
+        self.start()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job = _RerankJob(query, documents, loop, future)
+        with self.stats_lock:
+            self.requests += 1
+        self._jobs.put(job)
+
+        budget = (budget_ms if budget_ms is not None else self.budget_ms) / 1000.0
+        try:
+            return await asyncio.wait_for(future, timeout=budget)
+        except asyncio.CancelledError:
+            # Caller gave up (e.g. a discarded speculative search): don't spend a forward pass on it
+            job.cancelled = True
+            raise
+        except asyncio.TimeoutError:
+            # Worker skips the job if it has not been batched yet
+            job.cancelled = True
+            with self.stats_lock:
+                self.budget_skips += 1
+            return None
+        except Exception as e:
+            print(f"⚠️ Reranking failed, keeping vector order: {e}")
+            return None
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                "model": self.model_name,
+                "requests": self.requests,
+                "batches": self.batches,
+                "pairs_scored": self.pairs_scored,
+                "avg_pairs_per_batch": round(self.pairs_scored / self.batches, 2) if self.batches else 0.0,
+                "budget_skips": self.budget_skips
+            }
+
+
+def _resolve(future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def rerank_order(documents, scores, top_n):
+    """Sorts documents by reranker score; falls back to the original (vector) order when scores is None."""
+    if scores is None:
+        return documents[:top_n]
+    ranked = sorted(zip(documents, scores), key=lambda x: x[1], reverse=True)
+    return [doc for doc, _ in ranked[:top_n]]
@@ -0,0 +1,86 @@
+# ---------------------------------------------------------
+# Scheme Registry: Maps schemes to required docs & portals
+# ---------------------------------------------------------
+# Lives in its own module so the chunking/indexing scripts can tag chunks
+# without importing main.py (which connects to Pinecone, DynamoDB, etc.).
+# portal_url will be updated later when dummy sites are ready
+# source_documents lists the guideline markdowns whose chunks belong to the scheme.
+# aliases are the English / Hindi / transliterated names intent_classifier.py looks for.
+SCHEME_REGISTRY = {
+    "pmay-g": {
+        "name": "Pradhan Mantri Awaas Yojana - Gramin (PMAY-G)",
+        "required_docs": ["aadhar", "income", "photo"],
+        "portal_url": "https://dummy-pmawas.vercel.app/",
+        "description": "Housing scheme for rural areas",
+        "source_documents": ["pmayg_formatted.md", "sauditg_formatted.md", "pmay_application_guide.md"],
+        "aliases": [
+            "pmay-g", "pmayg", "pmay gramin", "pmay rural", "pm awas gramin", "awas yojana gramin",
+            "pradhan mantri awas yojana gramin", "pradhan mantri awaas yojana gramin", "gramin awas yojana",
+            "gramin awas", "rural housing scheme", "indira awas yojana", "iay",
+            "प्रधानमंत्री आवास योजना ग्रामीण", "आवास योजना ग्रामीण", "ग्रामीण आवास योजना", "ग्रामीण आवास",
+            "पीएम आवास ग्रामीण", "इंदिरा आवास योजना"
+        ]
+    },
+    "pmay-u": {
+        "name": "Pradhan Mantri Awaas Yojana - Urban (PMAY-U)",
+        "required_docs": ["aadhar", "income", "photo"],
+        "portal_url": "https://dummy-pmawas.vercel.app/",
+        "description": "Housing scheme for urban areas",
+        "source_documents": ["pmayu_formatted.md", "pmay_application_guide.md"],
+        "aliases": [
+            "pmay-u", "pmayu", "pmay urban", "pmay-u 2.0", "pm awas urban", "awas yojana urban",
+            "pradhan mantri awas yojana urban", "pradhan mantri awaas yojana urban", "shahari awas yojana",
+            "shahri awas", "urban housing scheme", "blc", "ahp", "arh",
+            "प्रधानमंत्री आवास योजना शहरी", "आवास योजना शहरी", "शहरी आवास योजना", "शहरी आवास", "पीएम आवास शहरी"
+        ]
+    },
+    "pmjdy": {
+        "name": "Pradhan Mantri Jan Dhan Yojana (PMJDY)",
+        "required_docs": ["aadhar", "photo"],
+        "portal_url": "https://pm-kisan-portal.vercel.app/",
+        "description": "Financial inclusion - bank accounts for all",
+        "source_documents": ["pmjdy_formatted.md", "pmjdyup_formatted.md"],
+        "aliases": [
+            "pmjdy", "jan dhan", "jandhan", "jan-dhan", "jan dhan yojana", "pradhan mantri jan dhan yojana",
+            "jan dhan account", "jan dhan khata", "zero balance account",
+            "जन धन", "जनधन", "जन-धन", "जन धन योजना", "प्रधानमंत्री जन धन योजना", "जन धन खाता"
+        ]
+    },
+    "rhiss": {
+        "name": "Rural Housing Interest Subsidy Scheme (RHISS)",
+        "required_docs": ["aadhar"],
+        "portal_url": "http://127.0.0.1:8000/mock-gov-portal",
+        "description": "Housing scheme for rural areas",
+        "source_documents": ["rhiss_formatted.md"],
+        "aliases": [
+            "rhiss", "rural housing interest subsidy", "rural housing interest subsidy scheme",
+            "housing interest subsidy", "ग्रामीण आवास ब्याज सब्सिडी", "आवास ब्याज सब्सिडी"
+        ]
+    },
+}
+
+
+def scheme_ids_for_source(source_document):
+    """Canonical scheme ids a guideline document belongs to (a shared guide can serve several)."""
+    return [
+        scheme_id for scheme_id, info in SCHEME_REGISTRY.items()
+        if source_document in info.get("source_documents", [])
+    ]
+
+
+def tag_chunk_schemes(chunk):
+    """Adds metadata["scheme_ids"] to a chunk dict if it is missing. Returns the chunk."""
+    metadata = chunk.setdefault("metadata", {})
+    if "scheme_ids" not in metadata:
+        scheme_ids = scheme_ids_for_source(metadata.get("source_document", ""))
+        # Chunks from documents outside the registry stay untagged (only unscoped search finds them)
+        if scheme_ids:
+            metadata["scheme_ids"] = scheme_ids
+    return chunk
+
+
+def resolve_scheme_filter(scheme_id):
+    """Only scope retrieval to ids we actually know; LLM-detected ids can be made up."""
+    if scheme_id and scheme_id in SCHEME_REGISTRY:
+        return scheme_id
+    return None
@@ -0,0 +1,126 @@
+import os
+import re
+import asyncio
+
+# ---------------------------------------------------------
+# Sentence-Streamed Speech (LLM deltas -> ordered TTS segments)
+# ---------------------------------------------------------
+# Instead of waiting for the whole completion and synthesizing it in one call,
+# the token stream is cut at sentence boundaries and each sentence goes to TTS
+# as soon as it is complete. Synthesis runs concurrently (bounded), segments
+# are delivered strictly in order, so the caller hears the first sentence while
+# the rest is still being generated.
+VOICE_MIN_SENTENCE_CHARS = int(os.getenv("VOICE_MIN_SENTENCE_CHARS", "25"))  # shorter pieces ride with the next
+VOICE_MAX_SENTENCE_CHARS = int(os.getenv("VOICE_MAX_SENTENCE_CHARS", "400"))  # cut run-ons at a comma / space
+VOICE_TTS_CONCURRENCY = int(os.getenv("VOICE_TTS_CONCURRENCY", "3"))
+
+# Danda / double danda, Latin terminators, and the full-width forms LLMs sometimes emit
+_BOUNDARY = re.compile(r"[.!?।॥！？]+[\"'”’)]*(?=\s)")
+# "Rs. 1.2 lakh", "Dr. Sharma", "No. 5" shouldn't end a sentence
+_ABBREVIATIONS = {"rs", "dr", "mr", "mrs", "ms", "no", "st", "sh", "smt", "shri", "govt", "approx", "etc", "vs", "e.g", "i.e"}
+_SOFT_BREAK = re.compile(r"[,;:،]\s")
+
+
+class SentenceSplitter:
+    """Feed it LLM deltas; it hands back whole sentences as soon as they end."""
+
+    def __init__(self, min_chars=VOICE_MIN_SENTENCE_CHARS, max_chars=VOICE_MAX_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def _is_abbreviation(self, end):
+        word = re.search(r"([\w.]+)\.$", self.buffer[:end].rstrip("\"')”’"))
+        return bool(word) and word.group(1).lower() in _ABBREVIATIONS
+
+    def _next_cut(self):
+        for match in _BOUNDARY.finditer(self.buffer):
+            end = match.end()
+            if end < self.min_chars or self._is_abbreviation(end):
+                continue
+            return end
+        if len(self.buffer) > self.max_chars:
+            # No terminator for a long stretch: break at the last comma, else the last space
+            window = self.buffer[:self.max_chars]
+            soft = list(_SOFT_BREAK.finditer(window))
+            if soft:
+                return soft[-1].end() - 1
+            space = window.rfind(" ")
+            return space if space > 0 else self.max_chars
+        return None
+
+    def feed(self, delta):
+        self.buffer += delta or ""
+        sentences = []
+        cut = self._next_cut()
+        while cut is not None:
+            sentence = self.buffer[:cut].strip()
+            self.buffer = self.buffer[cut:].lstrip()
+            if sentence:
+                sentences.append(sentence)
+            cut = self._next_cut()
+        return sentences
+
+    def flush(self):
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+
+async def stream_speech(deltas, synthesize, language_for, concurrency=VOICE_TTS_CONCURRENCY):
+    """
+    Consumes an async iterator of text deltas and yields
+    {"index", "text", "language", "audio_base64", "error"} per sentence, in order.
+    synthesize(text, language) -> base64 audio. A failed sentence yields audio_base64=None
+    and the stream carries on; an LLM failure is raised after the sentences already spoken.
+    """
+    queue = asyncio.Queue()
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def synthesize_one(text, language):
+        async with limiter:
+            return await synthesize(text, language)
+
+    def schedule(sentence):
+        language = language_for(sentence)
+        task = asyncio.create_task(synthesize_one(sentence, language))
+        queue.put_nowait((sentence, language, task))
+
+    async def produce():
+        splitter = SentenceSplitter()
+        try:
+            async for delta in deltas:
+                for sentence in splitter.feed(delta):
+                    schedule(sentence)
+            for sentence in splitter.flush():
+                schedule(sentence)
+        finally:
+            queue.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    pending = []
+    try:
+        index = 0
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            sentence, language, task = item
+            pending.append(task)
+            segment = {"index": index, "text": sentence, "language": language, "audio_base64": None, "error": None}
+            try:
+                segment["audio_base64"] = await task
+            except Exception as e:
+                print(f"⚠️ TTS failed for segment {index}: {e}")
+                segment["error"] = str(e)
+            yield segment
+            index += 1
+        await producer  # surfaces an LLM failure
+    finally:
+        for task in [producer] + pending:
+            if not task.done():
+                task.cancel()
+        # Sentences queued but never awaited (client went away)
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None and not item[2].done():
+                item[2].cancel()
@@ -4,6 +4,7 @@ import boto3
 import time
 from datetime import datetime
 from dotenv import load_dotenv
+from metrics import timed
 
 load_dotenv()
 
@@ -35,9 +36,10 @@ class StorageService:
             from boto3.dynamodb.conditions import Attr
             
             # Use scan with FilterExpression since user_id is not the Partition Key
-            response = self.sessions_table.scan(
-                FilterExpression=Attr('user_id').eq(user_id)
-            )
+            with timed("dynamodb_scan", "dynamodb"):
+                response = self.sessions_table.scan(
+                    FilterExpression=Attr('user_id').eq(user_id)
+                )
             items = response.get('Items', [])
             
             # Sort by updated_at descending
@@ -51,9 +53,10 @@ class StorageService:
         """Retrieves all messages for a specific session."""
         try:
             from boto3.dynamodb.conditions import Key
-            response = self.messages_table.query(
-                KeyConditionExpression=Key('session_id').eq(session_id)
-            )
+            with timed("dynamodb_query", "dynamodb"):
+                response = self.messages_table.query(
+                    KeyConditionExpression=Key('session_id').eq(session_id)
+                )
             items = response.get('Items', [])
             # Sort by created_at ascending (Query usually returns sorted by SK if it's there)
             items.sort(key=lambda x: x.get('created_at', ''))
@@ -68,33 +71,36 @@ class StorageService:
             now = datetime.now().isoformat()
             
             # 1. Update/Put Session
-            self.sessions_table.put_item(
-                Item={
-                    'session_id': session_id,
-                    'user_id': user_id,
-                    'title': title,
-                    'updated_at': now
-                }
-            )
+            with timed("dynamodb_put_item", "dynamodb"):
+                self.sessions_table.put_item(
+                    Item={
+                        'session_id': session_id,
+                        'user_id': user_id,
+                        'title': title,
+                        'updated_at': now
+                    }
+                )
             
             # 2. Add Message
             message_id = f"{session_id}_{int(time.time() * 1000)}"
-            self.messages_table.put_item(
-                Item={
-                    'session_id': session_id,
-                    'created_at': now,
-                    'role': role,
-                    'content': content,
-                    'message_id': message_id
-                }
-            )
+            with timed("dynamodb_put_item", "dynamodb"):
+                self.messages_table.put_item(
+                    Item={
+                        'session_id': session_id,
+                        'created_at': now,
+                        'role': role,
+                        'content': content,
+                        'message_id': message_id
+                    }
+                )
         except Exception as e:
             print(f"Chat save error (DynamoDB): {e}")
 
     def get_user_profile(self, phone_number):
         """Retrieves user profile from DynamoDB."""
         try:
-            response = self.user_table.get_item(Key={'user_id': phone_number})
+            with timed("dynamodb_get_item", "dynamodb"):
+                response = self.user_table.get_item(Key={'user_id': phone_number})
             item = response.get('Item')
             if item:
                 # DynamoDB might store as attributes directly or as JSON string
@@ -117,7 +123,8 @@ class StorageService:
             # Clean up empty strings if DynamoDB version is old (newer allows them)
             # But let's keep it simple
             
-            self.user_table.put_item(Item=profile)
+            with timed("dynamodb_put_item", "dynamodb"):
+                self.user_table.put_item(Item=profile)
             return True
         except Exception as e:
             print(f"Error saving user profile to DynamoDB: {e}")
@@ -135,12 +142,13 @@ class StorageService:
             bucket = os.getenv('S3_BUCKET_NAME')
             if not bucket:
                 return None
-            s3_client.put_object(
-                Bucket=bucket,
-                Key=file_name,
-                Body=file_content,
-                ContentType=content_type
-            )
+            with timed("s3_put_object", "s3"):
+                s3_client.put_object(
+                    Bucket=bucket,
+                    Key=file_name,
+                    Body=file_content,
+                    ContentType=content_type
+                )
             return f"s3://{bucket}/{file_name}"
         except Exception as e:
             print(f"Error uploading to S3: {e}")
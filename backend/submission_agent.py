@@ -6,15 +6,19 @@ import sys
 import zipfile
 import io
 import json
+import time
 import tempfile
 import httpx
 from playwright.sync_api import sync_playwright
 from sarvamai import SarvamAI
 from dotenv import load_dotenv
+from llm_gateway import shared_sync_client
+from metrics import timed, observe_stage
 
 load_dotenv()
 
-sarvam_client = SarvamAI(api_subscription_key=os.getenv("SARVAM_API_KEY"))
+# Reuses the same keep-alive pool settings as the async gateway
+sarvam_client = SarvamAI(api_subscription_key=os.getenv("SARVAM_API_KEY"), httpx_client=shared_sync_client("sarvam"))
 
 
 async def validate_document_with_sarvam(file_path: str, expected_doc_type: str):
@@ -35,47 +39,62 @@ async def validate_document_with_sarvam(file_path: str, expected_doc_type: str):
 
         filename = os.path.basename(upload_target)
         
+        # The document_intelligence SDK is synchronous: run it off the event loop
+        docs = sarvam_client.document_intelligence
+
         # 1. Initialize Job
-        job = sarvam_client.document_intelligence.initialise()
+        with timed("ocr_initialise", "sarvam"):
+            job = await asyncio.to_thread(docs.initialise)
         job_id = job.job_id
         
         # 2. Get Upload Link
-        links = sarvam_client.document_intelligence.get_upload_links(
-            job_id=job_id, files=[filename]
-        )
+        with timed("ocr_upload_links", "sarvam"):
+            links = await asyncio.to_thread(docs.get_upload_links, job_id=job_id, files=[filename])
         upload_url = links.upload_urls[filename].file_url
         
         # 3. Upload File to Blob Storage
         with open(upload_target, "rb") as f:
-            res = httpx.put(
-                upload_url, 
-                content=f.read(),
-                headers={"x-ms-blob-type": "BlockBlob", "Content-Type": "application/octet-stream"}
-            )
-            if res.status_code not in (200, 201):
-                return {"is_valid": False, "error": f"Failed to upload document: {res.status_code}"}
+            content = f.read()
+        with timed("ocr_upload", "blob"):
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                res = await client.put(
+                    upload_url,
+                    content=content,
+                    headers={"x-ms-blob-type": "BlockBlob", "Content-Type": "application/octet-stream"}
+                )
+        if res.status_code not in (200, 201):
+            return {"is_valid": False, "error": f"Failed to upload document: {res.status_code}"}
         
         # 4. Start Processing
-        sarvam_client.document_intelligence.start(job_id=job_id)
+        with timed("ocr_start", "sarvam"):
+            await asyncio.to_thread(docs.start, job_id=job_id)
         
         # 5. Poll for completion (Wait until Sarvam processes the document)
         max_retries = 30
+        processing_started = time.perf_counter()
         for _ in range(max_retries):
-            status = sarvam_client.document_intelligence.get_status(job_id=job_id)
+            status = await asyncio.to_thread(docs.get_status, job_id=job_id)
             if status.job_state in ("Completed", "PartiallyCompleted"):
+                observe_stage("ocr_processing", time.perf_counter() - processing_started, "sarvam")
                 break
             if status.job_state == "Failed":
+                observe_stage("ocr_processing", time.perf_counter() - processing_started, "sarvam", failed=True)
                 return {"is_valid": False, "error": "Document OCR processing failed on Sarvam AI."}
             await asyncio.sleep(2) # Prevent blocking event loop
         else:
+            observe_stage("ocr_processing", time.perf_counter() - processing_started, "sarvam", failed=True)
             return {"is_valid": False, "error": "Document processing timed out."}
             
         # 6. Get Download Links & Read Text
-        dl_links = sarvam_client.document_intelligence.get_download_links(job_id=job_id)
-        
+        with timed("ocr_download", "sarvam"):
+            dl_links = await asyncio.to_thread(docs.get_download_links, job_id=job_id)
+            downloads = {}
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                for fname, dl_info in dl_links.download_urls.items():
+                    downloads[fname] = await client.get(dl_info.file_url)
+
         extracted_text = ""
-        for fname, dl_info in dl_links.download_urls.items():
-            res = httpx.get(dl_info.file_url)
+        for fname, res in downloads.items():
             if fname.endswith(".zip") or b"PK\x03\x04" in res.content[:4]:
                 with zipfile.ZipFile(io.BytesIO(res.content)) as z:
                     for zname in z.namelist():
@@ -128,7 +147,7 @@ async def validate_document_with_sarvam(file_path: str, expected_doc_type: str):
 # Playwright Script (runs as a SEPARATE PROCESS to avoid Windows event loop issues)
 # ---------------------------------------------------------------------------
 _PLAYWRIGHT_SCRIPT = '''
-import sys, json, os, traceback
+import sys, json, os, time, traceback
 
 # Ensure Windows Proactor Loop for subprocess stability
 if os.name == 'nt':
@@ -156,6 +175,15 @@ if "file_path" in data and data["file_path"]:
 portal_url = data["portal_url"]
 mock_portal_url = data.get("mock_portal_url")
 
+# Per-step durations, reported back to the server in the result JSON for /metrics
+step_timings = {}
+_step_started = [time.perf_counter()]
+
+def mark(step):
+    now = time.perf_counter()
+    step_timings[step] = round(now - _step_started[0], 4)
+    _step_started[0] = now
+
 try:
     from playwright.sync_api import sync_playwright
     with sync_playwright() as p:
@@ -163,6 +191,7 @@ try:
         browser = p.chromium.launch(headless=True)
         context = browser.new_context()
         page = context.new_page()
+        mark("launch")
         
         # Set a default timeout for all actions
         page.set_default_timeout(15000)
@@ -174,6 +203,7 @@ try:
         
         print(json.dumps({"debug": "Navigating to " + target_url}), file=sys.stderr)
         page.goto(target_url, wait_until="domcontentloaded")
+        mark("navigate")
         
         if "dummy-pmawas.vercel.app" in target_url:
             print(json.dumps({"debug": "Filling PMAY multi-step form..."}), file=sys.stderr)
@@ -398,6 +428,7 @@ try:
                 print(json.dumps({"debug": "Uploading file: " + default_file}), file=sys.stderr)
                 page.set_input_files("#file-upload-input", default_file)
         
+        mark("fill_form")
         print(json.dumps({"debug": "Clicking submit..."}), file=sys.stderr)
         if "pm-kisan-portal.vercel.app" in target_url:
             page.click("#submitBtn")
@@ -409,6 +440,7 @@ try:
             page.wait_for_selector("#btn-submit", state="visible")
             page.click("#btn-submit")
         
+        mark("submit")
         # Wait for success message
         print(json.dumps({"debug": "Waiting for success message..."}), file=sys.stderr)
         
@@ -423,14 +455,16 @@ try:
             page.wait_for_selector("#success-message", state="visible", timeout=10000)
             success_text = page.locator("#success-message").inner_text()
         
+        mark("confirm")
         browser.close()
         # Ensure the JSON is the ONLY thing on the last line of stdout
-        print(json.dumps({"status": "success", "message": success_text}))
+        print(json.dumps({"status": "success", "message": success_text, "step_timings": step_timings}))
 except Exception as e:
     print(json.dumps({
         "status": "error", 
         "message": f"Portal submission failed: {str(e)}",
-        "trace": traceback.format_exc()
+        "trace": traceback.format_exc(),
+        "step_timings": step_timings
     }))
     sys.exit(1)
 '''
@@ -439,6 +473,19 @@ except Exception as e:
 async def submit_to_portal_agent(user_data: dict, file_paths: dict, portal_url: str = "http://127.0.0.1:8000/mock-gov-portal"):
     """
     The 'Action Agent': Runs Playwright in a completely separate Python process.
+    Records the total and the per-step timings the runner reports.
+    """
+    started = time.perf_counter()
+    result = await _run_portal_agent(user_data, file_paths, portal_url)
+    failed = result.get("status") != "success"
+    for step, seconds in (result.pop("step_timings", None) or {}).items():
+        observe_stage(f"playwright_{step}", seconds, "playwright")
+    observe_stage("playwright_total", time.perf_counter() - started, "playwright", failed=failed)
+    return result
+
+
+async def _run_portal_agent(user_data: dict, file_paths: dict, portal_url: str):
+    """
     Uses tempfile to avoid triggering uvicorn reloads on file changes.
     """
     import tempfile
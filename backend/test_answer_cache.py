@@ -0,0 +1,70 @@
+import os
+import json
+import tempfile
+from answer_cache import AnswerCache, replay_events, detect_language
+
+def test_lookup_by_similarity_scheme_and_language():
+    print("Testing semantic lookup...")
+    cache = AnswerCache("v1", threshold=0.95, path="")
+    cache.put("agent", "What documents are needed for PMAY-G?", [1.0, 0.0, 0.1], "Aadhaar and bank passbook.",
+              scheme_id="pmay-g", lang="en", generation_ms=2000)
+    # Close paraphrase (cosine ~0.999) in the same bucket hits
+    hit = cache.lookup("agent", "Which documents do I need for PMAY-G", [1.0, 0.02, 0.1], "pmay-g", "en")
+    assert hit and hit["answer"] == "Aadhaar and bank passbook."
+    # Same question, different scheme or language or channel misses
+    assert cache.lookup("agent", "What documents are needed for PMAY-G?", [1.0, 0.0, 0.1], "pmjdy", "en") is None
+    assert cache.lookup("agent", "What documents are needed for PMAY-G?", [1.0, 0.0, 0.1], "pmay-g", "hi") is None
+    assert cache.lookup("chat", "What documents are needed for PMAY-G?", [1.0, 0.0, 0.1], "pmay-g", "en") is None
+    # Unrelated question misses; no embedding falls back to an exact text match
+    assert cache.lookup("agent", "Who is eligible?", [0.0, 1.0, 0.0], "pmay-g", "en") is None
+    assert cache.lookup("agent", "what documents are  needed for pmay-g?", None, "pmay-g", "en") is not None
+    cache.record_hit_latency(50)
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 4 and stats["saved_ms_total"] == 1950.0
+    assert detect_language("पीएम आवास के लिए दस्तावेज़") == "hi"
+    print("✅ Semantic lookup OK")
+
+def test_schemes_one_token_apart_do_not_share_answers():
+    print("Testing scheme-keyed chat bucket...")
+    from intent_classifier import IntentClassifier
+    from schemes import resolve_scheme_filter
+    classifier = IntentClassifier()
+    rural, urban = "Documents for PMAY-G", "Documents for PMAY-U"
+    rural_scheme = resolve_scheme_filter(classifier.classify(rural)["scheme_id"])
+    urban_scheme = resolve_scheme_filter(classifier.classify(urban)["scheme_id"])
+    assert (rural_scheme, urban_scheme) == ("pmay-g", "pmay-u")
+
+    cache = AnswerCache("v1", threshold=0.95, path="")
+    cache.put("chat", rural, [1.0, 0.0, 0.1], "Gramin: Aadhaar, job card.", scheme_id=rural_scheme)
+    # Embeddings this close (cosine ~0.9998) would replay the rural answer in a shared bucket
+    assert cache.lookup("chat", urban, [1.0, 0.01, 0.1], urban_scheme) is None
+    assert cache.lookup("chat", rural, [1.0, 0.01, 0.1], rural_scheme)["answer"] == "Gramin: Aadhaar, job card."
+    print("✅ Scheme-keyed chat bucket OK")
+
+def test_version_change_invalidates_persisted_entries():
+    print("Testing version invalidation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "answers.jsonl")
+        AnswerCache("v1", path=path).put("chat", "how to apply", [0.5, 0.5], "Visit the gram panchayat.")
+        assert AnswerCache("v1", path=path).lookup("chat", "how to apply", [0.5, 0.5]) is not None
+        # New index / prompt version: the old answer is dropped and the file compacted
+        assert AnswerCache("v2", path=path).lookup("chat", "how to apply", [0.5, 0.5]) is None
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == ""
+    print("✅ Version invalidation OK")
+
+def test_replay_uses_stream_framing():
+    print("Testing SSE replay...")
+    answer = "You need Aadhaar, a bank account and a job card. Apply at the gram panchayat."
+    events = list(replay_events(answer, chunk_words=4))
+    assert events[-1] == "data: [DONE]\n\n"
+    assert all(e.startswith("data: ") and e.endswith("\n\n") for e in events)
+    assert "".join(json.loads(e[6:])["content"] for e in events[:-1]) == answer
+    print("✅ SSE replay OK")
+
+if __name__ == "__main__":
+    test_lookup_by_similarity_scheme_and_language()
+    test_schemes_one_token_apart_do_not_share_answers()
+    test_version_change_invalidates_persisted_entries()
+    test_replay_uses_stream_framing()
+    print("All answer cache tests passed!")
@@ -0,0 +1,46 @@
+import time
+import base64
+import asyncio
+from urllib.parse import unquote
+from audio_delivery import AudioDelivery, header_text
+
+def test_falls_back_to_wav_without_ffmpeg():
+    print("Testing audio encode fallback...")
+    delivery = AudioDelivery(ffmpeg_path=None)
+    audio, used_format, media_type = asyncio.run(delivery.encode(base64.b64encode(b"RIFFwav").decode(), "opus"))
+    assert (audio, used_format, media_type) == (b"RIFFwav", "wav", "audio/wav")
+    try:
+        delivery.resolve_format("flac")
+        assert False, "flac should be rejected"
+    except ValueError:
+        pass
+    print("✅ Audio encode fallback OK")
+
+def test_parked_clips_expire():
+    print("Testing short-lived audio URLs...")
+    delivery = AudioDelivery(ffmpeg_path=None, url_ttl=0.05)
+    token = delivery.park(b"clip", "audio/ogg")
+    assert delivery.fetch(token) == (b"clip", "audio/ogg")
+    assert delivery.fetch(token) is not None  # replays are fine until it expires
+    time.sleep(0.06)
+    assert delivery.fetch(token) is None
+    print("✅ Short-lived audio URLs OK")
+
+def test_header_text_is_capped_by_encoded_bytes():
+    print("Testing text headers...")
+    # Hindi survives the trip through a latin-1 header
+    encoded, truncated = header_text("पीएम किसान, Rs. 6000?")
+    encoded.encode("latin-1")
+    assert unquote(encoded) == "पीएम किसान, Rs. 6000?" and not truncated
+    # The cap is on encoded bytes: 1500 Devanagari characters would be 13.5 KB
+    reply = "क" * 1500
+    encoded, truncated = header_text(reply, max_bytes=1024)
+    assert truncated and len(encoded) <= 1024
+    assert reply.startswith(unquote(encoded)) and len(unquote(encoded)) == 1024 // 9
+    print("✅ Text headers OK")
+
+if __name__ == "__main__":
+    test_falls_back_to_wav_without_ffmpeg()
+    test_parked_clips_expire()
+    test_header_text_is_capped_by_encoded_bytes()
+    print("All audio delivery tests passed!")
@@ -0,0 +1,50 @@
+import io
+import wave
+import asyncio
+import numpy as np
+from audio_preprocess import AudioPreprocessor
+
+def _stereo_wav(speech_seconds, rate=48000, silence_seconds=1.0):
+    t = np.arange(int(rate * speech_seconds)) / rate
+    tone = 8000 * np.sin(2 * np.pi * 300 * t)
+    quiet = np.zeros(int(rate * silence_seconds))
+    mono = np.concatenate([quiet, tone, quiet]).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.repeat(mono, 2).tobytes())
+    return buffer.getvalue()
+
+def test_downsamples_and_trims_wav():
+    print("Testing audio preprocessing...")
+    prep = AudioPreprocessor(ffmpeg_path=None)
+    recording = _stereo_wav(1.0)
+    result = asyncio.run(prep.prepare(recording, "voice.wav", "audio/wav"))
+    assert result["processed"] and not result["silent"]
+    with wave.open(io.BytesIO(result["audio"])) as wav:
+        assert (wav.getframerate(), wav.getnchannels()) == (16000, 1)
+        seconds = wav.getnframes() / 16000
+    # 1 s of speech plus 200 ms padding each side, the 2 s of silence gone
+    assert 1.0 <= seconds <= 1.5, seconds
+    assert result["output_bytes"] < len(recording) / 8
+    print("✅ Audio preprocessing OK")
+
+def test_silent_recordings_skip_stt():
+    print("Testing silent recording rejection...")
+    prep = AudioPreprocessor(ffmpeg_path=None)
+    assert asyncio.run(prep.prepare(_stereo_wav(0.0), "voice.wav"))["silent"]
+    assert asyncio.run(prep.prepare(b"", "voice.webm"))["silent"]
+    # webm without ffmpeg can't be decoded here: passed through untouched
+    passthrough = asyncio.run(prep.prepare(b"\x1aE\xdf\xa3webm", "voice.webm", "audio/webm"))
+    assert not passthrough["processed"] and passthrough["audio"] == b"\x1aE\xdf\xa3webm"
+    stats = prep.stats()
+    assert stats["rejected_silent"] == 2 and stats["passthrough"] == 1
+    prep.close()
+    print("✅ Silent recording rejection OK")
+
+if __name__ == "__main__":
+    test_downsamples_and_trims_wav()
+    test_silent_recordings_skip_stt()
+    print("All audio preprocessing tests passed!")
@@ -0,0 +1,39 @@
+from bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+CHUNKS = [
+    {"chunk_id": "pmayu_chunk_0", "content": "5.1.1 Beneficiary Led Construction (BLC) for EWS families.", "metadata": {"Header 1": "5. Verticals"}},
+    {"chunk_id": "pmayu_chunk_1", "content": "Affordable Housing in Partnership (AHP) projects by states.", "metadata": {}},
+    {"chunk_id": "pmjdy_chunk_0", "content": "Every household gets a basic savings bank account.", "metadata": {}},
+]
+
+def test_tokenize_keeps_exact_tokens():
+    print("Testing BM25 tokenizer...")
+    tokens = tokenize("Section 5.1.1 of PMAY-G, Annexure-II")
+    assert "5.1.1" in tokens
+    assert "pmay-g" in tokens and "pmay" in tokens
+    assert "annexure-ii" in tokens
+    print("✅ Tokenizer OK")
+
+def test_bm25_exact_acronym_match():
+    print("Testing BM25 ranks exact acronyms first...")
+    index = BM25Index(CHUNKS)
+    assert index.query("What is AHP?", top_k=1)[0]["id"] == "pmayu_chunk_1"
+    assert index.query("BLC 5.1.1", top_k=1)[0]["id"] == "pmayu_chunk_0"
+    assert index.query("ISSR", top_k=3) == []
+    print("✅ BM25 OK")
+
+def test_reciprocal_rank_fusion():
+    print("Testing reciprocal-rank fusion...")
+    dense = [{"id": "a", "score": 0.9}, {"id": "b", "score": 0.8}]
+    keyword = [{"id": "b", "score": 12.0}, {"id": "c", "score": 3.0}]
+    fused = reciprocal_rank_fusion([dense, keyword], top_k=3)
+    # "b" appears in both lists so it must win
+    assert [m["id"] for m in fused] == ["b", "a", "c"]
+    assert fused[0]["score"] > fused[1]["score"]
+    print("✅ RRF OK")
+
+if __name__ == "__main__":
+    test_tokenize_keeps_exact_tokens()
+    test_bm25_exact_acronym_match()
+    test_reciprocal_rank_fusion()
+    print("All BM25 tests passed!")
@@ -0,0 +1,30 @@
+from context_builder import assemble_context, estimate_tokens
+
+FACTS = [
+    "PMAY-G gives Rs. 1.20 lakh in the plains. Hilly states get Rs. 1.30 lakh. " * 6,
+    "The minimum house size is 25 square metres including a cooking area. " * 6,
+    "Jan Dhan accounts come with a RuPay card and accident insurance. " * 6,
+]
+
+def test_context_fits_budget_in_rank_order():
+    print("Testing token-budgeted context assembly...")
+    context = assemble_context(FACTS, channel="chat", budget=200)
+    assert context["tokens"] <= 200
+    assert estimate_tokens(context["text"]) <= 200
+    assert context["truncated"] and context["chunks_total"] == 3
+    # Highest-ranked fact always comes first, and a trimmed fragment ends on a sentence
+    assert context["text"].startswith("PMAY-G gives")
+    assert context["text"].endswith(".")
+    print("✅ Budget respected")
+
+def test_context_dedupes_and_handles_empty():
+    print("Testing dedup + empty input...")
+    context = assemble_context([FACTS[0], FACTS[0]], channel="chat", budget=5000)
+    assert context["chunks_used"] == 1 and not context["truncated"]
+    assert assemble_context([], channel="ivr")["text"] == ""
+    print("✅ Dedup + empty OK")
+
+if __name__ == "__main__":
+    test_context_fits_budget_in_rank_order()
+    test_context_dedupes_and_handles_empty()
+    print("All context builder tests passed!")
@@ -0,0 +1,41 @@
+from dedup import dedup_chunks, dedup_texts
+
+PARAGRAPH = (
+    "The minimum unit size is 25 square metres including a dedicated area for hygienic cooking "
+    "and the unit assistance is shared between the Central and State Governments"
+)
+
+def test_dedup_chunks_keeps_back_references():
+    print("Testing index-time near-duplicate collapse...")
+    chunks = [
+        {"chunk_id": "pmayg_chunk_0", "content": PARAGRAPH,
+         "metadata": {"source_document": "pmayg_formatted.md", "scheme_ids": ["pmay-g"]}},
+        {"chunk_id": "pmayu_chunk_4", "content": PARAGRAPH + ".",
+         "metadata": {"source_document": "pmayu_formatted.md", "scheme_ids": ["pmay-u"]}},
+        {"chunk_id": "pmjdy_chunk_0", "content": "Every household gets a basic savings bank account.",
+         "metadata": {"source_document": "pmjdy_formatted.md", "scheme_ids": ["pmjdy"]}},
+    ]
+    kept, duplicate_of = dedup_chunks(chunks)
+    assert [c["chunk_id"] for c in kept] == ["pmayg_chunk_0", "pmjdy_chunk_0"]
+    assert duplicate_of == {"pmayu_chunk_4": "pmayg_chunk_0"}
+    # The survivor must still be found by a PMAY-U scoped search
+    assert kept[0]["metadata"]["scheme_ids"] == ["pmay-g", "pmay-u"]
+    assert kept[0]["metadata"]["source_documents"] == ["pmayg_formatted.md", "pmayu_formatted.md"]
+    assert kept[0]["metadata"]["duplicate_ids"] == ["pmayu_chunk_4"]
+    # Input chunks are not mutated
+    assert "duplicate_ids" not in chunks[0]["metadata"]
+    print("✅ Index-time dedup OK")
+
+def test_dedup_texts_prefers_fuller_hit():
+    print("Testing result-time dedup...")
+    fragment = "dedicated area for hygienic cooking"
+    other = "Every household gets a basic savings bank account."
+    assert dedup_texts([PARAGRAPH, other, PARAGRAPH]) == [PARAGRAPH, other]
+    # A higher-ranked fragment gives its slot to the chunk that contains it
+    assert dedup_texts([fragment, other, PARAGRAPH]) == [PARAGRAPH, other]
+    print("✅ Result-time dedup OK")
+
+if __name__ == "__main__":
+    test_dedup_chunks_keeps_back_references()
+    test_dedup_texts_prefers_fuller_hit()
+    print("All dedup tests passed!")
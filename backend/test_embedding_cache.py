@@ -0,0 +1,48 @@
+import time
+from embedding_cache import EmbeddingCache, normalize_query
+
+MODEL = "multilingual-e5-large"
+
+def test_lru_eviction_at_max_size():
+    print("Testing LRU eviction...")
+    cache = EmbeddingCache(max_size=2, ttl_seconds=60)
+    cache.put(MODEL, "pm kisan", [1.0])
+    cache.put(MODEL, "jan dhan", [2.0])
+    assert cache.get(MODEL, "pm kisan") == [1.0]  # now most recently used
+    cache.put(MODEL, "awas yojana", [3.0])  # evicts "jan dhan", the least recently used
+    assert cache.get(MODEL, "jan dhan") is None
+    assert cache.get(MODEL, "pm kisan") == [1.0]
+    assert cache.get(MODEL, "awas yojana") == [3.0]
+    assert cache.stats()["size"] == 2 and cache.stats()["evictions"] == 1
+    print("✅ LRU eviction OK")
+
+def test_ttl_expiry():
+    print("Testing TTL expiry...")
+    cache = EmbeddingCache(max_size=10, ttl_seconds=0.05)
+    cache.put(MODEL, "pm kisan", [1.0])
+    assert cache.get(MODEL, "pm kisan") == [1.0]
+    time.sleep(0.06)
+    assert cache.get(MODEL, "pm kisan") is None
+    stats = cache.stats()
+    assert stats["size"] == 0 and stats["evictions"] == 1
+    print("✅ TTL expiry OK")
+
+def test_normalized_queries_share_a_key_and_stats_count():
+    print("Testing normalized keys and stats...")
+    cache = EmbeddingCache(max_size=10, ttl_seconds=60)
+    assert normalize_query("  PM   Kisan\tYojana ") == "pm kisan yojana"
+    cache.put(MODEL, "PM Kisan Yojana", [1.0])
+    assert cache.get(MODEL, "  pm  kisan yojana ") == [1.0]
+    assert cache.get(MODEL, "PM KISAN\nYOJANA") == [1.0]
+    # Same text under another model is a different key
+    assert cache.get("other-model", "PM Kisan Yojana") is None
+    assert cache.get(MODEL, "jan dhan") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 2, 0.5)
+    print("✅ Normalized keys and stats OK")
+
+if __name__ == "__main__":
+    test_lru_eviction_at_max_size()
+    test_ttl_expiry()
+    test_normalized_queries_share_a_key_and_stats_count()
+    print("All embedding cache tests passed!")
@@ -0,0 +1,58 @@
+import os
+import json
+import tempfile
+from index_manifest import chunk_hash, diff_chunks, load_manifest, save_manifest
+
+MODEL = "multilingual-e5-large"
+
+def _chunk(chunk_id, content, scheme="pm-kisan"):
+    return {"chunk_id": chunk_id, "content": content, "metadata": {"scheme_id": scheme}}
+
+def test_diff_detects_added_changed_unchanged_and_removed():
+    print("Testing manifest diff...")
+    old = [_chunk("a", "Eligibility"), _chunk("b", "Documents"), _chunk("c", "Benefits"), _chunk("gone", "Old FAQ")]
+    manifest = {c["chunk_id"]: {"hash": chunk_hash(c), "model": MODEL} for c in old}
+    manifest["c"]["model"] = "older-model"  # embedded with another model: must be redone
+
+    current = [
+        _chunk("a", "Eligibility"),                  # unchanged
+        _chunk("b", "Documents: Aadhaar, bank"),     # text edited
+        _chunk("c", "Benefits"),                     # same text, old model
+        _chunk("a2", "Eligibility", "pmay-g"),       # new chunk
+    ]
+    changed, unchanged, stale, hashes = diff_chunks(current, manifest, MODEL)
+    assert sorted(c["chunk_id"] for c in changed) == ["a2", "b", "c"]
+    assert unchanged == ["a"]
+    assert stale == ["gone"]
+    assert set(hashes) == {"a", "b", "c", "a2"}
+
+    # Metadata edits count as changes too
+    retagged = [_chunk("a", "Eligibility", "pmay-g")]
+    changed, unchanged, _, _ = diff_chunks(retagged, manifest, MODEL)
+    assert [c["chunk_id"] for c in changed] == ["a"] and unchanged == []
+    print("✅ Manifest diff OK")
+
+def test_save_is_atomic_and_round_trips():
+    print("Testing manifest write...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "manifests", "yojana.json")
+        assert load_manifest(path) == {}
+        entries = {"a": {"hash": "h1", "model": MODEL}}
+        save_manifest(path, entries)
+        assert load_manifest(path) == entries
+
+        # A write that dies half way leaves the previous manifest untouched
+        try:
+            save_manifest(path, {"a": {"hash": "h2", "model": MODEL}, "b": {"hash": object()}})
+            assert False, "unserializable entry should fail"
+        except TypeError:
+            pass
+        assert load_manifest(path) == entries
+        with open(path, encoding="utf-8") as f:
+            assert json.load(f) == {"chunks": entries}
+    print("✅ Manifest write OK")
+
+if __name__ == "__main__":
+    test_diff_detects_added_changed_unchanged_and_removed()
+    test_save_is_atomic_and_round_trips()
+    print("All index manifest tests passed!")
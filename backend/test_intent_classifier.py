@@ -0,0 +1,34 @@
+from intent_classifier import IntentClassifier
+
+def test_confident_cases_skip_llm():
+    print("Testing rule-based intent + scheme detection...")
+    classifier = IntentClassifier(threshold=0.7)
+    cases = [
+        ("Is there an overdraft facility with a Jan Dhan account?", "query", "pmjdy"),
+        ("जन धन खाते में ओवरड्राफ्ट सुविधा कितनी है?", "query", "pmjdy"),
+        ("PMAY-G mein ghar ka minimum size kitna hai?", "query", "pmay-g"),
+        ("Who can get an interest subsidy under RHISS?", "query", "rhiss"),
+        ("mujhe jan dhan khata kholna hai, apply karna hai", "apply", "pmjdy"),
+        ("How do I apply for PMAY-U?", "query", "pmay-u"),
+        ("What documents do I need?", "query", None),
+    ]
+    for text, intent, scheme_id in cases:
+        result = classifier.classify(text)
+        assert result["confidence"] >= classifier.threshold, (text, result)
+        assert (result["intent"], result["scheme_id"]) == (intent, scheme_id), (text, result)
+    print("✅ Confident cases OK")
+
+def test_ambiguous_cases_fall_back():
+    print("Testing low-confidence fallbacks...")
+    classifier = IntentClassifier(threshold=0.7)
+    for text in ["haan ji", "What is the difference between PMAY-G and PMAY-U?", "ghar ke liye koi yojana hai kya?"]:
+        assert classifier.classify(text)["confidence"] < classifier.threshold, text
+    classifier.record(used_llm=True)
+    classifier.record(used_llm=False)
+    assert classifier.stats()["fallback_rate"] == 0.5
+    print("✅ Fallbacks OK")
+
+if __name__ == "__main__":
+    test_confident_cases_skip_llm()
+    test_ambiguous_cases_fall_back()
+    print("All intent classifier tests passed!")
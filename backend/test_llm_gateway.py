@@ -0,0 +1,129 @@
+import asyncio
+import json
+import httpx
+from llm_gateway import LLMGateway, LLMGatewayError
+
+def _gateway(handler):
+    return LLMGateway(max_retries=2, backoff=0, transport=httpx.MockTransport(handler))
+
+def test_chat_retries_transient_errors():
+    print("Testing chat retry on 503...")
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503, text="overloaded")
+        body = json.loads(request.content)
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"echo {body['model']}"}}]})
+
+    gateway = _gateway(handler)
+
+    async def run():
+        try:
+            return await gateway.chat([{"role": "user", "content": "hi"}])
+        finally:
+            await gateway.aclose()
+
+    assert asyncio.run(run()) == "echo sarvam-30b"
+    assert len(calls) == 2
+    assert calls[0].url.path == "/v1/chat/completions"
+    # Both attempts got a response, so both count towards TTFB
+    pool = gateway.stats()["providers"]["sarvam"]
+    assert pool["requests"] == 2 and pool["ttfb_ms_p50"] is not None
+    print("✅ Chat retry OK")
+
+def test_client_errors_are_not_retried():
+    print("Testing 401 fails fast...")
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(401, text="bad key")
+
+    async def run():
+        gateway = _gateway(handler)
+        try:
+            await gateway.chat([{"role": "user", "content": "hi"}], provider="groq", model="llama-3.3-70b-versatile")
+        finally:
+            await gateway.aclose()
+
+    try:
+        asyncio.run(run())
+        assert False, "expected LLMGatewayError"
+    except LLMGatewayError as e:
+        assert e.status == 401 and e.provider == "groq"
+    assert len(calls) == 1
+    print("✅ Fail-fast OK")
+
+def test_chat_stream_yields_deltas():
+    print("Testing streamed deltas...")
+    lines = [
+        'data: {"choices": [{"delta": {"content": "नमस्ते"}}]}',
+        "",
+        'data: {"choices": [{"delta": {"content": " ji"}}]}',
+        "data: [DONE]",
+    ]
+
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content="\n".join(lines).encode())
+
+    async def run():
+        gateway = _gateway(handler)
+        try:
+            return [delta async for delta in gateway.chat_stream([{"role": "user", "content": "hi"}])]
+        finally:
+            await gateway.aclose()
+
+    assert asyncio.run(run()) == ["नमस्ते", " ji"]
+    print("✅ Streaming OK")
+
+def test_protocol_errors_and_bad_bodies_become_gateway_errors():
+    print("Testing protocol errors and malformed responses...")
+    replies = []
+
+    def handler(request):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    async def chat(stream=False):
+        gateway = _gateway(handler)
+        try:
+            if stream:
+                return [delta async for delta in gateway.chat_stream([{"role": "user", "content": "hi"}])]
+            return await gateway.chat([{"role": "user", "content": "hi"}])
+        finally:
+            await gateway.aclose()
+
+    # A reset HTTP/2 stream is retried like a timeout
+    replies[:] = [httpx.RemoteProtocolError("stream reset"),
+                  httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})]
+    assert asyncio.run(chat()) == "ok"
+    replies[:] = [httpx.RemoteProtocolError("stream reset"),
+                  httpx.Response(200, content=b'data: {"choices": [{"delta": {"content": "ok"}}]}\ndata: [DONE]')]
+    assert asyncio.run(chat(stream=True)) == ["ok"]
+
+    for bad in (httpx.Response(200, text="<html>gateway</html>"), httpx.Response(200, json={"error": "busy"})):
+        replies[:] = [bad]
+        try:
+            asyncio.run(chat())
+            assert False, "expected LLMGatewayError"
+        except LLMGatewayError as e:
+            assert e.provider == "sarvam"
+    replies[:] = [httpx.RemoteProtocolError("stream reset")] * 3
+    try:
+        asyncio.run(chat())
+        assert False, "expected LLMGatewayError"
+    except LLMGatewayError as e:
+        assert "RemoteProtocolError" in str(e)
+    print("✅ Protocol errors and malformed responses OK")
+
+if __name__ == "__main__":
+    test_chat_retries_transient_errors()
+    test_client_errors_are_not_retried()
+    test_chat_stream_yields_deltas()
+    test_protocol_errors_and_bad_bodies_become_gateway_errors()
+    print("All LLM gateway tests passed!")
@@ -0,0 +1,86 @@
+import asyncio
+from llm_gateway import LLMGatewayError
+from llm_router import LLMRouter, LLM_ROUTER_MIN_SAMPLES
+
+ROUTES = {
+    "chat": ([("sarvam", "sarvam-30b"), ("groq", "llama-3.3-70b-versatile")], False),
+    "intent": ([("sarvam", "sarvam-30b"), ("groq", "llama-3.3-70b-versatile")], True),
+    "stream": ([("sarvam", "sarvam-m"), ("groq", "llama-3.3-70b-versatile")], False),
+}
+
+class FakeProviders:
+    """Stands in for LLMGateway: per-provider delay (seconds) and failure switch."""
+
+    def __init__(self, delays=None, failing=()):
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.calls = []
+
+    async def chat(self, messages, provider="sarvam", model="sarvam-30b", **params):
+        self.calls.append(provider)
+        await asyncio.sleep(self.delays.get(provider, 0))
+        if provider in self.failing:
+            raise LLMGatewayError(provider, "HTTP 503 - unavailable", 503)
+        return f"{provider} answer"
+
+    async def chat_stream(self, messages, provider="sarvam", model="sarvam-m", **params):
+        self.calls.append(provider)
+        if provider in self.failing:
+            raise LLMGatewayError(provider, "HTTP 503 - unavailable", 503)
+        for word in (provider, "streamed"):
+            yield word
+
+def test_failover_and_latency_ranking():
+    print("Testing failover and p50 ranking...")
+    providers = FakeProviders(failing={"sarvam"})
+    router = LLMRouter(providers, routes=ROUTES, hedging=False)
+    assert asyncio.run(router.chat([], task="chat")) == "groq answer"
+    assert router.stats()["endpoints"]["sarvam/sarvam-30b"]["error_rate"] == 1.0
+
+    # Both healthy, Groq measurably faster: it becomes the first choice
+    providers = FakeProviders(delays={"sarvam": 0.02, "groq": 0.0})
+    router = LLMRouter(providers, routes=ROUTES, hedging=False)
+
+    async def warm():
+        for _ in range(LLM_ROUTER_MIN_SAMPLES):
+            await router._call(("sarvam", "sarvam-30b"), [], {})
+            await router._call(("groq", "llama-3.3-70b-versatile"), [], {})
+
+    asyncio.run(warm())
+    assert router.rank("chat")[0] == ("groq", "llama-3.3-70b-versatile")
+    print("✅ Failover + ranking OK")
+
+def test_hedged_request_takes_first_answer():
+    print("Testing hedged requests...")
+    providers = FakeProviders(delays={"sarvam": 0.5, "groq": 0.01})
+    router = LLMRouter(providers, routes=ROUTES, hedge_delay_ms=20)
+    assert asyncio.run(router.chat([], task="intent")) == "groq answer"
+    assert providers.calls == ["sarvam", "groq"]
+    assert router.hedge_stats == {"hedged_calls": 1, "hedges_fired": 1, "hedge_wins": 1}
+    # The cancelled primary never finished, so it leaves no latency sample behind
+    sarvam = router.stats()["endpoints"]["sarvam/sarvam-30b"]
+    assert sarvam["cancelled"] == 1 and sarvam["requests"] == 0 and sarvam["error_rate"] == 0.0
+    assert router.stats()["endpoints"]["groq/llama-3.3-70b-versatile"]["requests"] == 1
+
+    # A fast primary never triggers the hedge
+    providers = FakeProviders(delays={"sarvam": 0.0, "groq": 0.0})
+    router = LLMRouter(providers, routes=ROUTES, hedge_delay_ms=200)
+    assert asyncio.run(router.chat([], task="intent")) == "sarvam answer"
+    assert providers.calls == ["sarvam"]
+    print("✅ Hedging OK")
+
+def test_stream_fails_over_before_first_delta():
+    print("Testing streamed failover...")
+    router = LLMRouter(FakeProviders(failing={"sarvam"}), routes=ROUTES)
+
+    async def collect():
+        return [delta async for delta in router.chat_stream([], task="stream")]
+
+    assert asyncio.run(collect()) == ["groq", "streamed"]
+    print("✅ Stream failover OK")
+
+if __name__ == "__main__":
+    test_failover_and_latency_ranking()
+    test_hedged_request_takes_first_answer()
+    test_stream_fails_over_before_first_delta()
+    print("All LLM router tests passed!")
@@ -0,0 +1,38 @@
+from metrics import Histogram, current_route, timed, STAGE_SECONDS, STAGE_ERRORS, render
+
+def test_histogram_renders_cumulative_buckets():
+    print("Testing histogram exposition...")
+    hist = Histogram("demo_seconds", "Demo.", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        hist.observe(value, route="/api/chat")
+    lines = hist.render()
+    assert lines[1] == "# TYPE demo_seconds histogram"
+    assert 'demo_seconds_bucket{route="/api/chat",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/api/chat",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{route="/api/chat",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="/api/chat"} 3' in lines
+    print("✅ Histogram OK")
+
+def test_timed_labels_route_and_counts_errors():
+    print("Testing stage timer...")
+    token = current_route.set("/api/voice-agent")
+    try:
+        with timed("stt", "sarvam"):
+            pass
+        try:
+            with timed("tts", "sarvam"):
+                raise RuntimeError("upstream down")
+        except RuntimeError:
+            pass
+    finally:
+        current_route.reset(token)
+    text = render()
+    assert 'stage_duration_seconds_count{route="/api/voice-agent",stage="stt",provider="sarvam"} 1' in text
+    assert 'stage_errors_total{route="/api/voice-agent",stage="tts",provider="sarvam"} 1.0' in text
+    assert STAGE_SECONDS.name in text and STAGE_ERRORS.name in text
+    print("✅ Stage timer OK")
+
+if __name__ == "__main__":
+    test_histogram_renders_cumulative_buckets()
+    test_timed_labels_route_and_counts_errors()
+    print("All metrics tests passed!")
@@ -0,0 +1,68 @@
+import time
+import asyncio
+from rerank_service import RerankService, rerank_order
+
+class FakeCrossEncoder:
+    """Scores a pair by document length and records the size of every forward pass."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batch_sizes = []
+
+    def predict(self, pairs, batch_size=None):
+        self.batch_sizes.append(len(pairs))
+        time.sleep(self.delay)
+        return [float(len(doc)) for _, doc in pairs]
+
+def _docs(n):
+    return ["d" * (i + 1) for i in range(n)]
+
+def test_concurrent_requests_share_batches():
+    print("Testing cross-request batching...")
+    model = FakeCrossEncoder()
+    service = RerankService(model=model, max_batch=64, max_wait_ms=50, budget_ms=2000)
+
+    async def run():
+        return await asyncio.gather(*(service.rerank(f"q{i}", _docs(20)) for i in range(5)))
+
+    results = asyncio.run(run())
+    # Jobs are taken whole until the batch reaches max_batch: 20+20+20+20, then the last 20
+    assert model.batch_sizes == [80, 20], model.batch_sizes
+    assert all(scores == [float(i + 1) for i in range(20)] for scores in results)
+    assert service.stats()["batches"] == 2
+    print("✅ Cross-request batching OK")
+
+def test_over_budget_keeps_vector_order():
+    print("Testing rerank budget...")
+    service = RerankService(model=FakeCrossEncoder(delay=0.05), max_wait_ms=1, budget_ms=1)
+    docs = _docs(5)
+    scores = asyncio.run(service.rerank("q", docs))
+    assert scores is None
+    assert rerank_order(docs, scores, 3) == docs[:3]
+    assert service.stats()["budget_skips"] == 1
+    print("✅ Rerank budget OK")
+
+def test_cancelled_job_is_not_scored():
+    print("Testing cancellation of a queued job...")
+    model = FakeCrossEncoder(delay=0.1)
+    service = RerankService(model=model, max_wait_ms=1, budget_ms=2000)
+
+    async def run():
+        first = asyncio.create_task(service.rerank("busy", _docs(20)))
+        await asyncio.sleep(0.03)  # worker is now inside predict()
+        queued = asyncio.create_task(service.rerank("discarded", _docs(10)))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        await first
+        await asyncio.sleep(0.05)  # give the worker time to pick up (and skip) the cancelled job
+        return queued.cancelled()
+
+    assert asyncio.run(run())
+    assert model.batch_sizes == [20], model.batch_sizes
+    print("✅ Cancellation of a queued job OK")
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_batches()
+    test_over_budget_keeps_vector_order()
+    test_cancelled_job_is_not_scored()
+    print("All rerank service tests passed!")
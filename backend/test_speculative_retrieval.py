@@ -0,0 +1,132 @@
+import os
+import asyncio
+
+# main builds its clients at import time; run it offline the way benchmark_retrieval does
+os.environ.setdefault("RETRIEVAL_MODE", "bm25")
+os.environ.setdefault("HTTP_POOL_WARMUP", "0")
+os.environ.setdefault("TTS_PRERENDER", "false")
+import benchmark_retrieval
+from content_store import load_content_store
+benchmark_retrieval.install_fake_pinecone(load_content_store())
+import main
+from llm_gateway import LLMGatewayError
+
+TEXT = "awas yojana mein kitna paisa milta hai"
+
+class FakeSearch:
+    """Records each search and whether it was cancelled before finishing."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, user_text, scheme_id=None):
+        self.calls.append(scheme_id)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(scheme_id)
+            raise
+        return [f"facts for {scheme_id}"]
+
+def _classified(scheme_id):
+    return {"intent": "query", "scheme_id": scheme_id, "confidence": 0.5}
+
+def _run(intent, classified, search, seen=None):
+    """detect_intent_and_retrieve with the intent stage stubbed to return (or raise) `intent` after 10ms."""
+
+    async def detect(user_text, classified=None):
+        if seen is not None:
+            seen.append(classified)
+        await asyncio.sleep(0.01)
+        if isinstance(intent, Exception):
+            raise intent
+        return intent
+
+    async def go():
+        try:
+            return await main.detect_intent_and_retrieve(TEXT, search=search, classified=classified)
+        finally:
+            await asyncio.sleep(0.01)  # let a dropped search see its cancellation
+
+    saved, before = (main.async_detect_intent, main.SPECULATIVE_RETRIEVAL), dict(main.speculation_stats)
+    main.async_detect_intent, main.SPECULATIVE_RETRIEVAL = detect, True
+    try:
+        try:
+            result = asyncio.run(go())
+        except Exception as e:
+            result = e
+        delta = {k: main.speculation_stats[k] - before[k] for k in ("hits", "rescoped", "discarded")}
+        return result, delta
+    finally:
+        main.async_detect_intent, main.SPECULATIVE_RETRIEVAL = saved
+        main.speculation_stats.update(before)
+
+def test_hit_uses_the_speculative_search():
+    print("Testing a speculative retrieval hit...")
+    search = FakeSearch()
+    (intent, scheme, facts, timings), delta = _run(
+        {"intent": "query", "scheme_id": "pmay-g"}, _classified("pmay-g"), search)
+    assert intent["intent"] == "query" and scheme == "pmay-g"
+    assert facts == ["facts for pmay-g"] and search.calls == ["pmay-g"] and search.cancelled == []
+    assert timings["speculation"] == "hit" and timings["retrieval_ms"] is not None
+    assert delta == {"hits": 1, "rescoped": 0, "discarded": 0}
+    print("✅ Speculative retrieval hit OK")
+
+def test_rescoped_when_the_scheme_changes():
+    print("Testing a rescoped speculative retrieval...")
+    search = FakeSearch()
+    (_, scheme, facts, timings), delta = _run(
+        {"intent": "query", "scheme_id": "pmjdy"}, _classified("pmay-g"), search)
+    assert scheme == "pmjdy" and facts == ["facts for pmjdy"]
+    assert search.calls == ["pmay-g", "pmjdy"] and search.cancelled == ["pmay-g"]
+    assert timings["speculation"] == "rescoped" and timings["saved_ms"] == 0.0
+    assert delta == {"hits": 0, "rescoped": 1, "discarded": 0}
+    print("✅ Rescoped speculative retrieval OK")
+
+def test_discarded_for_apply():
+    print("Testing a discarded speculative retrieval...")
+    search = FakeSearch()
+    (intent, scheme, facts, timings), delta = _run(
+        {"intent": "apply", "scheme_id": "pmay-g"}, _classified("pmay-g"), search)
+    assert intent["intent"] == "apply" and facts == []
+    assert search.cancelled == ["pmay-g"]
+    assert timings["speculation"] == "discarded" and timings["retrieval_ms"] is None
+    assert delta == {"hits": 0, "rescoped": 0, "discarded": 1}
+    print("✅ Discarded speculative retrieval OK")
+
+def test_intent_failure_drops_the_search():
+    print("Testing an intent failure during speculative retrieval...")
+    search = FakeSearch()
+    error, delta = _run(LLMGatewayError("router", "no healthy endpoint", 503), _classified("pmay-g"), search)
+    assert isinstance(error, LLMGatewayError)
+    assert search.calls == ["pmay-g"] and search.cancelled == ["pmay-g"]
+    assert delta == {"hits": 0, "rescoped": 0, "discarded": 0}
+    print("✅ Intent failure OK")
+
+def test_classified_is_passed_through():
+    print("Testing the classified= passthrough...")
+
+    def classify(user_text):
+        raise AssertionError("classify should not run again")
+
+    search, seen = FakeSearch(), []
+    classified = _classified("rhiss")
+    saved = main.intent_classifier.classify
+    main.intent_classifier.classify = classify
+    try:
+        (_, _, facts, timings), _ = _run({"intent": "query", "scheme_id": "rhiss"}, classified, search, seen)
+    finally:
+        main.intent_classifier.classify = saved
+    assert seen == [classified]
+    assert search.calls == ["rhiss"] and facts == ["facts for rhiss"] and timings["speculation"] == "hit"
+    print("✅ Classified passthrough OK")
+
+if __name__ == "__main__":
+    test_hit_uses_the_speculative_search()
+    test_rescoped_when_the_scheme_changes()
+    test_discarded_for_apply()
+    test_intent_failure_drops_the_search()
+    test_classified_is_passed_through()
+    print("All speculative retrieval tests passed!")
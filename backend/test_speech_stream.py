@@ -0,0 +1,43 @@
+import asyncio
+from speech_stream import SentenceSplitter, stream_speech
+
+def test_splitter_cuts_on_danda_and_latin_punctuation():
+    print("Testing sentence splitting...")
+    splitter = SentenceSplitter(min_chars=10)
+    text = "पीएम आवास योजना गरीब परिवारों के लिए है। Rs. 1.2 lakh tak ki madad milti hai. Aur kuch?"
+    sentences = []
+    for i in range(0, len(text), 5):  # arrives in small deltas like an LLM stream
+        sentences += splitter.feed(text[i:i + 5])
+    # The last sentence has no trailing space yet, so it waits for flush()
+    assert sentences == ["पीएम आवास योजना गरीब परिवारों के लिए है।", "Rs. 1.2 lakh tak ki madad milti hai."]
+    assert splitter.flush() == ["Aur kuch?"]
+    # Too-short pieces ride along with the next sentence
+    assert SentenceSplitter(min_chars=10).feed("Haan. Bilkul sahi baat hai. ") == ["Haan. Bilkul sahi baat hai."]
+    print("✅ Sentence splitting OK")
+
+def test_segments_arrive_in_order_despite_tts_timing():
+    print("Testing ordered concurrent TTS...")
+
+    async def deltas():
+        text = "Pehla vakya thoda lamba hai yahan. Doosra. Teesra vakya bhi kaafi lamba hai. "
+        for word in text.split(" "):
+            yield word + " "
+
+    async def synthesize(text, language):
+        # Later sentences finish first
+        await asyncio.sleep(0.05 if text.startswith("Pehla") else 0.0)
+        return f"audio:{text}"
+
+    async def collect():
+        return [s async for s in stream_speech(deltas(), synthesize, lambda t: "en-IN")]
+
+    segments = asyncio.run(collect())
+    assert [s["index"] for s in segments] == [0, 1]
+    assert segments[0]["audio_base64"] == "audio:Pehla vakya thoda lamba hai yahan."
+    assert segments[1]["text"] == "Doosra. Teesra vakya bhi kaafi lamba hai."
+    print("✅ Ordered concurrent TTS OK")
+
+if __name__ == "__main__":
+    test_splitter_cuts_on_danda_and_latin_punctuation()
+    test_segments_arrive_in_order_despite_tts_timing()
+    print("All speech stream tests passed!")
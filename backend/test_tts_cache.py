@@ -0,0 +1,75 @@
+import asyncio
+import base64
+import tempfile
+from tts_cache import TTSCache, tts_cache_key
+
+def _fake_synthesizer(calls):
+    async def synthesize(text, target_language_code="hi-IN", model="bulbul:v3", speaker="shubh"):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return base64.b64encode(f"{target_language_code}:{text}".encode() * 10).decode()
+    return synthesize
+
+def test_repeats_are_served_from_disk():
+    print("Testing TTS cache hits...")
+    calls = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(cache_dir=tmp)
+
+        async def run():
+            synthesize = _fake_synthesizer(calls)
+            # Concurrent misses for the same line share one synthesis
+            first = await asyncio.gather(*(cache.synthesize(synthesize, "Namaste!", "hi-IN") for _ in range(3)))
+            again = await cache.synthesize(synthesize, " Namaste! ", "hi-IN")
+            other_voice = await cache.synthesize(synthesize, "Namaste!", "en-IN")
+            return first, again, other_voice
+
+        first, again, other_voice = asyncio.run(run())
+        assert len(set(first)) == 1 and again == first[0] and other_voice != again
+        assert calls == ["Namaste!", "Namaste!"]
+        # A fresh process finds the clips already on disk
+        reopened = TTSCache(cache_dir=tmp)
+        assert reopened.get(tts_cache_key("Namaste!", "hi-IN", "bulbul:v3", "shubh")) is not None
+    print("✅ TTS cache hits OK")
+
+def test_size_eviction_drops_least_recently_used():
+    print("Testing TTS cache eviction...")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(cache_dir=tmp, max_bytes=250)
+        cache.put("a" * 64, b"x" * 100)
+        cache.put("b" * 64, b"x" * 100)
+        assert cache.get("a" * 64) is not None  # "a" is now the most recently used
+        cache.put("c" * 64, b"x" * 100)
+        assert cache.get("b" * 64) is None
+        assert cache.get("a" * 64) is not None and cache.get("c" * 64) is not None
+        assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] == 200
+    print("✅ TTS cache eviction OK")
+
+def test_cancelled_caller_does_not_cancel_other_waiters():
+    print("Testing TTS cache cancellation...")
+    calls = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(cache_dir=tmp)
+
+        async def run():
+            synthesize = _fake_synthesizer(calls)
+            first = asyncio.create_task(cache.synthesize(synthesize, "Dhanyavaad!", "hi-IN"))
+            while not calls:  # past the disk lookup, synthesis under way
+                await asyncio.sleep(0.001)
+            second = asyncio.create_task(cache.synthesize(synthesize, "Dhanyavaad!", "hi-IN"))
+            await asyncio.sleep(0.002)
+            first.cancel()  # the caller that started the synthesis barges in
+            return first, await second
+
+        first, audio = asyncio.run(run())
+        assert first.cancelled() and audio and calls == ["Dhanyavaad!"]
+        # The synthesis finished for the waiter and was stored
+        assert cache.get(tts_cache_key("Dhanyavaad!", "hi-IN", "bulbul:v3", "shubh")) is not None
+        assert cache.stats()["misses"] == 1
+    print("✅ TTS cache cancellation OK")
+
+if __name__ == "__main__":
+    test_repeats_are_served_from_disk()
+    test_size_eviction_drops_least_recently_used()
+    test_cancelled_caller_does_not_cancel_other_waiters()
+    print("All TTS cache tests passed!")
@@ -0,0 +1,71 @@
+import tempfile
+import numpy as np
+from vector_store import LocalVectorIndex, write_local_index
+
+def build_tiny_index(index_dir):
+    write_local_index(
+        ids=["a_chunk_0", "b_chunk_0", "c_chunk_0"],
+        embeddings=[[1.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.7, 0.7, 0.0]],
+        metadatas=[
+            {"source_document": "a.md", "scheme_ids": ["pmay-g"]},
+            {"source_document": "b.md", "scheme_ids": ["pmjdy"]},
+            {"source_document": "c.md", "scheme_ids": ["pmay-g", "pmay-u"]}
+        ],
+        model="test-model",
+        index_dir=index_dir
+    )
+
+def test_local_index_top_k():
+    print("Testing LocalVectorIndex top-k ordering...")
+    with tempfile.TemporaryDirectory() as index_dir:
+        build_tiny_index(index_dir)
+        index = LocalVectorIndex(index_dir)
+
+        assert len(index) == 3
+        assert index.model == "test-model"
+
+        matches = index.query([1.0, 0.1, 0.0], top_k=2)
+        assert [m["id"] for m in matches] == ["a_chunk_0", "c_chunk_0"]
+        assert matches[0]["score"] >= matches[1]["score"]
+
+        # Stored vectors are normalised, so scale must not change the ranking
+        matches = index.query([0.0, 50.0, 0.0], top_k=1)
+        assert matches[0]["id"] == "b_chunk_0"
+        assert np.isclose(matches[0]["score"], 1.0)
+        del index  # release the mmap before the temp dir is removed (Windows)
+    print("✅ LocalVectorIndex top-k OK")
+
+def test_local_index_scheme_scope():
+    print("Testing LocalVectorIndex scheme-scoped queries...")
+    with tempfile.TemporaryDirectory() as index_dir:
+        build_tiny_index(index_dir)
+        index = LocalVectorIndex(index_dir)
+
+        # b is the best match overall but belongs to another scheme
+        matches = index.query([0.0, 1.0, 0.0], top_k=2, scheme_id="pmay-g")
+        assert [m["id"] for m in matches] == ["c_chunk_0", "a_chunk_0"]
+        assert matches[0]["score"] > matches[1]["score"]
+
+        assert [m["id"] for m in index.query([1.0, 0.0, 0.0], top_k=5, scheme_id="pmay-u")] == ["c_chunk_0"]
+        assert index.query([1.0, 0.0, 0.0], top_k=5, scheme_id="unknown") == []
+        del index
+    print("✅ Scheme scope OK")
+
+def test_local_index_dimension_mismatch():
+    print("Testing LocalVectorIndex rejects wrong query dimension...")
+    with tempfile.TemporaryDirectory() as index_dir:
+        build_tiny_index(index_dir)
+        index = LocalVectorIndex(index_dir)
+        try:
+            index.query([1.0, 0.0], top_k=1)
+            assert False, "Expected ValueError"
+        except ValueError:
+            pass
+        del index
+    print("✅ Dimension check OK")
+
+if __name__ == "__main__":
+    test_local_index_top_k()
+    test_local_index_scheme_scope()
+    test_local_index_dimension_mismatch()
+    print("All vector store tests passed!")
@@ -0,0 +1,46 @@
+import io
+import wave
+import numpy as np
+from voice_session import EnergyVAD, VoiceSession, pcm_to_wav
+
+RATE = 16000
+
+def _tone(seconds, amplitude):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+
+def _noise(seconds, amplitude=30):
+    return np.random.default_rng(0).normal(0, amplitude, int(RATE * seconds)).astype("<i2").tobytes()
+
+def test_vad_finds_one_utterance_in_noise():
+    print("Testing energy VAD...")
+    vad = EnergyVAD(RATE)
+    audio = _noise(0.5) + _tone(1.0, 6000) + _noise(1.0)
+    events = []
+    for i in range(0, len(audio), 1000):  # odd chunk sizes, like a browser worklet
+        events += vad.feed(audio[i:i + 1000])
+    assert events[0] == "speech_start"
+    assert len(events) == 2 and events[1][0] == "utterance"
+    # Whole tone plus pre-roll and the trailing silence window, nothing more
+    seconds = len(events[1][1]) / 2 / RATE
+    assert 1.0 <= seconds <= 2.1, seconds
+    assert not vad.in_speech and vad.flush() is None
+    print("✅ Energy VAD OK")
+
+def test_session_keeps_recent_turns_and_scheme():
+    print("Testing voice session state...")
+    session = VoiceSession(max_turns=2)
+    for i in range(3):
+        session.remember(f"q{i}", f"a{i}", "pm-kisan" if i == 0 else None)
+    messages = session.messages("system", "q3")
+    assert [m["content"] for m in messages] == ["system", "q1", "a1", "q2", "a2", "q3"]
+    assert session.scheme_hint(None) == "pm-kisan"
+    assert session.scheme_hint("pmay") == "pmay"
+    with wave.open(io.BytesIO(pcm_to_wav(_tone(0.1, 1000), RATE))) as wav:
+        assert (wav.getframerate(), wav.getnchannels(), wav.getnframes()) == (RATE, 1, 1600)
+    print("✅ Voice session state OK")
+
+if __name__ == "__main__":
+    test_vad_finds_one_utterance_in_noise()
+    test_session_keeps_recent_turns_and_scheme()
+    print("All voice session tests passed!")
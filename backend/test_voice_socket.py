@@ -0,0 +1,103 @@
+import os
+import json
+import numpy as np
+
+# main builds its clients at import time; run it offline the way benchmark_retrieval does
+os.environ.setdefault("RETRIEVAL_MODE", "bm25")
+os.environ.setdefault("HTTP_POOL_WARMUP", "0")
+os.environ.setdefault("TTS_PRERENDER", "false")
+import benchmark_retrieval
+from content_store import load_content_store
+benchmark_retrieval.install_fake_pinecone(load_content_store())
+import main
+from fastapi.testclient import TestClient
+from llm_gateway import LLMGatewayError
+
+RATE = 16000
+
+def _utterance():
+    t = np.arange(RATE) / RATE
+    noise = np.random.default_rng(0).normal(0, 30, RATE // 2)
+    audio = np.concatenate([noise, 6000 * np.sin(2 * np.pi * 220 * t), noise, noise])
+    return audio.astype("<i2").tobytes()
+
+class FailingRouter:
+    """Every provider is down: the intent fallback and the reply stream both fail."""
+
+    async def chat(self, messages, task="chat", **params):
+        raise LLMGatewayError("router", "no healthy endpoint", 503)
+
+    async def chat_stream(self, messages, task="stream", **params):
+        raise LLMGatewayError("router", "no healthy endpoint", 503)
+        yield  # pragma: no cover
+
+def _speak(ws):
+    audio = _utterance()
+    for i in range(0, len(audio), 960):
+        ws.send_bytes(audio[i:i + 960])
+    messages = []
+    while not messages or messages[-1]["type"] != "done":
+        messages.append(ws.receive_json())
+    return messages
+
+def test_failed_turn_reports_error_then_done():
+    print("Testing a voice socket turn with every LLM provider down...")
+
+    async def transcribe(audio_bytes, **kwargs):
+        return "mujhe kuch jaankari chahiye"
+
+    async def synthesize(text, **kwargs):
+        return "QUJD"
+
+    saved = (main.llm_router, main.llm_gateway.transcribe, main.llm_gateway.synthesize,
+             main.tts_cache, main.intent_classifier.threshold)
+    main.llm_router = FailingRouter()
+    main.llm_gateway.transcribe, main.llm_gateway.synthesize, main.tts_cache = transcribe, synthesize, None
+    main.intent_classifier.threshold = 1.1  # rules never confident enough: intent goes to the (failing) LLM
+    try:
+        with TestClient(main.app).websocket_connect("/ws/voice-agent") as ws:
+            assert ws.receive_json()["type"] == "ready"
+            messages = _speak(ws)
+            kinds = [m["type"] for m in messages]
+            assert kinds[-2:] == ["error", "done"], kinds
+            assert "no healthy endpoint" in messages[-2]["detail"]
+
+            # The socket survives: the next turn goes through once a provider is back
+            async def chat_stream(messages, task="stream", **params):
+                yield "Ji, PM Kisan mein saal ke chhe hazaar rupaye milte hain. "
+
+            async def chat(messages, task="chat", **params):
+                return '{"intent": "query", "scheme_id": null}'
+
+            main.llm_router.chat_stream, main.llm_router.chat = chat_stream, chat
+            messages = _speak(ws)
+            assert [m["type"] for m in messages][-2:] == ["segment", "done"]
+            assert messages[-1]["agent_text"].startswith("Ji, PM Kisan")
+    finally:
+        (main.llm_router, main.llm_gateway.transcribe, main.llm_gateway.synthesize,
+         main.tts_cache, main.intent_classifier.threshold) = saved
+    print("✅ Failed voice socket turn OK")
+
+def test_bad_control_messages_get_an_error():
+    print("Testing voice socket control validation...")
+    with TestClient(main.app).websocket_connect("/ws/voice-agent") as ws:
+        assert ws.receive_json()["type"] == "ready"
+        for text in ("5", "[]", "not json"):
+            ws.send_text(text)
+            assert ws.receive_json()["type"] == "error"
+        for sample_rate in ("abc", 100, 96000, 16000.5, True):
+            ws.send_text(json.dumps({"type": "start", "sample_rate": sample_rate}))
+            message = ws.receive_json()
+            assert message["type"] == "error" and "sample_rate" in message["detail"], message
+        ws.send_text(json.dumps({"type": "start", "user_name": ["Ravi"]}))
+        assert ws.receive_json()["type"] == "error"
+
+        # Still open, and a good start goes through
+        ws.send_text(json.dumps({"type": "start", "sample_rate": 8000}))
+        assert ws.receive_json() == {"type": "ready", "sample_rate": 8000}
+    print("✅ Voice socket control validation OK")
+
+if __name__ == "__main__":
+    test_failed_turn_reports_error_then_done()
+    test_bad_control_messages_get_an_error()
+    print("All voice socket tests passed!")
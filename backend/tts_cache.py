@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import threading
+
+# ---------------------------------------------------------
+# Content-Addressed TTS Audio Cache (local disk)
+# ---------------------------------------------------------
+# The welcome greeting, the "couldn't hear you" fallback and popular agent
+# answers are synthesized over and over with identical settings. Audio is
+# stored under sha256(text, language, model, speaker), so a repeat is a
+# local file read instead of a Sarvam round trip. Least-recently-used files
+# are evicted once the directory grows past TTS_CACHE_MAX_BYTES.
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_DIR = os.getenv(
+    "TTS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tts_cache")
+)
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+AUDIO_SUFFIX = ".wav"  # bulbul returns WAV unless another output codec is requested
+
+
+def tts_cache_key(text, target_language_code, model, speaker, **params):
+    """Same text + voice settings -> same key (whitespace at the ends doesn't count)."""
+    payload = json.dumps(
+        [(text or "").strip(), target_language_code, model, speaker, sorted(params.items())],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = {}  # key -> (size, last_used); rebuilt from the directory on startup
+        self._total_bytes = 0
+        self._inflight = {}  # key -> Task, so concurrent misses share one synthesis
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + AUDIO_SUFFIX)
+
+    def _scan(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if not name.endswith(AUDIO_SUFFIX):
+                    continue
+                stat = os.stat(path)
+                self._index[name[:-len(AUDIO_SUFFIX)]] = (stat.st_size, stat.st_mtime)
+                self._total_bytes += stat.st_size
+        if self._index:
+            print(f"🔈 TTS cache: {len(self._index)} clips, {self._total_bytes / 1e6:.1f} MB on disk")
+
+    # ---- disk ------------------------------------------------------------
+
+    def get(self, key):
+        """Audio bytes or None. A hit refreshes the file's mtime, which is what eviction orders by."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            now = time.time()
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            with self._lock:
+                if key in self._index:
+                    self._total_bytes -= self._index.pop(key)[0]
+            return None
+        with self._lock:
+            self._index[key] = (len(audio), now)
+        return audio
+
+    def put(self, key, audio):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)  # readers never see a half-written clip
+        with self._lock:
+            previous = self._index.get(key)
+            if previous:
+                self._total_bytes -= previous[0]
+            self._index[key] = (len(audio), time.time())
+            self._total_bytes += len(audio)
+            victims = self._pick_victims(keep=key)
+        for victim in victims:
+            try:
+                os.remove(self._path(victim))
+            except FileNotFoundError:
+                pass
+
+    def _pick_victims(self, keep):
+        victims = []
+        if self._total_bytes <= self.max_bytes:
+            return victims
+        for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            del self._index[key]
+            self._total_bytes -= size
+            self.evictions += 1
+            victims.append(key)
+        return victims
+
+    # ---- synthesis -------------------------------------------------------
+
+    async def synthesize(self, synthesize, text, target_language_code="hi-IN", model="bulbul:v3",
+                         speaker="shubh", **params):
+        """
+        Base64 audio for text, from disk when possible; otherwise awaits
+        synthesize(text, target_language_code=..., model=..., speaker=...) (e.g. LLMGateway.synthesize)
+        and stores the result.
+        """
+        key = tts_cache_key(text, target_language_code, model, speaker, **params)
+        audio = await asyncio.to_thread(self.get, key)
+        if audio is not None:
+            with self._lock:
+                self.hits += 1
+            return base64.b64encode(audio).decode("ascii")
+
+        task = self._inflight.get(key)
+        if task is None:
+            with self._lock:
+                self.misses += 1
+            # The cache owns the synthesis: one caller hanging up (barge-in) must not cancel it
+            # for the others waiting on the same line, and the clip still lands on disk.
+            task = asyncio.create_task(self._synthesize_and_store(
+                key, synthesize, text, target_language_code=target_language_code, model=model, speaker=speaker,
+                **params
+            ))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        return await asyncio.shield(task)
+
+    async def _synthesize_and_store(self, key, synthesize, text, **voice):
+        audio_base64 = await synthesize(text, **voice)
+        if audio_base64:
+            await asyncio.to_thread(self.put, key, base64.b64decode(audio_base64))
+        return audio_base64
+
+    def _finish_inflight(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved when every caller had already gone
+        if not task.cancelled():
+            task.exception()
+
+    async def prerender(self, synthesize, prompts, **voice):
+        """Warms the cache with fixed lines: [(text, target_language_code), ...]. Failures are only logged."""
+        rendered = 0
+        for text, target_language_code in prompts:
+            try:
+                await self.synthesize(synthesize, text, target_language_code=target_language_code, **voice)
+                rendered += 1
+            except Exception as e:
+                print(f"⚠️ TTS pre-render failed for {text[:40]!r}: {e}")
+        print(f"🔈 TTS pre-render: {rendered}/{len(prompts)} fixed prompts ready")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "clips": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
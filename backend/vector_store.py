@@ -0,0 +1,139 @@
+import os
+import json
+import numpy as np
+
+# ---------------------------------------------------------
+# Vector Backends for high_quality_search
+# ---------------------------------------------------------
+# "pinecone" -> remote Pinecone index (default, network round trip per query)
+# "local"    -> memory-mapped NumPy matrix built by `build_vector_db.py --backend local`
+# Pick one with the VECTOR_BACKEND env var.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+LOCAL_INDEX_DIR = os.getenv(
+    "LOCAL_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "index")
+)
+
+EMBEDDINGS_FILE = "embeddings.npy"
+SIDECAR_FILE = "chunks.json"
+
+
+# Both backends return ids + scores only; chunk text comes from content_store.ContentStore.
+
+class PineconeVectorIndex:
+    """Thin wrapper so the remote index returns the same match dicts as the local one."""
+
+    def __init__(self, index):
+        self.index = index
+
+    def query(self, vector, top_k=5, scheme_id=None):
+        # Scheme scoping happens server-side through a metadata filter on the chunk tags
+        query_filter = {"scheme_ids": {"$in": [scheme_id]}} if scheme_id else None
+        # No metadata in the response: ids + scores are a few bytes per match
+        results = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=False,
+            filter=query_filter
+        )
+        return [{"id": match.id, "score": match.score} for match in results.matches or []]
+
+
+class LocalVectorIndex:
+    """
+    In-process index over a few hundred chunks.
+    Embeddings are L2-normalised at build time, so top-k is a single dot product.
+    """
+
+    def __init__(self, index_dir=LOCAL_INDEX_DIR):
+        # mmap keeps startup instant and lets several uvicorn workers share the page cache
+        self.embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(index_dir, SIDECAR_FILE), "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+
+        self.model = sidecar.get("model")
+        self.ids = sidecar["ids"]
+        # Only needed for the scheme slices; text is served by the content store
+        self.metadatas = sidecar.get("metadatas") or [{} for _ in self.ids]
+
+        if len(self.ids) != self.embeddings.shape[0]:
+            raise ValueError(
+                f"Local index is corrupt: {len(self.ids)} ids but {self.embeddings.shape[0]} vectors"
+            )
+
+        # Row numbers per scheme, so a scoped query only scores that slice of the matrix
+        self.scheme_rows = {}
+        for row, metadata in enumerate(self.metadatas):
+            for scheme_id in metadata.get("scheme_ids", []):
+                self.scheme_rows.setdefault(scheme_id, []).append(row)
+        self.scheme_rows = {k: np.asarray(v, dtype=np.int64) for k, v in self.scheme_rows.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, vector, top_k=5, scheme_id=None):
+        if not self.ids or top_k <= 0:
+            return []
+
+        rows = None
+        if scheme_id:
+            rows = self.scheme_rows.get(scheme_id)
+            if rows is None:
+                return []
+
+        query_vec = np.asarray(vector, dtype=np.float32)
+        if query_vec.shape[0] != self.embeddings.shape[1]:
+            raise ValueError(
+                f"Query dimension {query_vec.shape[0]} does not match index dimension {self.embeddings.shape[1]}"
+            )
+        norm = np.linalg.norm(query_vec)
+        if norm > 0:
+            query_vec = query_vec / norm
+
+        # Cosine similarity against every chunk (or the scheme's slice) in one vectorized pass
+        if rows is None:
+            scores = self.embeddings @ query_vec
+        else:
+            scores = self.embeddings[rows] @ query_vec
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top_scores = scores[top]
+        if rows is not None:
+            top = rows[top]  # slice positions -> global row numbers
+
+        return [{"id": self.ids[i], "score": float(score)} for i, score in zip(top, top_scores)]
+
+
+def write_local_index(ids, embeddings, metadatas, model, index_dir=LOCAL_INDEX_DIR):
+    """Writes the embedding matrix + chunk-id sidecar that LocalVectorIndex loads."""
+    os.makedirs(index_dir, exist_ok=True)
+
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = matrix / norms
+
+    np.save(os.path.join(index_dir, EMBEDDINGS_FILE), matrix)
+    with open(os.path.join(index_dir, SIDECAR_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model": model,
+            "dimension": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            "ids": list(ids),
+            "metadatas": list(metadatas)
+        }, f, ensure_ascii=False)
+
+
+def load_vector_index(pc, index_name, backend=VECTOR_BACKEND):
+    """Returns the configured vector backend. Both expose .query(vector, top_k)."""
+    if backend == "local":
+        vector_index = LocalVectorIndex()
+        print(f"Local vector index loaded! ({len(vector_index)} chunks, model: {vector_index.model})")
+        return vector_index
+    if backend != "pinecone":
+        raise ValueError(f"Unknown VECTOR_BACKEND '{backend}'. Use 'pinecone' or 'local'.")
+
+    vector_index = PineconeVectorIndex(pc.Index(index_name))
+    print("Pinecone Database connected!")
+    return vector_index
@@ -0,0 +1,187 @@
+import io
+import os
+import math
+import wave
+import asyncio
+from collections import deque
+import numpy as np
+
+# ---------------------------------------------------------
+# WebSocket Voice Sessions (server-side VAD + per-connection state)
+# ---------------------------------------------------------
+# The browser streams raw 16-bit mono PCM frames over one socket. An energy
+# VAD tracks the room's noise floor and closes an utterance after a short
+# stretch of silence, so STT starts the moment the caller stops talking
+# instead of after an upload. Who the caller is, the scheme being discussed
+# and the last few turns live on the connection and are reused every turn.
+VOICE_SAMPLE_RATE = int(os.getenv("VOICE_SAMPLE_RATE", "16000"))
+VOICE_MIN_SAMPLE_RATE, VOICE_MAX_SAMPLE_RATE = 8000, 48000  # what a client may ask for in "start"
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+VAD_CALIBRATION_MS = int(os.getenv("VAD_CALIBRATION_MS", "300"))  # noise floor measured before listening
+VAD_SPEECH_MARGIN_DB = float(os.getenv("VAD_SPEECH_MARGIN_DB", "10"))  # above the noise floor = voiced
+VAD_MIN_LEVEL_DB = float(os.getenv("VAD_MIN_LEVEL_DB", "-50"))  # dBFS; quieter is never speech
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "150"))  # voiced run needed to open an utterance
+VAD_SILENCE_MS = int(os.getenv("VAD_SILENCE_MS", "700"))  # silence that ends it
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "300"))  # kept from before the onset so no syllable is clipped
+VAD_MAX_UTTERANCE_SECONDS = float(os.getenv("VAD_MAX_UTTERANCE_SECONDS", "30"))
+VOICE_SESSION_TURNS = int(os.getenv("VOICE_SESSION_TURNS", "4"))  # user/assistant pairs sent with each prompt
+
+
+def frame_level_db(frame):
+    """RMS level of a PCM16 frame in dBFS (silence ~ -90, normal speech roughly -35 to -15)."""
+    samples = np.frombuffer(frame, dtype="<i2").astype(np.float32)
+    if samples.size == 0:
+        return -90.0
+    rms = math.sqrt(float(np.mean(samples * samples)))
+    return 20 * math.log10(max(rms, 1.0) / 32768.0)
+
+
+def pcm_to_wav(pcm, sample_rate=VOICE_SAMPLE_RATE):
+    """Wraps raw PCM16 mono in a WAV header so it can go to STT as a normal upload."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class EnergyVAD:
+    """
+    feed(pcm) -> list of events: "speech_start" when the caller starts talking,
+    ("utterance", pcm) when they stop. Frames can arrive in any chunk size.
+    """
+
+    def __init__(self, sample_rate=VOICE_SAMPLE_RATE, frame_ms=VAD_FRAME_MS):
+        self.sample_rate = sample_rate
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        assert self.frame_bytes > 0, f"{frame_ms}ms at {sample_rate} Hz is an empty VAD frame"
+
+        def frames(ms):
+            return max(1, ms // frame_ms)
+
+        self.calibration_frames = frames(VAD_CALIBRATION_MS)
+        self.min_speech_frames = frames(VAD_MIN_SPEECH_MS)
+        self.silence_frames = frames(VAD_SILENCE_MS)
+        self.max_utterance_bytes = int(VAD_MAX_UTTERANCE_SECONDS * sample_rate) * 2
+        self.noise_db = None
+        self._calibration = []
+        self._pending = b""
+        self._preroll = deque(maxlen=frames(VAD_PREROLL_MS))
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._utterance = None  # bytearray while the caller is talking
+
+    @property
+    def in_speech(self):
+        return self._utterance is not None
+
+    def feed(self, pcm):
+        self._pending += pcm
+        events = []
+        while len(self._pending) >= self.frame_bytes:
+            frame, self._pending = self._pending[:self.frame_bytes], self._pending[self.frame_bytes:]
+            event = self._process(frame)
+            if event:
+                events.append(event)
+        return events
+
+    def _process(self, frame):
+        level = frame_level_db(frame)
+        if self.noise_db is None:
+            self._calibration.append(level)
+            if len(self._calibration) >= self.calibration_frames:
+                self.noise_db = float(np.median(self._calibration))
+            return None
+
+        voiced = level > max(self.noise_db + VAD_SPEECH_MARGIN_DB, VAD_MIN_LEVEL_DB)
+        if self._utterance is None:
+            self._preroll.append(frame)
+            if not voiced:
+                self._voiced_run = 0
+                # Floor drops straight to a quieter room, creeps up towards a noisier one
+                self.noise_db = level if level < self.noise_db else self.noise_db + 0.05 * (level - self.noise_db)
+                return None
+            self._voiced_run += 1
+            if self._voiced_run < self.min_speech_frames:
+                return None
+            self._utterance = bytearray(b"".join(self._preroll))
+            self._preroll.clear()
+            self._silent_run = 0
+            return "speech_start"
+
+        self._utterance += frame
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run >= self.silence_frames or len(self._utterance) >= self.max_utterance_bytes:
+            return ("utterance", self._finish())
+        return None
+
+    def flush(self):
+        """Ends the current utterance now (client pressed stop). None if nobody was talking."""
+        return self._finish() if self._utterance is not None else None
+
+    def _finish(self):
+        pcm = bytes(self._utterance)
+        self._utterance = None
+        self._voiced_run = 0
+        self._silent_run = 0
+        return pcm
+
+
+class VoiceSession:
+    """What one voice connection remembers between turns."""
+
+    def __init__(self, user_name="Citizen", scheme_id=None, sample_rate=VOICE_SAMPLE_RATE, max_turns=VOICE_SESSION_TURNS):
+        self.user_name = user_name
+        self.scheme_id = scheme_id  # picked by the client; always wins
+        self.last_scheme = None  # last scheme the conversation was about
+        self.sample_rate = sample_rate
+        self.history = deque(maxlen=max_turns * 2)
+        self.turns = 0
+        self.vad = EnergyVAD(sample_rate)
+        self.reply_task = None
+        self._send_lock = asyncio.Lock()
+
+    def configure(self, user_name=None, scheme_id=None, sample_rate=None):
+        """Applies a "start" message. A bad value raises ValueError and changes nothing."""
+        # bool is an int subclass, so check the exact type
+        if sample_rate is not None and (type(sample_rate) is not int
+                                        or not VOICE_MIN_SAMPLE_RATE <= sample_rate <= VOICE_MAX_SAMPLE_RATE):
+            raise ValueError(
+                f"sample_rate must be an integer from {VOICE_MIN_SAMPLE_RATE} to {VOICE_MAX_SAMPLE_RATE} Hz"
+            )
+        for name, value in (("user_name", user_name), ("scheme_id", scheme_id)):
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"{name} must be a string")
+
+        if user_name:
+            self.user_name = user_name
+        if scheme_id:
+            self.scheme_id = scheme_id
+        if sample_rate and sample_rate != self.sample_rate:
+            self.sample_rate = sample_rate
+            self.vad = EnergyVAD(self.sample_rate)
+
+    def scheme_hint(self, classified_scheme):
+        """Explicit scheme, else one named in this utterance, else the one already being discussed."""
+        return self.scheme_id or classified_scheme or self.last_scheme
+
+    def remember(self, user_text, agent_text, scheme=None):
+        self.history.append({"role": "user", "content": user_text})
+        self.history.append({"role": "assistant", "content": agent_text})
+        self.turns += 1
+        if scheme:
+            self.last_scheme = scheme
+
+    def messages(self, system_prompt, user_text):
+        return [{"role": "system", "content": system_prompt}, *self.history, {"role": "user", "content": user_text}]
+
+    @property
+    def replying(self):
+        return self.reply_task is not None and not self.reply_task.done()
+
+    async def send(self, websocket, payload):
+        # The reply task and the receive loop both write to the socket
+        async with self._send_lock:
+            await websocket.send_json(payload)